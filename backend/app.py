@@ -5,12 +5,24 @@ from functools import wraps
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify, make_response, send_file
+import json
+import atexit
+from flask import Flask, request, jsonify, make_response, send_file, Response, stream_with_context, g
 from pytz import InvalidTimeError
 from werkzeug.utils import secure_filename
 import tempfile
 from deepseek_api import DeepSeekTranslator
 from file_processor import FileProcessor
+from translation_cache import create_translation_cache
+from pipeline import TranslationPipeline
+from history_recorder import create_history_recorder
+from user_cache import user_cache
+from quota import QuotaExceeded, create_quota_service
+from metrics import registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+import tracing
+from tracing import tracer
+from jobs import JobManager, create_job_store, job_to_dict, SUCCEEDED, FAILED
+from webhook_events import WebhookProcessor, create_webhook_store
 from flask_cors import CORS
 from jose import ExpiredSignatureError, jwt, JWTError
 from jose.constants import ALGORITHMS
@@ -23,19 +35,20 @@ from database import (
     create_user,
     update_user_subscription,
     create_subscription_record,
-    record_translation,
     get_user_translation_history,
-    get_user_usage_stats
+    encode_history_cursor,
+    decode_history_cursor
 )
 
 # Initialize Flask app
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['X-Next-Cursor', 'X-Translation-Notes'])
 
 # Configuration
 load_dotenv()
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'docx', 'pptx', 'xlsx'}
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+MAX_HISTORY_PAGE = 100
 
 # Authentication
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
@@ -43,19 +56,67 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
 
+# Scrapers must send this as a bearer token when set
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
 # Stripe
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
 
+# Under ``python app.py`` the PDF extraction workers import this module as
+# __mp_main__; only the real server starts background threads
+SERVING = __name__ != '__mp_main__'
+
 # Initialize services
-translator = DeepSeekTranslator(os.getenv("DEEPSEEK_API_KEY"))
+translation_cache = create_translation_cache()
+translator = DeepSeekTranslator(os.getenv("DEEPSEEK_API_KEY"), cache=translation_cache)
 file_processor = FileProcessor()
+document_pipeline = TranslationPipeline(translator, file_processor)
+history_recorder = create_history_recorder()
+if SERVING:
+    history_recorder.start()
+    atexit.register(history_recorder.close)
+quota = create_quota_service(pending_usage=history_recorder.pending_characters)
+
+
+def record_job_translation(job):
+    history_recorder.record(
+        user_id=job['user_id'],
+        source_text=f"File: {job['file_name']}",
+        translated_text=f"Translated file: {job['file_name']}",
+        source_lang=job['source_language'],
+        target_lang=job['target_language'],
+        character_count=job['character_count'] or 0,
+        document_type=job['file_name'].split('.')[-1],
+        file_name=job['file_name'],
+        # translation_history.session_id is required; a job is its own session
+        session_id=job['id']
+    )
+
+
+job_manager = JobManager(create_job_store(), document_pipeline, quota=quota, on_success=record_job_translation)
+if SERVING:
+    job_manager.start()
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Helper functions
+def quota_exceeded_response(e: QuotaExceeded):
+    return jsonify({
+        'error': str(e),
+        'remaining': e.remaining,
+        'requested': e.requested
+    }), 402
+
+def add_translation_notes(response, original_path: str):
+    """Tell the client what the translated file could not keep"""
+    notes = file_processor.reconstruction_notes(original_path)
+    if notes:
+        response.headers['X-Translation-Notes'] = " | ".join(notes)
+    return response
+
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -90,7 +151,11 @@ def token_required(f):
             
         try:
             data = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            current_user = get_user_by_username(data['sub'])
+            current_user = user_cache.get(data['sub'])
+            if current_user is None:
+                generation = user_cache.generation()
+                current_user = get_user_by_username(data['sub'])
+                user_cache.set(data['sub'], current_user, generation)
             if not current_user:
                 raise Exception("User not found")
         except ExpiredSignatureError:
@@ -170,7 +235,7 @@ def register():
 @token_required
 def read_users_me(current_user):
     # Get updated usage stats
-    usage_stats = get_user_usage_stats(current_user['id'])
+    usage_stats = history_recorder.usage_stats(current_user['id'])
     
     # Remove sensitive data before returning
     current_user.pop('hashed_password', None)
@@ -183,11 +248,121 @@ def read_users_me(current_user):
 @app.route('/api/users/history', methods=['GET'])
 @token_required
 def get_user_history(current_user):
+    """
+    With ``offset`` (the default) the body is a plain list, as before.
+    Passing ``before`` (empty for the first page) switches to keyset
+    pages: ``{"items": [...], "next_cursor": ...}``. Either way the next
+    page's cursor is also sent in the ``X-Next-Cursor`` header.
+    """
     limit = request.args.get('limit', default=10, type=int)
     offset = request.args.get('offset', default=0, type=int)
-    
-    history = get_user_translation_history(current_user['id'], limit, offset)
-    return jsonify(history)
+    cursor = request.args.get('before')
+
+    before = None
+    if cursor is not None:
+        limit = min(max(limit, 1), MAX_HISTORY_PAGE)
+        if cursor:
+            try:
+                before = decode_history_cursor(cursor)
+            except Exception:
+                return jsonify({'error': 'Invalid cursor'}), 400
+
+    # One extra row tells whether there is a next page
+    history = get_user_translation_history(current_user['id'], limit + 1, offset, before)
+    items = history[:limit]
+    next_cursor = encode_history_cursor(items[-1]) if len(history) > limit else None
+
+    response = jsonify(items if cursor is None else {'items': items, 'next_cursor': next_cursor})
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+# Metrics
+HTTP_IN_FLIGHT = registry.gauge("http_requests_in_flight", "Requests currently being handled")
+
+@app.before_request
+def track_request_start():
+    HTTP_IN_FLIGHT.inc()
+    # Root span of the request's trace; for streamed responses it ends with the stream
+    route = request.url_rule.rule if request.url_rule else request.path
+    g.trace_span = tracer.start_span(f"{request.method} {route}", root=True, method=request.method, route=route)
+    g.trace_token = tracing.attach(g.trace_span)
+
+@app.after_request
+def track_request_status(response):
+    span = g.get('trace_span')
+    if span is not None:
+        span.set_attribute('status_code', response.status_code)
+        if response.status_code >= 500:
+            span.status = "error"
+    return response
+
+@app.teardown_request
+def track_request_end(error=None):
+    HTTP_IN_FLIGHT.dec()
+    span = g.pop('trace_span', None)
+    if span is not None:
+        if error is not None:
+            span.record_error(error)
+        tracing.detach(g.pop('trace_token'))
+        span.end()
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    if METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {METRICS_TOKEN}":
+        return jsonify({'error': 'Forbidden'}), 403
+    return Response(registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+# Translation cache administration
+@app.route('/api/admin/translation-cache', methods=['GET'])
+@token_required
+def get_translation_cache_stats(current_user):
+    if not current_user.get('is_superuser'):
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify(translation_cache.stats())
+
+@app.route('/api/admin/db-pool', methods=['GET'])
+@token_required
+def get_db_pool_stats(current_user):
+    if not current_user.get('is_superuser'):
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify(db.stats())
+
+@app.route('/api/admin/history-recorder', methods=['GET'])
+@token_required
+def get_history_recorder_stats(current_user):
+    if not current_user.get('is_superuser'):
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify(history_recorder.stats())
+
+@app.route('/api/admin/user-cache', methods=['GET'])
+@token_required
+def get_user_cache_stats(current_user):
+    if not current_user.get('is_superuser'):
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify(user_cache.stats())
+
+@app.route('/api/admin/quota', methods=['GET'])
+@token_required
+def get_quota_stats(current_user):
+    if not current_user.get('is_superuser'):
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify(quota.stats())
+
+@app.route('/api/admin/translation-cache', methods=['DELETE'])
+@token_required
+def invalidate_translation_cache(current_user):
+    if not current_user.get('is_superuser'):
+        return jsonify({'error': 'Forbidden'}), 403
+
+    source_lang = request.args.get('source')
+    target_lang = request.args.get('target')
+    try:
+        removed = translation_cache.invalidate(source_lang, target_lang)
+    except Exception as e:
+        logger.error(f"Cache invalidation failed: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'removed': removed, 'source': source_lang, 'target': target_lang})
 
 # Subscription endpoints
 @app.route('/api/create-subscription', methods=['POST'])
@@ -219,6 +394,7 @@ def create_subscription(current_user):
 
 @app.route('/api/stripe-webhook', methods=['POST'])
 def stripe_webhook():
+    """Verify and store the event; webhook_processor applies it"""
     payload = request.data
     sig_header = request.headers.get('Stripe-Signature')
     event = None
@@ -234,137 +410,120 @@ def stripe_webhook():
         logger.error(f"Invalid signature: {e}")
         return jsonify({"error": "Invalid signature"}), 400
     
-    # Handle the event
-    event_type = event['type']
-    logger.info(f"Processing Stripe event: {event_type}")
-    
+    logger.info(f"Received Stripe event: {event['type']}")
     try:
-        if event_type == 'checkout.session.completed':
-            handle_checkout_session(event['data']['object'])
-        elif event_type == 'invoice.payment_succeeded':
-            handle_payment_succeeded(event['data']['object'])
-        elif event_type == 'customer.subscription.deleted':
-            handle_subscription_deleted(event['data']['object'])
-        elif event_type == 'customer.subscription.updated':
-            handle_subscription_updated(event['data']['object'])
-        else:
-            logger.info(f"Unhandled event type: {event_type}")
-            
-        return jsonify({"status": "success"}), 200
-        
+        created = webhook_processor.receive(event['id'], event['type'], payload.decode('utf-8'))
     except Exception as e:
-        logger.error(f"Error handling webhook: {str(e)}")
+        # Not stored, so let Stripe deliver it again
+        logger.error(f"Error storing webhook: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
+
+    return jsonify({"status": "received" if created else "duplicate"}), 200
     
 
+# Stripe event handlers. They run on webhook_processor's threads with
+# the event object as a plain dict, may run more than once for the same
+# event, and raise to have the event retried.
 def handle_checkout_session(session):
     username = session['client_reference_id']
     subscription_id = session['subscription']
     customer_id = session['customer']
-    
-    try:
-        # Get plan ID from metadata or default to 'basic'
-        plan_id = session.get('metadata', {}).get('plan_id', 'basic')
-        
-        # Update user subscription status
-        if not db.update_user_subscription(username, subscription_id, plan_id, True):
-            logger.error(f"Failed to update subscription for user: {username}")
-            return False
-        
-        # Get user ID
-        user = db.get_user_by_username(username)
-        if not user:
-            logger.error(f"User not found: {username}")
-            return False
-        
-        # Create subscription record
-        if not db.create_subscription_record(
-            user['id'],
-            subscription_id,
-            customer_id,
-            plan_id
-        ):
-            logger.error(f"Failed to create subscription record for user: {username}")
-            return False
-        
-        logger.info(f"Subscription successfully processed for {username}")
-        return True
-        
-    except Exception as e:
-        logger.error(f"Error in handle_checkout_session: {str(e)}")
-        return False
+
+    # Get plan ID from metadata or default to 'basic'
+    plan_id = (session.get('metadata') or {}).get('plan_id', 'basic')
+
+    # Update user subscription status
+    if not update_user_subscription(username, subscription_id, plan_id, True):
+        raise RuntimeError(f"Failed to update subscription for user: {username}")
+
+    # Get user ID
+    user = get_user_by_username(username)
+    if not user:
+        raise RuntimeError(f"User not found: {username}")
+
+    # Create subscription record
+    if not create_subscription_record(
+        user['id'],
+        subscription_id,
+        customer_id,
+        plan_id
+    ):
+        raise RuntimeError(f"Failed to create subscription record for user: {username}")
+
+    logger.info(f"Subscription successfully processed for {username}")
 
 def handle_payment_succeeded(invoice):
     subscription_id = invoice['subscription']
-    try:
+    lines = (invoice.get('lines') or {}).get('data') or []
+    if lines and lines[0].get('period'):
+        # Subscription invoices carry the period they pay for
+        period_start, period_end = lines[0]['period']['start'], lines[0]['period']['end']
+    else:
         subscription = stripe.Subscription.retrieve(subscription_id)
-        with db.get_cursor() as cursor:
-            cursor.execute("""
-                UPDATE subscriptions
-                SET current_period_start = to_timestamp(%s),
-                    current_period_end = to_timestamp(%s),
-                    updated_at = NOW()
-                WHERE stripe_subscription_id = %s
-                """, (
-                    subscription.current_period_start,
-                    subscription.current_period_end,
-                    subscription_id
-                ))
-            return True
-    except Exception as e:
-        logger.error(f"Failed to update subscription period: {e}")
-        return False
+        period_start, period_end = subscription['current_period_start'], subscription['current_period_end']
+    with db.get_cursor() as cursor:
+        cursor.execute("""
+            UPDATE subscriptions
+            SET current_period_start = to_timestamp(%s),
+                current_period_end = to_timestamp(%s),
+                updated_at = NOW()
+            WHERE stripe_subscription_id = %s
+            """, (period_start, period_end, subscription_id))
 
 def handle_subscription_deleted(subscription):
     subscription_id = subscription['id']
-    try:
-        with db.get_cursor() as cursor:
-            # Update subscription status
-            cursor.execute("""
-                UPDATE subscriptions
-                SET status = 'canceled',
-                    updated_at = NOW()
-                WHERE stripe_subscription_id = %s
-                """, (subscription_id,))
-            
-            # Update user's subscription status
-            cursor.execute("""
-                UPDATE users
-                SET subscription_active = FALSE,
-                    subscription_id = NULL,
-                    subscription_plan = NULL,
-                    monthly_character_limit = 50000
-                WHERE subscription_id = %s
-                """, (subscription_id,))
-            
-            return True
-    except Exception as e:
-        logger.error(f"Failed to cancel subscription: {e}")
-        return False
+    with db.get_cursor() as cursor:
+        # Update subscription status
+        cursor.execute("""
+            UPDATE subscriptions
+            SET status = 'canceled',
+                updated_at = NOW()
+            WHERE stripe_subscription_id = %s
+            """, (subscription_id,))
+        
+        # Update user's subscription status
+        cursor.execute("""
+            UPDATE users
+            SET subscription_active = FALSE,
+                subscription_id = NULL,
+                subscription_plan = NULL,
+                monthly_character_limit = 50000
+            WHERE subscription_id = %s
+            RETURNING username
+            """, (subscription_id,))
+        usernames = [row['username'] for row in cursor.fetchall()]
+
+    for username in usernames:
+        user_cache.invalidate(username)
 
 def handle_subscription_updated(subscription):
     subscription_id = subscription['id']
-    try:
-        with db.get_cursor() as cursor:
-            cursor.execute("""
-                UPDATE subscriptions
-                SET status = %s,
-                    cancel_at_period_end = %s,
-                    current_period_start = to_timestamp(%s),
-                    current_period_end = to_timestamp(%s),
-                    updated_at = NOW()
-                WHERE stripe_subscription_id = %s
-                """, (
-                    subscription.status,
-                    subscription.cancel_at_period_end,
-                    subscription.current_period_start,
-                    subscription.current_period_end,
-                    subscription_id
-                ))
-            return True
-    except Exception as e:
-        logger.error(f"Failed to update subscription: {e}")
-        return False
+    with db.get_cursor() as cursor:
+        cursor.execute("""
+            UPDATE subscriptions
+            SET status = %s,
+                cancel_at_period_end = %s,
+                current_period_start = to_timestamp(%s),
+                current_period_end = to_timestamp(%s),
+                updated_at = NOW()
+            WHERE stripe_subscription_id = %s
+            """, (
+                subscription['status'],
+                subscription['cancel_at_period_end'],
+                subscription['current_period_start'],
+                subscription['current_period_end'],
+                subscription_id
+            ))
+
+
+webhook_processor = WebhookProcessor(create_webhook_store(), {
+    'checkout.session.completed': handle_checkout_session,
+    'invoice.payment_succeeded': handle_payment_succeeded,
+    'customer.subscription.deleted': handle_subscription_deleted,
+    'customer.subscription.updated': handle_subscription_updated
+})
+if SERVING:
+    webhook_processor.start()
 
 # Translation endpoints
 @app.route('/api/translate', methods=['POST'])
@@ -395,27 +554,29 @@ def translate_document(current_user):
         file.save(original_path)
         logger.info(f"Saved uploaded file to {original_path}")
 
-        # Process file in chunks with progress
+        # Extract, translate and reassemble chunks as a pipeline, reserving
+        # quota chunk by chunk
+        hold = quota.hold(current_user['id'])
         try:
-            translated_chunks = []
-            total_size = os.path.getsize(original_path)
-            processed_size = 0
-            
-            for chunk in file_processor.extract_large_text(original_path):
-                chunk_size = len(chunk.encode('utf-8'))
-                processed_size += chunk_size
-                
-                translated = translator.translate_large_text(
-                    text=chunk,
-                    target_lang=target_lang,
-                    source_lang=source_lang
-                )
-                translated_chunks.append(translated)
-            
-            translated_text = " ".join(translated_chunks)
-            if not translated_text.strip():
+            result = document_pipeline.run(
+                original_path,
+                target_lang=target_lang,
+                source_lang=source_lang,
+                quota=hold
+            )
+            processed_size = result.stats.extracted_bytes
+            translated_text = result.text
+            if not result.complete:
+                raise result.errors[result.failed_chunks[0]]
+            # A spreadsheet of numbers has nothing to translate; it comes back
+            # unchanged and costs nothing
+            if result.segments is None and not translated_text.strip():
                 raise ValueError("Translation returned empty result")
+        except QuotaExceeded as e:
+            hold.release_all()
+            return quota_exceeded_response(e)
         except Exception as e:
+            hold.release_all()
             logger.error(f"Translation failed: {str(e)}")
             return jsonify({'error': f"Translation failed: {str(e)}"}), 500
 
@@ -424,15 +585,17 @@ def translate_document(current_user):
             translated_path = file_processor.reconstruct_document(
                 original_path=original_path,
                 translated_text=translated_text,
-                target_lang=target_lang
+                target_lang=target_lang,
+                segments=result.segments
             )
             logger.info(f"Document reconstructed at {translated_path}")
         except Exception as e:
+            hold.release_all()
             logger.error(f"Document reconstruction failed: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
         # Record the translation
-        record_translation(
+        history_recorder.record(
             user_id=current_user['id'],
             source_text=f"File: {original_filename}",
             translated_text=f"Translated file: {original_filename}",
@@ -445,6 +608,7 @@ def translate_document(current_user):
             ip_address=request.remote_addr,
             user_agent=request.headers.get('User-Agent')
         )
+        hold.commit_all()
 
         # Return the translated file
         response = make_response(send_file(
@@ -452,6 +616,7 @@ def translate_document(current_user):
             as_attachment=True,
             download_name=f"translated_{original_filename}"
         ))
+        add_translation_notes(response, original_path)
         
         # Clean up files after sending
         @response.call_on_close
@@ -470,6 +635,85 @@ def translate_document(current_user):
         logger.error(f"Unexpected error: {str(e)}")
         return jsonify({'error': str(e)}), 500
     
+# Background translation jobs
+@app.route('/api/jobs', methods=['POST'])
+@token_required
+def create_job(current_user):
+    """Queue a document translation and return its id immediately"""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+    if not allowed_file(file.filename):
+        logger.error(f"Invalid file type: {file.filename}")
+        return jsonify({'error': 'File type not allowed'}), 400
+
+    try:
+        job = job_manager.submit(
+            user_id=current_user['id'],
+            file=file,
+            file_name=secure_filename(file.filename),
+            target_lang=request.form.get('target_lang', 'en'),
+            source_lang=request.form.get('source_lang', 'auto')
+        )
+    except Exception as e:
+        logger.error(f"Job submission failed: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    response = jsonify(job_to_dict(job))
+    response.headers['Location'] = f"/api/jobs/{job['id']}"
+    return response, 202
+
+def _get_user_job(job_id: str, current_user):
+    try:
+        job = job_manager.get(job_id)
+    except Exception as e:
+        logger.error(f"Job lookup failed: {str(e)}")
+        job = None
+    if not job or job['user_id'] != current_user['id']:
+        return None
+    return job
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_job(current_user, job_id):
+    job = _get_user_job(job_id, current_user)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    payload = job_to_dict(job)
+    if job['status'] == SUCCEEDED:
+        payload['notes'] = file_processor.reconstruction_notes(job['input_path'])
+    return jsonify(payload)
+
+@app.route('/api/jobs/<job_id>/retry', methods=['POST'])
+@token_required
+def retry_job(current_user, job_id):
+    """Requeue a failed job; chunks already translated are not redone"""
+    job = _get_user_job(job_id, current_user)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] != FAILED:
+        return jsonify({'error': f"Job is {job['status']}", 'job': job_to_dict(job)}), 409
+    job = job_manager.retry(job_id)
+    return jsonify(job_to_dict(job)), 202
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+@token_required
+def get_job_result(current_user, job_id):
+    job = _get_user_job(job_id, current_user)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] != SUCCEEDED:
+        return jsonify({'error': f"Job is {job['status']}", 'job': job_to_dict(job)}), 409
+    response = make_response(send_file(
+        job['result_path'],
+        as_attachment=True,
+        download_name=f"translated_{job['file_name']}"
+    ))
+    return add_translation_notes(response, job['input_path'])
+
 @app.route('/api/translate-text', methods=['POST'])
 @token_required
 def translate_text(current_user):
@@ -486,19 +730,26 @@ def translate_text(current_user):
     if not text:
         return jsonify({'error': 'No text to translate'}), 400
 
+    try:
+        reservation = quota.reserve(current_user['id'], len(text))
+    except QuotaExceeded as e:
+        return quota_exceeded_response(e)
+
     try:
         start_time = time.time()
         
         # Determine if we need chunked translation
-        if len(text) > 1000:
+        plan = translator.plan_chunks(text, target_lang, source_lang)
+        if plan.chunk_count > 1:
             # Use chunked translation for large texts
+            # A chunk that still fails fails the request, uncharged, rather
+            # than returning an error placeholder inside the translation
             translated_text = translator.translate_large_text(
                 text=text,
                 target_lang=target_lang,
                 source_lang=source_lang,
-                chunk_size=1500,  # Optimal chunk size
-                max_workers=2,     # Conservative parallelism
-                progress_callback=None
+                progress_callback=None,
+                strict=True
             )
         else:
             # Direct translation for small texts
@@ -512,7 +763,7 @@ def translate_text(current_user):
         logger.info(f"Translated {len(text)} chars in {duration:.2f}s")
         
         # Record the translation
-        record_translation(
+        history_recorder.record(
             user_id=current_user['id'],
             source_text=text[:500] + ("..." if len(text) > 500 else ""),
             translated_text=translated_text[:500] + ("..." if len(translated_text) > 500 else ""),
@@ -523,9 +774,10 @@ def translate_text(current_user):
             ip_address=request.remote_addr,
             user_agent=request.headers.get('User-Agent')
         )
+        quota.commit(reservation)
         
         # Get updated usage stats
-        usage_stats = get_user_usage_stats(current_user['id'])
+        usage_stats = history_recorder.usage_stats(current_user['id'])
             
         return jsonify({
             'translatedText': translated_text,
@@ -535,8 +787,107 @@ def translate_text(current_user):
             'usage': usage_stats
         })
     except Exception as e:
+        # No-op if the reservation was already committed
+        quota.release(reservation)
         logger.error(f"Translation error: {str(e)}")
         return jsonify({'error': str(e)}), 500
+
+@app.route('/api/translate-text/plan', methods=['POST'])
+@token_required
+def plan_text_translation(current_user):
+    """Show how a text would be chunked, without translating it"""
+    data = request.get_json()
+    
+    if not data or not data.get('text'):
+        return jsonify({'error': 'No text to translate'}), 400
+
+    plan = translator.plan_chunks(
+        data['text'],
+        data.get('target', 'en'),
+        data.get('source', 'auto'),
+        request_tokens=data.get('request_tokens')
+    )
+    return jsonify(plan.as_dict())
+
+@app.route('/api/translate-text/stream', methods=['POST'])
+@token_required
+def translate_text_stream(current_user):
+    """Server-Sent Events variant of /api/translate-text"""
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    text = data.get('text')
+    target_lang = data.get('target', 'en')
+    source_lang = data.get('source', 'auto')
+
+    if not text:
+        return jsonify({'error': 'No text to translate'}), 400
+
+    # Checked before the stream opens so the client still gets a status code
+    try:
+        reservation = quota.reserve(current_user['id'], len(text))
+    except QuotaExceeded as e:
+        return quota_exceeded_response(e)
+
+    def sse(payload: dict, event: Optional[str] = None) -> str:
+        prefix = f"event: {event}\n" if event else ""
+        return f"{prefix}data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    def generate():
+        start_time = time.time()
+        parts = []
+        try:
+            for delta in translator.stream_large_text(
+                text=text,
+                target_lang=target_lang,
+                source_lang=source_lang
+            ):
+                parts.append(delta)
+                yield sse({'delta': delta})
+        except Exception as e:
+            quota.release(reservation)
+            logger.error(f"Streaming translation error: {str(e)}")
+            yield sse({'error': str(e)}, event='error')
+            return
+        except GeneratorExit:
+            # Client went away mid-stream
+            quota.release(reservation)
+            raise
+
+        translated_text = "".join(parts)
+        duration = time.time() - start_time
+        logger.info(f"Streamed {len(text)} chars in {duration:.2f}s")
+
+        history_recorder.record(
+            user_id=current_user['id'],
+            source_text=text[:500] + ("..." if len(text) > 500 else ""),
+            translated_text=translated_text[:500] + ("..." if len(translated_text) > 500 else ""),
+            source_lang=source_lang,
+            target_lang=target_lang,
+            character_count=len(text),
+            session_id=request.headers.get('X-Session-ID'),
+            ip_address=request.remote_addr,
+            user_agent=request.headers.get('User-Agent')
+        )
+        quota.commit(reservation)
+
+        yield sse({
+            'sourceLang': source_lang,
+            'targetLang': target_lang,
+            'charactersTranslated': len(text),
+            'usage': history_recorder.usage_stats(current_user['id'])
+        }, event='done')
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Don't let nginx buffer the stream
+        }
+    )
         
 
 if __name__ == '__main__':
@@ -0,0 +1,214 @@
+"""
+Wall time, peak RSS and allocations of FileProcessor's extractors and
+reconstruction across formats and file sizes.
+
+    cd backend && python -m benchmarks.bench_file_processor --sizes 1KB,1MB,10MB --save-baseline baseline.json
+    python -m benchmarks.bench_file_processor --sizes 1KB,1MB,10MB --compare baseline.json
+
+Every case runs in its own interpreter so peak RSS belongs to that case
+alone. Time is the best of ``--repeat`` runs; allocations come from a
+separate tracemalloc run, which would otherwise slow the timed ones.
+Reconstruction is fed the extracted text (or segments, for formats patched
+in place), as an echo translation would be.
+With ``--compare`` the exit status is 1 when any case got slower or bigger
+than ``--threshold``, ignoring changes too small to tell from noise.
+"""
+import os
+import gc
+import sys
+import json
+import time
+import shutil
+import resource
+import argparse
+import subprocess
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.fixtures import FORMATS, generate_all, parse_size, format_size
+
+OPERATIONS = ("extract", "reconstruct")
+# Compared against the baseline: how each is printed, and the absolute
+# change below which it is noise whatever the percentage
+COMPARED = (("seconds", "{:.4f}", 0.005), ("peak_rss_mb", "{:.1f}", 2.0), ("alloc_peak_mb", "{:.2f}", 0.5))
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def _operation(operation: str, path: str) -> Callable[[], int]:
+    """The measured call; it returns how many chunks or characters it handled"""
+    from file_processor import FileProcessor
+    from chunking import ChunkPlanner
+    from segments import collect_translations
+    processor = FileProcessor()
+
+    segmented = processor.supports_segments(path)
+
+    def extract() -> List[str]:
+        if segmented:
+            return list(processor.extract_segment_chunks(path, ChunkPlanner()))
+        return list(processor.extract_large_text(path, ChunkPlanner()))
+
+    if operation == "extract":
+        return lambda: len(extract())
+
+    segments = collect_translations(extract()) if segmented else None
+    translated = "\n".join(segments.values()) if segmented else "\n".join(extract())
+
+    def reconstruct() -> int:
+        output_path = processor.reconstruct_document(path, translated, "fr", segments=segments)
+        shutil.rmtree(os.path.dirname(output_path), ignore_errors=True)
+        return len(translated)
+    return reconstruct
+
+
+def run_case(operation: str, path: str, repeat: int) -> Dict[str, float]:
+    """Measure one case in this process"""
+    import logging
+    logging.disable(logging.INFO)
+    call = _operation(operation, path)
+    gc.collect()
+    baseline_rss = _peak_rss_mb()
+
+    best = float("inf")
+    units = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        units = call()
+        best = min(best, time.perf_counter() - started)
+    peak_rss = _peak_rss_mb()
+
+    gc.collect()
+    tracemalloc.start()
+    call()
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    top = snapshot.statistics("filename")[:3]
+
+    return {
+        'seconds': round(best, 6),
+        'peak_rss_mb': round(peak_rss, 1),
+        'rss_growth_mb': round(peak_rss - baseline_rss, 1),
+        'alloc_peak_mb': round(alloc_peak / 1024 / 1024, 2),
+        'units': units,
+        'retained_top': [f"{stat.traceback[0].filename}: {stat.size // 1024} KB" for stat in top]
+    }
+
+
+def run_isolated(operation: str, path: str, repeat: int, timeout: float) -> Dict[str, object]:
+    """Run one case in a fresh interpreter"""
+    command = [sys.executable, "-m", "benchmarks.bench_file_processor",
+               "--run-case", operation, path, "--repeat", str(repeat)]
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        completed = subprocess.run(command, cwd=backend_dir, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {'error': f"timed out after {timeout}s"}
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def case_key(result: Dict[str, object]) -> Tuple[str, str, str]:
+    return result['operation'], result['format'], result['size']
+
+
+def compare(results: List[Dict[str, object]], baseline: List[Dict[str, object]], threshold: float) -> bool:
+    """Print changes against the baseline; True if anything regressed"""
+    previous = {case_key(result): result for result in baseline}
+    regressed = False
+    print(f"{'operation':<13}{'format':<7}{'size':<8}{'metric':<15}{'baseline':>12}{'current':>12}{'change':>9}")
+    for result in results:
+        before = previous.get(case_key(result))
+        if before is None or 'error' in result or 'error' in before:
+            continue
+        for metric, shown, noise in COMPARED:
+            old, new = before[metric], result[metric]
+            change = (new - old) / old if old else 0.0
+            flag = ""
+            if abs(new - old) < noise:
+                pass
+            elif change > threshold:
+                flag = "  REGRESSION"
+                regressed = True
+            elif change < -threshold:
+                flag = "  improved"
+            print(
+                f"{result['operation']:<13}{result['format']:<7}{result['size']:<8}{metric:<15}"
+                f"{shown.format(old):>12}{shown.format(new):>12}{change:>+9.1%}{flag}"
+            )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--sizes", default="1KB,100KB,1MB", help="Comma separated, up to 50MB")
+    parser.add_argument("--operations", default=",".join(OPERATIONS))
+    parser.add_argument("--fixtures-dir", default="fixtures", help="Generated fixtures are kept here")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=1800.0, help="Per case, in seconds")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    parser.add_argument("--save-baseline", default=None, help="Write results to this file")
+    parser.add_argument("--compare", default=None, help="Compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change reported as a regression")
+    parser.add_argument("--run-case", nargs=2, metavar=("OPERATION", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        operation, path = args.run_case
+        print(json.dumps(run_case(operation, path, args.repeat)))
+        return
+
+    formats = [value.strip() for value in args.formats.split(",") if value.strip()]
+    operations = [value.strip() for value in args.operations.split(",") if value.strip()]
+    if set(formats) - set(FORMATS) or set(operations) - set(OPERATIONS):
+        parser.error("Unknown format or operation")
+    try:
+        sizes = [parse_size(value) for value in args.sizes.split(",") if value.strip()]
+    except ValueError as e:
+        parser.error(str(e))
+
+    fixtures = generate_all(formats, sizes, args.fixtures_dir)
+    results = []
+    for (file_format, size), path in fixtures.items():
+        for operation in operations:
+            result: Dict[str, object] = {
+                'operation': operation,
+                'format': file_format,
+                'size': format_size(size),
+                'file_bytes': os.path.getsize(path)
+            }
+            result.update(run_isolated(operation, path, args.repeat, args.timeout))
+            results.append(result)
+            if not args.json:
+                if 'error' in result:
+                    print(f"{operation:<13}{file_format:<7}{format_size(size):<8}error: {result['error']}")
+                else:
+                    print(
+                        f"{operation:<13}{file_format:<7}{format_size(size):<8}{result['seconds']:>10.4f}s"
+                        f"{result['peak_rss_mb']:>9.1f} MB rss{result['rss_growth_mb']:>+8.1f}"
+                        f"{result['alloc_peak_mb']:>9.1f} MB alloc"
+                    )
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+    regressed: Optional[bool] = None
+    if args.compare:
+        with open(args.compare) as f:
+            regressed = compare(results, json.load(f), args.threshold)
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
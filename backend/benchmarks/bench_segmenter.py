@@ -0,0 +1,170 @@
+"""
+Segmenter vs. the nested split/concatenate chunker it replaced.
+
+    cd backend && python -m benchmarks.bench_segmenter --size-mb 4
+"""
+import re
+import json
+import time
+import random
+import argparse
+from typing import Callable, Dict, Generator, List
+
+from segmenter import Segmenter
+from chunking import ChunkPlanner
+
+WORDS = ["translation", "contract", "the", "party", "shall", "agreement", "of", "and",
+         "clause", "payment", "notice", "term", "section", "provided", "that", "Mr.", "Dr."]
+CJK_WORDS = ["合同", "双方", "付款", "条款", "通知", "期限"]
+
+
+def legacy_split_text_into_chunks(text: str, chunk_size: int) -> Generator[str, None, None]:
+    """DeepSeekTranslator._split_text_into_chunks before the segmenter"""
+    if len(text) <= chunk_size:
+        yield text
+        return
+
+    paragraphs = text.split('\n\n')
+    current_chunk = ""
+
+    for para in paragraphs:
+        if len(current_chunk) + len(para) > chunk_size:
+            if current_chunk:
+                yield current_chunk
+                current_chunk = para
+            else:
+                sentences = para.split('. ')
+                for sent in sentences:
+                    if len(current_chunk) + len(sent) > chunk_size:
+                        if current_chunk:
+                            yield current_chunk
+                            current_chunk = sent
+                        else:
+                            words = sent.split(' ')
+                            for word in words:
+                                if len(current_chunk) + len(word) > chunk_size:
+                                    if current_chunk:
+                                        yield current_chunk
+                                        current_chunk = word
+                                    else:
+                                        for i in range(0, len(word), chunk_size):
+                                            yield word[i:i+chunk_size]
+                                else:
+                                    current_chunk += ' ' + word if current_chunk else word
+                    else:
+                        current_chunk += '. ' + sent if current_chunk else sent
+        else:
+            current_chunk += '\n\n' + para if current_chunk else para
+
+    if current_chunk:
+        yield current_chunk
+
+
+def legacy_regex_chunks(text: str, chunk_size: int) -> Generator[str, None, None]:
+    """FileProcessor._extract_smart_chunks_from_txt's per-line logic before the segmenter"""
+    current_chunk = ""
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if len(current_chunk) + len(line) > chunk_size:
+            if current_chunk:
+                yield current_chunk
+                current_chunk = line
+            else:
+                sentences = re.split(r'(?<=[.!?])\s+', line)
+                for sent in sentences:
+                    if len(current_chunk) + len(sent) > chunk_size:
+                        if current_chunk:
+                            yield current_chunk
+                            current_chunk = sent
+                        else:
+                            words = sent.split()
+                            for word in words:
+                                if len(current_chunk) + len(word) > chunk_size:
+                                    if current_chunk:
+                                        yield current_chunk
+                                        current_chunk = word
+                                    else:
+                                        for i in range(0, len(word), chunk_size):
+                                            yield word[i:i+chunk_size]
+                                else:
+                                    current_chunk += ' ' + word if current_chunk else word
+                    else:
+                        current_chunk += ' ' + sent if current_chunk else sent
+        else:
+            current_chunk += '\n' + line if current_chunk else line
+    if current_chunk:
+        yield current_chunk
+
+
+def make_text(size: int, cjk: bool, paragraph_sentences: int, seed: int = 7) -> str:
+    """Synthetic prose of about ``size`` characters"""
+    rng = random.Random(seed)
+    vocabulary = CJK_WORDS if cjk else WORDS
+    joiner = "" if cjk else " "
+    terminator = "。" if cjk else ". "
+    paragraphs: List[str] = []
+    length = 0
+    while length < size:
+        sentences = []
+        for _ in range(rng.randint(1, paragraph_sentences)):
+            words = [rng.choice(vocabulary) for _ in range(rng.randint(5, 30))]
+            sentences.append(joiner.join(words) + terminator)
+        paragraph = "".join(sentences).strip()
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+    return "\n\n".join(paragraphs)[:size]
+
+
+def run(name: str, fn: Callable[[], List[str]], repeat: int) -> Dict[str, float]:
+    best = float("inf")
+    chunks: List[str] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = fn()
+        best = min(best, time.perf_counter() - start)
+    return {"case": name, "seconds": round(best, 4), "chunks": len(chunks)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=4.0)
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Character budget for the like-for-like runs")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    results = []
+    for label, cjk, paragraph_sentences in [
+        ("english", False, 6),
+        ("english-long-paragraphs", False, 400),
+        ("cjk", True, 6),
+    ]:
+        text = make_text(size, cjk, paragraph_sentences)
+        segmenter = Segmenter("zh" if cjk else "en")
+        planner = ChunkPlanner(source_lang="zh" if cjk else "en", target_lang="en" if cjk else "fr")
+        cases = [
+            ("legacy split_text_into_chunks", lambda: list(legacy_split_text_into_chunks(text, args.chunk_size))),
+            ("legacy per-line regex chunker", lambda: list(legacy_regex_chunks(text, args.chunk_size))),
+            ("segmenter (chars)", lambda: list(segmenter.chunks(text, args.chunk_size))),
+            ("segmenter spans only (chars)", lambda: list(segmenter.segment(text, args.chunk_size))),
+            ("planner (tokens)", lambda: list(planner.split(text))),
+        ]
+        for name, fn in cases:
+            result = run(name, fn, args.repeat)
+            result["input"] = label
+            result["mb"] = round(len(text) / 1024 / 1024, 2)
+            results.append(result)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'input':<26}{'case':<34}{'seconds':>10}{'chunks':>10}")
+    for result in results:
+        print(f"{result['input']:<26}{result['case']:<34}{result['seconds']:>10}{result['chunks']:>10}")
+
+
+if __name__ == '__main__':
+    main()
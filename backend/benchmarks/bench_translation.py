@@ -0,0 +1,309 @@
+"""
+End-to-end translation throughput against the mock DeepSeek server.
+
+In-process, through DeepSeekTranslator (starts its own mock):
+
+    cd backend && python -m benchmarks.bench_translation translator-text translator-document \\
+        --requests 200 --concurrency 16 --latency lognormal:0.4:0.5 --rate-429 0.02
+
+Through a running app, which must have been started against the mock:
+
+    python -m benchmarks.mock_deepseek --port 8765 &
+    DEEPSEEK_BASE_URL=http://127.0.0.1:8765/chat/completions python app.py &
+    python -m benchmarks.bench_translation api-text api-document \\
+        --app-url http://127.0.0.1:8000 --mock-url http://127.0.0.1:8765 --username bench --password ...
+
+``--output results.jsonl`` appends one record per scenario, stamped with
+the time and git commit, for tracking runs over time.
+"""
+import io
+import json
+import math
+import time
+import argparse
+import subprocess
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from deepseek_api import DeepSeekTranslator
+from rate_limiter import RateLimiter
+from benchmarks.bench_segmenter import make_text
+from benchmarks.mock_deepseek import MockDeepSeek, add_settings_arguments, settings_from_args
+
+SCENARIOS = ("translator-text", "translator-document", "api-text", "api-document")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class UpstreamStats:
+    """Request counts from the mock, in-process or over HTTP"""
+
+    def __init__(self, mock: Optional[MockDeepSeek] = None, url: Optional[str] = None):
+        self.mock = mock
+        self.url = url.rstrip("/") if url else None
+
+    def reset(self):
+        if self.mock is not None:
+            self.mock.reset_stats()
+        elif self.url:
+            requests.post(f"{self.url}/stats/reset", timeout=5).raise_for_status()
+
+    def read(self) -> Dict[str, float]:
+        if self.mock is not None:
+            return dict(self.mock.stats)
+        if self.url:
+            response = requests.get(f"{self.url}/stats", timeout=5)
+            response.raise_for_status()
+            return response.json()
+        return {}
+
+
+def run_load(call: Callable[[int], int], count: int, concurrency: int) -> Dict[str, object]:
+    """Run ``call(i)`` ``count`` times on ``concurrency`` threads; it returns characters sent"""
+    latencies: List[float] = []
+    characters = 0
+    failures: Dict[str, int] = {}
+
+    def timed_call(index: int):
+        started = time.perf_counter()
+        try:
+            sent = call(index)
+            return time.perf_counter() - started, sent, None
+        except Exception as e:
+            return time.perf_counter() - started, 0, type(e).__name__
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for elapsed, sent, error in executor.map(timed_call, range(count)):
+            if error is None:
+                latencies.append(elapsed)
+                characters += sent
+            else:
+                failures[error] = failures.get(error, 0) + 1
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': count,
+        'ok': len(latencies),
+        'failed': count - len(latencies),
+        'failures': failures,
+        'wall_seconds': round(wall, 3),
+        'throughput_rps': round(len(latencies) / wall, 3) if wall else 0.0,
+        'characters_per_second': round(characters / wall, 1) if wall else 0.0,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+            'p50': round(percentile(latencies, 50) * 1000, 1),
+            'p95': round(percentile(latencies, 95) * 1000, 1),
+            'p99': round(percentile(latencies, 99) * 1000, 1),
+            'max': round(latencies[-1] * 1000, 1) if latencies else 0.0
+        }
+    }
+
+
+def make_texts(count: int, size: int, seed: int) -> List[str]:
+    return [make_text(size, cjk=False, paragraph_sentences=6, seed=seed + i) for i in range(count)]
+
+
+def make_document(text: str, file_format: str) -> bytes:
+    if file_format == "txt":
+        return text.encode("utf-8")
+    from docx import Document
+    document = Document()
+    for paragraph in text.split("\n\n"):
+        document.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+class AppClient:
+    def __init__(self, base_url: str, token: str, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {token}"
+
+    @classmethod
+    def login(cls, base_url: str, username: str, password: str, timeout: float) -> "AppClient":
+        response = requests.post(
+            f"{base_url.rstrip('/')}/api/token",
+            data={'username': username, 'password': password},
+            timeout=timeout
+        )
+        response.raise_for_status()
+        return cls(base_url, response.json()["access_token"], timeout)
+
+    def translate_text(self, text: str, target_lang: str):
+        response = self.session.post(
+            f"{self.base_url}/api/translate-text",
+            json={'text': text, 'target_lang': target_lang},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+    def translate_document(self, name: str, content: bytes, target_lang: str):
+        response = self.session.post(
+            f"{self.base_url}/api/translate",
+            files={'file': (name, content)},
+            data={'target_lang': target_lang},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+
+def build_calls(scenario: str, args: argparse.Namespace, translator: Optional[DeepSeekTranslator],
+                client: Optional[AppClient]) -> Callable[[int], int]:
+    if scenario.endswith("-text"):
+        texts = make_texts(min(args.requests, 50), args.text_chars, args.seed)
+    else:
+        texts = make_texts(min(args.documents, 10), int(args.doc_kb * 1024), args.seed)
+
+    if scenario == "translator-text":
+        def call(i: int) -> int:
+            translator.translate_text(texts[i % len(texts)], args.target_lang)
+            return len(texts[i % len(texts)])
+    elif scenario == "translator-document":
+        def call(i: int) -> int:
+            text = texts[i % len(texts)]
+            translator.translate_large_text(text, args.target_lang, strict=True)
+            return len(text)
+    elif scenario == "api-text":
+        def call(i: int) -> int:
+            client.translate_text(texts[i % len(texts)], args.target_lang)
+            return len(texts[i % len(texts)])
+    else:
+        documents = [make_document(text, args.doc_format) for text in texts]
+
+        def call(i: int) -> int:
+            client.translate_document(f"bench-{i}.{args.doc_format}", documents[i % len(documents)], args.target_lang)
+            return len(texts[i % len(texts)])
+    return call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="+", choices=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=100, help="Calls per text scenario")
+    parser.add_argument("--documents", type=int, default=10, help="Calls per document scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent callers")
+    parser.add_argument("--text-chars", type=int, default=500)
+    parser.add_argument("--doc-kb", type=float, default=20.0)
+    parser.add_argument("--doc-format", choices=("txt", "docx"), default="txt")
+    parser.add_argument("--target-lang", default="fr")
+    parser.add_argument("--requests-per-second", type=float, default=None,
+                        help="Translator rate limit for in-process runs, DEEPSEEK_REQUESTS_PER_SECOND if unset")
+    parser.add_argument("--app-url", default=None)
+    parser.add_argument("--token", default=None)
+    parser.add_argument("--username", default=None)
+    parser.add_argument("--password", default=None)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-call timeout against the app")
+    parser.add_argument("--mock-url", default=None, help="Use a running mock instead of starting one")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    parser.add_argument("--output", default=None, help="Append results as JSON lines to this file")
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+    if args.seed is None:
+        args.seed = 7
+
+    translator = None
+    client = None
+    mock = None
+    if args.mock_url:
+        upstream = UpstreamStats(url=args.mock_url)
+    else:
+        mock = MockDeepSeek(settings_from_args(args))
+        upstream = UpstreamStats(mock=mock)
+        mock_url = mock.start()
+
+    if any(scenario.startswith("translator") for scenario in args.scenarios):
+        completions_url = f"{args.mock_url.rstrip('/')}/chat/completions" if args.mock_url else mock_url
+        rate_limiter = None
+        if args.requests_per_second:
+            rate_limiter = RateLimiter(requests_per_second=args.requests_per_second)
+        translator = DeepSeekTranslator(
+            api_key="mock",
+            base_url=completions_url,
+            rate_limiter=rate_limiter
+        )
+    if any(scenario.startswith("api") for scenario in args.scenarios):
+        if not args.app_url:
+            parser.error("api scenarios need --app-url")
+        if mock is not None:
+            parser.error("api scenarios need --mock-url, the mock the app was started against")
+        if args.token:
+            client = AppClient(args.app_url, args.token, args.timeout)
+        elif args.username and args.password:
+            client = AppClient.login(args.app_url, args.username, args.password, args.timeout)
+        else:
+            parser.error("api scenarios need --token or --username and --password")
+
+    results = []
+    for scenario in args.scenarios:
+        count = args.requests if scenario.endswith("-text") else args.documents
+        call = build_calls(scenario, args, translator, client)
+        upstream.reset()
+        result = run_load(call, count, args.concurrency)
+        results.append({
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'commit': git_commit(),
+            'scenario': scenario,
+            'config': {
+                'concurrency': args.concurrency,
+                'text_chars': args.text_chars,
+                'doc_kb': args.doc_kb,
+                'doc_format': args.doc_format,
+                'requests_per_second': args.requests_per_second,
+                'mock': vars(mock.settings) if mock is not None else args.mock_url
+            },
+            **result,
+            'upstream': upstream.read()
+        })
+
+    if translator is not None:
+        translator.close()
+    if mock is not None:
+        mock.stop()
+
+    if args.output:
+        with open(args.output, "a") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'scenario':<22}{'ok/total':>10}{'req/s':>9}{'chars/s':>11}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'upstream':>10}{'429s':>7}{'5xx':>6}")
+    for result in results:
+        latency = result['latency_ms']
+        upstream_counts = result['upstream']
+        print(
+            f"{result['scenario']:<22}{str(result['ok']) + '/' + str(result['requests']):>10}"
+            f"{result['throughput_rps']:>9}{result['characters_per_second']:>11}"
+            f"{latency['p50']:>9}{latency['p95']:>9}{latency['p99']:>9}"
+            f"{upstream_counts.get('requests', '-'):>10}"
+            f"{upstream_counts.get('rate_limited', 0) + upstream_counts.get('concurrency_rejected', 0):>7}"
+            f"{upstream_counts.get('server_errors', '-'):>6}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Synthetic PDF, DOCX, PPTX, XLSX and TXT uploads of a given file size.
+
+    cd backend && python -m benchmarks.fixtures --sizes 1KB,1MB,10MB --formats docx,pdf --out-dir /tmp/fixtures
+
+Sizes are hit approximately: each format is calibrated once by writing two
+small samples and fitting bytes = overhead + ratio * characters. Formats
+with a fixed container overhead (an empty DOCX is already ~36 KB) cannot go
+below it, so the smallest fixtures come out bigger than asked. Existing
+fixtures are reused, so generating the large ones is a one-off cost.
+"""
+import os
+import re
+import argparse
+import logging
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.bench_segmenter import make_text
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FORMATS = ("txt", "docx", "pptx", "xlsx", "pdf")
+# Upload limit, app.MAX_FILE_SIZE
+MAX_FIXTURE_BYTES = 50 * 1024 * 1024
+PARAGRAPH_SENTENCES = 6
+_UNITS = {"B": 1, "KB": 1024, "MB": 1024 * 1024}
+
+
+def parse_size(value: str) -> int:
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*(B|KB|MB)?\s*", value, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Bad size: {value}")
+    size = int(float(match.group(1)) * _UNITS[(match.group(2) or "B").upper()])
+    if size > MAX_FIXTURE_BYTES:
+        raise ValueError(f"{value} is over the {MAX_FIXTURE_BYTES // 1024 // 1024} MB upload limit")
+    return size
+
+
+def format_size(size: int) -> str:
+    if size >= 1024 * 1024:
+        return f"{size / 1024 / 1024:g}MB"
+    if size >= 1024:
+        return f"{size / 1024:g}KB"
+    return f"{size}B"
+
+
+def _paragraphs(characters: int, seed: int) -> List[str]:
+    return make_text(max(characters, 1), cjk=False, paragraph_sentences=PARAGRAPH_SENTENCES, seed=seed).split("\n\n")
+
+
+def write_txt(path: str, characters: int, seed: int = 7):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(_paragraphs(characters, seed)))
+
+
+def write_docx(path: str, characters: int, seed: int = 7):
+    from docx import Document
+    document = Document()
+    for number, paragraph in enumerate(_paragraphs(characters, seed)):
+        if number % 20 == 0:
+            document.add_heading(paragraph[:60], level=2)
+        document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def write_pptx(path: str, characters: int, seed: int = 7):
+    from pptx import Presentation
+    presentation = Presentation()
+    layout = presentation.slide_layouts[1]  # Title and content
+    paragraphs = _paragraphs(characters, seed)
+    for start in range(0, len(paragraphs), 3):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = paragraphs[start][:60]
+        slide.placeholders[1].text = "\n".join(paragraphs[start:start + 3])
+    presentation.save(path)
+
+
+def write_xlsx(path: str, characters: int, seed: int = 7):
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(["id", "description", "notes", "amount"])
+    for number, paragraph in enumerate(_paragraphs(characters, seed)):
+        middle = len(paragraph) // 2
+        sheet.append([number, paragraph[:middle], paragraph[middle:], number * 1.5])
+    workbook.save(path)
+
+
+def write_pdf(path: str, characters: int, seed: int = 7):
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Helvetica", size=11)
+    for paragraph in _paragraphs(characters, seed):
+        pdf.multi_cell(0, 6, text=paragraph)
+        pdf.ln(3)
+    pdf.output(path)
+
+
+WRITERS: Dict[str, Callable[[str, int, int], None]] = {
+    "txt": write_txt,
+    "docx": write_docx,
+    "pptx": write_pptx,
+    "xlsx": write_xlsx,
+    "pdf": write_pdf,
+}
+
+
+def calibrate(file_format: str, out_dir: str) -> Tuple[float, float]:
+    """Fit (overhead bytes, bytes per character) from two small samples"""
+    points = []
+    for characters in (16 * 1024, 128 * 1024):
+        path = os.path.join(out_dir, f".calibrate.{file_format}")
+        WRITERS[file_format](path, characters)
+        points.append((characters, os.path.getsize(path)))
+        os.remove(path)
+    (c1, b1), (c2, b2) = points
+    ratio = (b2 - b1) / (c2 - c1)
+    return max(0.0, b1 - ratio * c1), ratio
+
+
+def fixture_path(out_dir: str, file_format: str, size: int) -> str:
+    return os.path.join(out_dir, f"fixture-{format_size(size)}.{file_format}")
+
+
+def generate(file_format: str, size: int, out_dir: str, calibration: Dict[str, Tuple[float, float]]) -> str:
+    """Write one fixture of about ``size`` bytes, or reuse it"""
+    path = fixture_path(out_dir, file_format, size)
+    if os.path.exists(path):
+        return path
+    if file_format not in calibration:
+        calibration[file_format] = calibrate(file_format, out_dir)
+    overhead, ratio = calibration[file_format]
+    characters = max(200, int((size - overhead) / ratio))
+    logger.info(f"Writing {path} (~{characters} characters)")
+    WRITERS[file_format](path, characters)
+    return path
+
+
+def generate_all(formats: List[str], sizes: List[int], out_dir: str) -> Dict[Tuple[str, int], str]:
+    os.makedirs(out_dir, exist_ok=True)
+    calibration: Dict[str, Tuple[float, float]] = {}
+    return {
+        (file_format, size): generate(file_format, size, out_dir, calibration)
+        for file_format in formats
+        for size in sizes
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--sizes", default="1KB,100KB,1MB,10MB", help="Comma separated, up to 50MB")
+    parser.add_argument("--out-dir", default="fixtures")
+    args = parser.parse_args()
+
+    formats = [value.strip() for value in args.formats.split(",") if value.strip()]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"Unknown formats: {', '.join(sorted(unknown))}")
+    try:
+        sizes = [parse_size(value) for value in args.sizes.split(",") if value.strip()]
+    except ValueError as e:
+        parser.error(str(e))
+
+    for (file_format, size), path in generate_all(formats, sizes, args.out_dir).items():
+        print(f"{path}\t{os.path.getsize(path)} bytes (asked {size})")
+
+
+if __name__ == '__main__':
+    main()
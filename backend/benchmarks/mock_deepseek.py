@@ -0,0 +1,276 @@
+"""
+Local stand-in for DeepSeek's /chat/completions, for load tests that must
+not spend API credit. Replies echo the text to translate, so documents
+round-trip with realistic sizes.
+
+    cd backend && python -m benchmarks.mock_deepseek --port 8765 \\
+        --latency lognormal:0.4:0.5 --token-delay-ms 2 --rate-429 0.02 --rate-5xx 0.01
+    DEEPSEEK_BASE_URL=http://127.0.0.1:8765/chat/completions python app.py
+
+Latency specs: ``fixed:S``, ``uniform:MIN:MAX``, ``normal:MEAN:STDDEV``,
+``lognormal:MEDIAN:SIGMA`` and ``exponential:MEAN``, all in seconds.
+GET /stats returns request counts per outcome, POST /stats/reset clears them.
+"""
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import threading
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from aiohttp import web
+
+from chunking import estimate_tokens
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Characters per streamed delta, about what the real API sends
+STREAM_DELTA_CHARS = 12
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Turn a latency spec into a sampler returning seconds"""
+    kind, _, rest = spec.partition(":")
+    try:
+        params = [float(value) for value in rest.split(":")] if rest else []
+    except ValueError:
+        raise ValueError(f"Bad latency spec: {spec}")
+    expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}
+    if kind not in expected or len(params) != expected[kind]:
+        raise ValueError(f"Bad latency spec: {spec}")
+    if kind == "fixed":
+        return lambda rng: params[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(params[0], params[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(params[0], params[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(params[0]), params[1])
+    return lambda rng: rng.expovariate(1 / params[0])
+
+
+@dataclass
+class MockSettings:
+    latency: str = "fixed:0.05"  # Time to first token
+    token_delay_ms: float = 0.0  # Extra per completion token, as generation takes
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    rate_timeout: float = 0.0  # Requests that hang without answering
+    timeout_seconds: float = 60.0  # How long a hung request hangs
+    retry_after: float = 1.0  # Retry-After sent with injected 429s
+    max_concurrency: int = 0  # Answer 429 above this many in-flight requests, 0 for no limit
+    seed: Optional[int] = None
+
+
+class MockDeepSeek:
+    """
+    The mock server. ``start()`` runs it on a background thread for use
+    from a benchmark in the same process; ``main()`` runs it standalone.
+    """
+
+    def __init__(self, settings: Optional[MockSettings] = None):
+        self.settings = settings or MockSettings()
+        self.sample_latency = parse_latency(self.settings.latency)
+        self.rng = random.Random(self.settings.seed)
+        self.stats: Dict[str, float] = {}
+        self.in_flight = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {
+            'requests': 0,
+            'ok': 0,
+            'streamed': 0,
+            'rate_limited': 0,
+            'server_errors': 0,
+            'timeouts': 0,
+            'concurrency_rejected': 0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'max_in_flight': 0
+        }
+
+    def create_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/chat/completions", self.handle_completion)
+        app.router.add_post("/v1/chat/completions", self.handle_completion)
+        app.router.add_get("/stats", self.handle_stats)
+        app.router.add_post("/stats/reset", self.handle_reset)
+        return app
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({**self.stats, 'in_flight': self.in_flight})
+
+    async def handle_reset(self, request: web.Request) -> web.Response:
+        self.reset_stats()
+        return web.json_response({'status': 'reset'})
+
+    async def handle_completion(self, request: web.Request) -> web.StreamResponse:
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return web.json_response({'error': {'message': 'Missing API key'}}, status=401)
+        body = await request.json()
+        self.stats['requests'] += 1
+        self.in_flight += 1
+        self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.in_flight)
+        try:
+            return await self._complete(request, body)
+        finally:
+            self.in_flight -= 1
+
+    async def _complete(self, request: web.Request, body: dict) -> web.StreamResponse:
+        settings = self.settings
+        if settings.max_concurrency and self.in_flight > settings.max_concurrency:
+            self.stats['concurrency_rejected'] += 1
+            return self._rate_limited()
+
+        roll = self.rng.random()
+        if roll < settings.rate_429:
+            self.stats['rate_limited'] += 1
+            return self._rate_limited()
+        roll -= settings.rate_429
+        if roll < settings.rate_5xx:
+            self.stats['server_errors'] += 1
+            await asyncio.sleep(self.sample_latency(self.rng))
+            status = self.rng.choice((500, 502, 503))
+            return web.json_response({'error': {'message': 'Injected server error'}}, status=status)
+        roll -= settings.rate_5xx
+        if roll < settings.rate_timeout:
+            self.stats['timeouts'] += 1
+            await asyncio.sleep(settings.timeout_seconds)
+            return web.json_response({'error': {'message': 'Injected timeout'}}, status=504)
+
+        prompt = body["messages"][-1]["content"]
+        output = self._translate(prompt)
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(output)
+        self.stats['prompt_tokens'] += prompt_tokens
+        self.stats['completion_tokens'] += completion_tokens
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+
+        await asyncio.sleep(self.sample_latency(self.rng))
+        if body.get("stream"):
+            self.stats['streamed'] += 1
+            return await self._stream(request, body, output, usage)
+
+        await asyncio.sleep(completion_tokens * settings.token_delay_ms / 1000)
+        self.stats['ok'] += 1
+        return web.json_response({
+            'id': f"mock-{self.stats['requests']}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get("model", "deepseek-chat"),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': output},
+                'finish_reason': 'stop'
+            }],
+            'usage': usage
+        })
+
+    async def _stream(self, request: web.Request, body: dict, output: str, usage: dict) -> web.StreamResponse:
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+        await response.prepare(request)
+        for start in range(0, len(output), STREAM_DELTA_CHARS):
+            delta = output[start:start + STREAM_DELTA_CHARS]
+            await asyncio.sleep(estimate_tokens(delta) * self.settings.token_delay_ms / 1000)
+            event = {'choices': [{'index': 0, 'delta': {'content': delta}, 'finish_reason': None}]}
+            await response.write(f"data: {json.dumps(event)}\n\n".encode())
+        if body.get("stream_options", {}).get("include_usage"):
+            await response.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        self.stats['ok'] += 1
+        return response
+
+    def _rate_limited(self) -> web.Response:
+        return web.json_response(
+            {'error': {'message': 'Rate limit reached'}},
+            status=429,
+            headers={'Retry-After': str(self.settings.retry_after)}
+        )
+
+    @staticmethod
+    def _translate(prompt: str) -> str:
+        """Echo the text the prompt asks to translate, markers and all"""
+        if "Text: " in prompt:
+            return prompt.split("Text: ", 1)[1]
+        marker = prompt.find("[[1]]")
+        if marker != -1:
+            return prompt[marker:]
+        return prompt
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve on a background thread and return the completions URL"""
+        loop = asyncio.new_event_loop()
+        self._runner = web.AppRunner(self.create_app(), access_log=None)
+        loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, host, port)
+        loop.run_until_complete(site.start())
+        bound_port = site._server.sockets[0].getsockname()[1]
+        threading.Thread(target=loop.run_forever, name="mock-deepseek", daemon=True).start()
+        self._loop = loop
+        return f"http://{host}:{bound_port}/chat/completions"
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+
+def add_settings_arguments(parser: argparse.ArgumentParser):
+    """Mock options, shared with the benchmarks that start their own mock"""
+    defaults = MockSettings()
+    parser.add_argument("--latency", default=defaults.latency, help="Time to first token, e.g. lognormal:0.4:0.5")
+    parser.add_argument("--token-delay-ms", type=float, default=defaults.token_delay_ms)
+    parser.add_argument("--rate-429", type=float, default=defaults.rate_429, help="Share of requests answered 429")
+    parser.add_argument("--rate-5xx", type=float, default=defaults.rate_5xx, help="Share of requests answered 5xx")
+    parser.add_argument("--rate-timeout", type=float, default=defaults.rate_timeout, help="Share of requests that hang")
+    parser.add_argument("--timeout-seconds", type=float, default=defaults.timeout_seconds)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--max-concurrency", type=int, default=defaults.max_concurrency)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def settings_from_args(args: argparse.Namespace) -> MockSettings:
+    parse_latency(args.latency)  # Fail on a bad spec before serving
+    return MockSettings(
+        latency=args.latency,
+        token_delay_ms=args.token_delay_ms,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        rate_timeout=args.rate_timeout,
+        timeout_seconds=args.timeout_seconds,
+        retry_after=args.retry_after,
+        max_concurrency=args.max_concurrency,
+        seed=args.seed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+
+    mock = MockDeepSeek(settings_from_args(args))
+    logger.info(f"Mock DeepSeek on http://{args.host}:{args.port}/chat/completions ({mock.settings})")
+    web.run_app(mock.create_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+import os
+import math
+import logging
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Dict, Any, Optional
+from segmenter import Segmenter, Span
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# DeepSeek's published rule of thumb: ~0.3 tokens per English character,
+# ~0.6 per Chinese character. Other scripts land in between.
+ASCII_TOKENS_PER_CHAR = 0.3
+CJK_TOKENS_PER_CHAR = 0.6
+OTHER_TOKENS_PER_CHAR = 0.45
+
+
+# Output tokens per input token, by target language. Chinese and Japanese
+# need fewer characters but more tokens per character than the source.
+TARGET_EXPANSION = {
+    "en": 1.0,
+    "zh": 1.0,
+    "ja": 1.2,
+    "ko": 1.2,
+    "de": 1.3,
+    "fr": 1.3,
+    "es": 1.25,
+    "it": 1.25,
+    "pt": 1.25,
+    "ru": 1.4,
+    "ar": 1.4,
+}
+# Pairs that deviate from the target-only estimate
+PAIR_EXPANSION = {
+    ("zh", "en"): 1.6,
+    ("ja", "en"): 1.5,
+    ("ko", "en"): 1.4,
+    ("en", "zh"): 1.1,
+}
+DEFAULT_EXPANSION = 1.3
+
+# Tokens taken by the instruction text around each chunk
+PROMPT_OVERHEAD_TOKENS = 40
+MIN_CHUNK_TOKENS = 60
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Offline approximation of the DeepSeek tokenizer's count. Scripts are
+    told apart by UTF-8 width: ASCII is 1 byte, Latin/Cyrillic/Arabic 2,
+    CJK, kana and Hangul 3, which keeps this a couple of C-level passes.
+    """
+    if not text:
+        return 0
+    if text.isascii():
+        return math.ceil(len(text) * ASCII_TOKENS_PER_CHAR)
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    wide_bytes = len(text.encode("utf-8", "surrogatepass")) - ascii_chars
+    wide_chars = len(text) - ascii_chars
+    # 4-byte characters (emoji, rare ideographs) count as CJK
+    cjk = min(wide_chars, max(0, wide_bytes - 2 * wide_chars))
+    other = wide_chars - cjk
+    return math.ceil(
+        ascii_chars * ASCII_TOKENS_PER_CHAR
+        + cjk * CJK_TOKENS_PER_CHAR
+        + other * OTHER_TOKENS_PER_CHAR
+    )
+
+
+def _base_lang(lang: Optional[str]) -> str:
+    return (lang or "auto").lower().split("-")[0].split("_")[0]
+
+
+def expansion_ratio(source_lang: str, target_lang: str) -> float:
+    source, target = _base_lang(source_lang), _base_lang(target_lang)
+    if (source, target) in PAIR_EXPANSION:
+        return PAIR_EXPANSION[(source, target)]
+    return TARGET_EXPANSION.get(target, DEFAULT_EXPANSION)
+
+
+@dataclass
+class ChunkPlan:
+    """How a text will be cut into requests"""
+    chunks: List[str]
+    token_counts: List[int]
+    request_tokens: int
+    max_chunk_tokens: int
+    expansion: float
+    source_lang: str = "auto"
+    target_lang: str = "en"
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self.chunks)
+
+    @property
+    def estimated_tokens(self) -> int:
+        return sum(self.token_counts)
+
+    @property
+    def estimated_output_tokens(self) -> int:
+        return math.ceil(self.estimated_tokens * self.expansion)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'chunk_count': self.chunk_count,
+            'estimated_tokens': self.estimated_tokens,
+            'estimated_output_tokens': self.estimated_output_tokens,
+            'request_tokens': self.request_tokens,
+            'max_chunk_tokens': self.max_chunk_tokens,
+            'expansion': self.expansion,
+            'source_lang': self.source_lang,
+            'target_lang': self.target_lang,
+            'chunk_tokens': self.token_counts,
+        }
+
+
+class ChunkPlanner:
+    """
+    Packs text toward a per-request token target. Each request carries
+    the prompt, the chunk and its translation, so the input share of the
+    target shrinks with the language pair's expected output expansion.
+    """
+
+    def __init__(
+        self,
+        request_tokens: Optional[int] = None,
+        source_lang: str = "auto",
+        target_lang: str = "en",
+        prompt_overhead: int = PROMPT_OVERHEAD_TOKENS
+    ):
+        self.request_tokens = request_tokens or int(os.getenv("TRANSLATION_REQUEST_TOKENS", "1000"))
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.expansion = expansion_ratio(source_lang, target_lang)
+        self.max_tokens = max(
+            MIN_CHUNK_TOKENS,
+            int((self.request_tokens - prompt_overhead) / (1 + self.expansion))
+        )
+        self.segmenter = Segmenter(source_lang, measure=estimate_tokens)
+
+    def pack(self, units: Iterable[str], separator: str = "\n\n") -> Iterator[str]:
+        """
+        Greedily join units (paragraphs, slides, rows...) into chunks of at
+        most ``max_tokens``; oversized units are split on their own.
+        """
+        current: List[str] = []
+        current_tokens = 0
+        separator_tokens = estimate_tokens(separator)
+        for unit in units:
+            if not unit:
+                continue
+            tokens = estimate_tokens(unit)
+            if tokens > self.max_tokens:
+                if current:
+                    yield separator.join(current)
+                    current, current_tokens = [], 0
+                yield from self.split(unit)
+                continue
+            if current and current_tokens + separator_tokens + tokens > self.max_tokens:
+                yield separator.join(current)
+                current, current_tokens = [], 0
+            if current:
+                current_tokens += separator_tokens
+            current.append(unit)
+            current_tokens += tokens
+        if current:
+            yield separator.join(current)
+
+    def split(self, text: str, max_tokens: Optional[int] = None) -> Iterator[str]:
+        """Split one text at the coarsest boundaries that fit the budget"""
+        yield from self.segmenter.chunks(text, max_tokens or self.max_tokens)
+
+    def spans(self, text: str, max_tokens: Optional[int] = None) -> Iterator[Span]:
+        """Like :meth:`split`, as offsets into ``text``"""
+        yield from self.segmenter.segment(text, max_tokens or self.max_tokens)
+
+    def plan(self, text: str) -> ChunkPlan:
+        chunks = list(self.split(text))
+        return self.plan_for(chunks)
+
+    def plan_for(self, chunks: List[str]) -> ChunkPlan:
+        return ChunkPlan(
+            chunks=chunks,
+            token_counts=[estimate_tokens(chunk) for chunk in chunks],
+            request_tokens=self.request_tokens,
+            max_chunk_tokens=self.max_tokens,
+            expansion=self.expansion,
+            source_lang=self.source_lang,
+            target_lang=self.target_lang
+        )
@@ -1,10 +1,20 @@
 import os
+import json
+import time
+import base64
+import uuid
+import threading
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import PoolError
 from contextlib import contextmanager
+from datetime import datetime
 from dotenv import load_dotenv
-from typing import Optional, Dict, Any, Iterator, List
+from typing import Optional, Dict, Any, Iterator, List, Tuple
 import logging
+from user_cache import user_cache
+from metrics import registry, timed
+from tracing import tracer
 
 
 load_dotenv()
@@ -13,6 +23,162 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class PoolTimeout(PoolError):
+    pass
+
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 pool. ``min_size`` connections stay open and up
+    to ``max_size`` are opened under load; the extra (overflow) ones are
+    closed on return when nobody is waiting. Checkout blocks for up to
+    ``timeout`` seconds. A connection idle for ``health_check_interval``
+    seconds is pinged before use and replaced if the ping fails.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        health_check_interval: float = 30.0,
+        **connect_kwargs
+    ):
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.connect_kwargs = connect_kwargs
+        self._cond = threading.Condition()
+        # (connection, monotonic time it was returned)
+        self._idle: List[Tuple[Any, float]] = []
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        # Idle connections returned before this are pinged on checkout
+        self._suspect_before = 0.0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.reconnects = 0
+        self.failed_health_checks = 0
+        self.peak_overflow = 0
+        for _ in range(min_size):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def _connect(self):
+        conn = psycopg2.connect(cursor_factory=RealDictCursor, **self.connect_kwargs)
+        conn.autocommit = False
+        return conn
+
+    def getconn(self):
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # Reserve the slot, connect outside the lock
+                    self._size += 1
+                    conn, returned_at = None, 0.0
+                    break
+                remaining = started + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+            self.checkouts += 1
+            self.peak_overflow = max(self.peak_overflow, self._size - self.min_size)
+            waited = time.monotonic() - started
+            if waited > 0.001:
+                self.waits += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        try:
+            return self._ensure_healthy(conn, returned_at)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def _ensure_healthy(self, conn, returned_at: float):
+        if conn is not None and not conn.closed:
+            fresh = time.monotonic() - returned_at < self.health_check_interval
+            if fresh and returned_at > self._suspect_before:
+                return conn
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+                return conn
+            except psycopg2.Error as e:
+                logger.warning(f"Database connection failed health check: {e}")
+                with self._cond:
+                    self.failed_health_checks += 1
+                _close_quietly(conn)
+        if conn is not None:
+            with self._cond:
+                self.reconnects += 1
+            logger.info("Reconnecting to database")
+        return self._connect()
+
+    def putconn(self, conn, discard: bool = False):
+        with self._cond:
+            self._in_use -= 1
+            if discard:
+                # The server may have dropped the others too
+                self._suspect_before = time.monotonic()
+            if discard or conn.closed or (self._size > self.min_size and not self._waiting):
+                self._size -= 1
+                _close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            for conn, _ in self._idle:
+                _close_quietly(conn)
+            self._size -= len(self._idle)
+            self._idle = []
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiting': self._waiting,
+                'overflow': max(0, self._size - self.min_size),
+                'peak_overflow': self.peak_overflow,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_seconds_total': round(self.wait_seconds, 6),
+                'wait_seconds_max': round(self.max_wait_seconds, 6),
+                'wait_seconds_avg': round(self.wait_seconds / self.waits, 6) if self.waits else 0.0,
+                'timeouts': self.timeouts,
+                'reconnects': self.reconnects,
+                'failed_health_checks': self.failed_health_checks
+            }
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
 class Database:
     _instance = None
     
@@ -24,42 +190,76 @@ class Database:
     
     def _init_db(self):
         try:
-            self.conn = psycopg2.connect(
+            self.pool = ConnectionPool(
+                min_size=int(os.getenv("DB_POOL_MIN", "1")),
+                max_size=int(os.getenv("DB_POOL_MAX", "10")),
+                timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+                health_check_interval=float(os.getenv("DB_POOL_HEALTH_CHECK_SECONDS", "30")),
                 dbname=os.getenv("DB_NAME"),
                 user=os.getenv("DB_USER"),
                 password=os.getenv("DB_PASSWORD"),
                 host=os.getenv("DB_HOST"),
-                port=os.getenv("DB_PORT"),
-                cursor_factory=RealDictCursor
+                port=os.getenv("DB_PORT")
             )
-            self.conn.autocommit = False
-            logger.info("Database connection established")
+            logger.info("Database connection pool established")
         except Exception as e:
             logger.error(f"Database connection failed: {e}")
             raise
     
     @contextmanager
     def get_cursor(self) -> Iterator[RealDictCursor]:
-        cursor = self.conn.cursor()
-        try:
-            yield cursor
-            self.conn.commit()
-        except Exception as e:
-            self.conn.rollback()
-            logger.error(f"Database operation failed: {e}")
-            raise
-        finally:
-            cursor.close()
+        """Check a connection out for one transaction"""
+        with tracer.span("db.transaction"):
+            with tracer.span("db.checkout"):
+                conn = self.pool.getconn()
+            broken = False
+            try:
+                cursor = conn.cursor()
+                try:
+                    yield cursor
+                    conn.commit()
+                except BaseException as e:
+                    # Also on GeneratorExit/KeyboardInterrupt, so the connection
+                    # never goes back to the pool inside an open transaction
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        broken = True
+                    if isinstance(e, Exception):
+                        logger.error(f"Database operation failed: {e}")
+                    raise
+                finally:
+                    if not conn.closed:
+                        cursor.close()
+            finally:
+                self.pool.putconn(conn, discard=broken or bool(conn.closed))
+
+    def stats(self) -> Dict[str, Any]:
+        return self.pool.stats()
     
     def close(self):
-        if self.conn and not self.conn.closed:
-            self.conn.close()
-            self._instance = None
-            logger.info("Database connection closed")
+        self.pool.closeall()
+        Database._instance = None
+        logger.info("Database connection pool closed")
 
 # Singleton database instance
 db = Database()
 
+DB_QUERY_SECONDS = registry.histogram("db_query_seconds", "Database helper calls, connection checkout included", ["query"])
+
+
+def _pool_occupancy() -> Dict[Tuple[str], int]:
+    stats = db.stats()
+    return {(state,): stats[state] for state in ('size', 'idle', 'in_use', 'waiting')}
+
+
+registry.gauge("db_pool_connections", "Database pool connections by state", ["state"], function=_pool_occupancy)
+
+
+def _timed_query(func):
+    return tracer.traced(f"db.{func.__name__}")(timed(DB_QUERY_SECONDS, query=func.__name__)(func))
+
+@_timed_query
 def get_user_by_username(username: str) -> Optional[Dict[str, Any]]:
     try:
         with db.get_cursor() as cursor:
@@ -75,6 +275,7 @@ def get_user_by_username(username: str) -> Optional[Dict[str, Any]]:
         logger.error(f"Error fetching user by username: {e}")
         return None
 
+@_timed_query
 def create_user(username: str, email: str, hashed_password: str) -> Optional[int]:
     try:
         with db.get_cursor() as cursor:
@@ -83,7 +284,9 @@ def create_user(username: str, email: str, hashed_password: str) -> Optional[int
                 VALUES (%s, %s, %s)
                 RETURNING id
                 """, (username, email, hashed_password))
-            return cursor.fetchone()['id']
+            user_id = cursor.fetchone()['id']
+        user_cache.invalidate(username)
+        return user_id
     except psycopg2.IntegrityError as e:
         logger.error(f"User creation failed (duplicate): {e}")
         return None
@@ -91,6 +294,7 @@ def create_user(username: str, email: str, hashed_password: str) -> Optional[int
         logger.error(f"User creation failed: {e}")
         return None
 
+@_timed_query
 def update_user_subscription(
     username: str, 
     subscription_id: str, 
@@ -113,11 +317,14 @@ def update_user_subscription(
                 WHERE username = %s
                 RETURNING id
                 """, (active, subscription_id, plan_id, plan_id, plan_id, plan_id, username))
-            return cursor.fetchone() is not None
+            updated = cursor.fetchone() is not None
+        user_cache.invalidate(username)
+        return updated
     except Exception as e:
         logger.error(f"Subscription update failed: {e}")
         return False
 
+@_timed_query
 def create_subscription_record(
     user_id: int, 
     stripe_subscription_id: str,
@@ -133,6 +340,10 @@ def create_subscription_record(
                     plan_id, status, current_period_start, current_period_end
                 )
                 VALUES (%s, %s, %s, %s, %s, NOW(), NOW() + INTERVAL '1 month')
+                ON CONFLICT (stripe_subscription_id) DO UPDATE
+                SET plan_id = EXCLUDED.plan_id,
+                    status = EXCLUDED.status,
+                    updated_at = NOW()
                 RETURNING id
                 """, (user_id, stripe_subscription_id, stripe_customer_id, plan_id, status))
             return cursor.fetchone() is not None
@@ -140,6 +351,7 @@ def create_subscription_record(
         logger.error(f"Subscription record creation failed: {e}")
         return False
 
+@_timed_query
 def record_translation(
     user_id: int,
     source_text: str,
@@ -153,6 +365,8 @@ def record_translation(
     ip_address: Optional[str] = None,
     user_agent: Optional[str] = None
 ) -> bool:
+    # translation_history.session_id is required, clients rarely send one
+    session_id = session_id or str(uuid.uuid4())
     try:
         with db.get_cursor() as cursor:
             # Record translation history
@@ -175,51 +389,161 @@ def record_translation(
                 SET characters_used = characters_used + %s
                 WHERE id = %s
                 """, (character_count, user_id))
-            
-            return True
+
+            # Update this month's rollups for the language pair and the total
+            cursor.execute("""
+                INSERT INTO usage_rollups (
+                    user_id, month, source_language, target_language, characters, requests
+                )
+                VALUES
+                    (%s, date_trunc('month', CURRENT_DATE), COALESCE(%s, 'auto'), COALESCE(%s, 'auto'), %s, 1),
+                    (%s, date_trunc('month', CURRENT_DATE), '*', '*', %s, 1)
+                ON CONFLICT (user_id, month, source_language, target_language) DO UPDATE
+                SET characters = usage_rollups.characters + EXCLUDED.characters,
+                    requests = usage_rollups.requests + 1,
+                    updated_at = CURRENT_TIMESTAMP
+                """, (
+                    user_id, source_lang, target_lang, character_count,
+                    user_id, character_count
+                ))
+
+        # characters_used changed
+        user_cache.invalidate_id(user_id)
+        return True
     except Exception as e:
         logger.error(f"Translation recording failed: {e}")
         return False
 
+@_timed_query
+def record_translations_batch(rows: List[Dict[str, Any]]):
+    """
+    Write many ``record_translation`` calls in one transaction: one
+    multi-row history insert, one ``characters_used`` update per user and
+    one rollup upsert per user, month and language pair. Each row holds
+    ``record_translation``'s arguments plus ``created_at``. Raises on failure
+    so the caller can retry the batch.
+    """
+    if not rows:
+        return
+    per_user: Dict[int, int] = {}
+    for row in rows:
+        per_user[row['user_id']] = per_user.get(row['user_id'], 0) + row['character_count']
+
+    with db.get_cursor() as cursor:
+        execute_values(cursor, """
+            INSERT INTO translation_history (
+                user_id, session_id, source_text, translated_text,
+                source_language, target_language, character_count,
+                document_type, file_name, ip_address, user_agent, created_at
+            )
+            VALUES %s
+            """, [(
+                row['user_id'], row.get('session_id') or str(uuid.uuid4()), row['source_text'], row['translated_text'],
+                row['source_lang'], row['target_lang'], row['character_count'],
+                row.get('document_type'), row.get('file_name'), row.get('ip_address'),
+                row.get('user_agent'), row['created_at']
+            ) for row in rows], page_size=len(rows))
+
+        execute_values(cursor, """
+            UPDATE users
+            SET characters_used = characters_used + v.delta
+            FROM (VALUES %s) AS v(id, delta)
+            WHERE users.id = v.id
+            """, list(per_user.items()), page_size=len(per_user))
+
+        # Rollup months follow each row's created_at, not the flush time
+        execute_values(cursor, """
+            INSERT INTO usage_rollups (
+                user_id, month, source_language, target_language, characters, requests
+            )
+            SELECT user_id, date_trunc('month', created_at)::date, pair.source, pair.target,
+                   SUM(character_count), COUNT(*)
+            FROM (VALUES %s) AS v(user_id, created_at, source_language, target_language, character_count)
+            CROSS JOIN LATERAL (VALUES
+                (COALESCE(v.source_language, 'auto'), COALESCE(v.target_language, 'auto')),
+                ('*', '*')
+            ) AS pair(source, target)
+            GROUP BY 1, 2, 3, 4
+            ON CONFLICT (user_id, month, source_language, target_language) DO UPDATE
+            SET characters = usage_rollups.characters + EXCLUDED.characters,
+                requests = usage_rollups.requests + EXCLUDED.requests,
+                updated_at = CURRENT_TIMESTAMP
+            """, [(
+                row['user_id'], row['created_at'], row['source_lang'],
+                row['target_lang'], row['character_count']
+            ) for row in rows], template="(%s, %s::timestamptz, %s, %s, %s::integer)", page_size=len(rows))
+
+    for user_id in per_user:
+        user_cache.invalidate_id(user_id)
+
+@_timed_query
 def get_user_translation_history(
     user_id: int, 
     limit: int = 10, 
-    offset: int = 0
+    offset: int = 0,
+    before: Optional[Tuple[Any, int]] = None
 ) -> List[Dict[str, Any]]:
+    """
+    Newest first. ``before`` is the ``(created_at, id)`` of the last row
+    of the previous page and takes precedence over ``offset``, which
+    has to skip rows one by one.
+    """
     try:
         with db.get_cursor() as cursor:
-            cursor.execute("""
-                SELECT id, session_id, source_language, target_language,
-                       character_count, document_type, file_name, created_at
-                FROM translation_history
-                WHERE user_id = %s
-                ORDER BY created_at DESC
-                LIMIT %s OFFSET %s
-                """, (user_id, limit, offset))
+            if before is not None:
+                cursor.execute("""
+                    SELECT id, session_id, source_language, target_language,
+                           character_count, document_type, file_name, created_at
+                    FROM translation_history
+                    WHERE user_id = %s
+                    -- Plain bound on the partition key so newer partitions are pruned
+                    AND created_at <= %s
+                    AND (created_at, id) < (%s, %s)
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                    """, (user_id, before[0], before[0], before[1], limit))
+            else:
+                cursor.execute("""
+                    SELECT id, session_id, source_language, target_language,
+                           character_count, document_type, file_name, created_at
+                    FROM translation_history
+                    WHERE user_id = %s
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s OFFSET %s
+                    """, (user_id, limit, offset))
             return cursor.fetchall()
     except Exception as e:
         logger.error(f"Failed to fetch translation history: {e}")
         return []
 
+def encode_history_cursor(row: Dict[str, Any]) -> str:
+    """Opaque ``before`` value for the page after ``row``"""
+    raw = json.dumps([row['created_at'].isoformat(), row['id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, int]:
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    created_at, row_id = json.loads(raw)
+    return datetime.fromisoformat(created_at), int(row_id)
+
+@_timed_query
 def get_user_usage_stats(user_id: int) -> Dict[str, Any]:
     try:
         with db.get_cursor() as cursor:
-            # Get current month usage
-            cursor.execute("""
-                SELECT COALESCE(SUM(character_count), 0) as monthly_usage
-                FROM translation_history
-                WHERE user_id = %s 
-                AND created_at >= date_trunc('month', CURRENT_DATE)
-                """, (user_id,))
-            monthly_usage = cursor.fetchone()['monthly_usage']
-            
-            # Get user's limit
+            # Current month usage comes from the user's total rollup row
             cursor.execute("""
-                SELECT monthly_character_limit, characters_used
-                FROM users
-                WHERE id = %s
+                SELECT u.monthly_character_limit, u.characters_used,
+                       COALESCE(r.characters, 0) AS monthly_usage
+                FROM users u
+                LEFT JOIN usage_rollups r
+                    ON r.user_id = u.id
+                    AND r.month = date_trunc('month', CURRENT_DATE)
+                    AND r.source_language = '*'
+                    AND r.target_language = '*'
+                WHERE u.id = %s
                 """, (user_id,))
             limit_info = cursor.fetchone()
+            monthly_usage = limit_info['monthly_usage']
             
             return {
                 'monthly_usage': monthly_usage,
@@ -1,15 +1,33 @@
 import os
-import requests
+import re
+import json
 import time
-from typing import Optional, Generator, List, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import queue
+import asyncio
+import threading
+import aiohttp
+from contextlib import contextmanager
+from typing import Optional, Callable, Dict, List, Tuple, Union, Awaitable, TypeVar, AsyncIterator, Iterator
 import logging
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from rate_limiter import RateLimiter, get_rate_limiter
+from translation_cache import TranslationCache, make_cache_key
+from chunking import ChunkPlanner, ChunkPlan, estimate_tokens, MIN_CHUNK_TOKENS
+from metrics import registry, SLOW_BUCKETS
+from tracing import tracer, bind
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Bump whenever the prompt changes so cached translations are not reused
+PROMPT_VERSION = "1"
+
+# Failed chunks are retried once more at this fraction of the normal concurrency
+RETRY_CONCURRENCY_DIVISOR = 4
+
 class TranslationError(Exception):
     pass
 
@@ -19,6 +37,148 @@ class AuthenticationError(TranslationError):
 class RateLimitError(TranslationError):
     pass
 
+class BatchAlignmentError(TranslationError):
+    """A batched response could not be mapped back onto its segments"""
+    pass
+
+class IncompleteTranslationError(TranslationError):
+    """Chunks of a large text still failed after the retry pass"""
+
+    def __init__(self, errors: Dict[int, Exception]):
+        self.errors = errors
+        first = errors[min(errors)]
+        super().__init__(f"{len(errors)} chunks failed, first: {str(first) or type(first).__name__}")
+
+# Line-leading [[n]] markers that delimit segments in batched requests
+_SEGMENT_MARKER = re.compile(r"^\[\[(\d+)\]\][ \t]*$", re.MULTILINE)
+
+UPSTREAM_SECONDS = registry.histogram(
+    "deepseek_request_seconds", "DeepSeek API calls, from sending the request to the last byte",
+    ["kind", "status"], buckets=SLOW_BUCKETS
+)
+UPSTREAM_IN_FLIGHT = registry.gauge("deepseek_requests_in_flight", "DeepSeek API calls currently open")
+UPSTREAM_RETRIES = registry.counter("deepseek_retries_total", "DeepSeek API calls retried, by cause", ["status"])
+UPSTREAM_TOKENS = registry.counter("deepseek_tokens_total", "Tokens reported in DeepSeek usage fields", ["type"])
+CHUNKS = registry.counter("translation_chunks_total", "Texts and chunks translated", ["outcome"])
+CHARACTERS = registry.counter("translation_characters_total", "Source characters translated", ["outcome"])
+CHUNK_RETRIES = registry.counter("translation_chunk_retries_total", "Failed chunks given a final retry", ["outcome"])
+
+
+def _status_of(error: BaseException) -> str:
+    if isinstance(error, RateLimitError):
+        return "429"
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    return "error"
+
+
+@contextmanager
+def _observe_upstream(kind: str):
+    started = time.perf_counter()
+    status = "ok"
+    UPSTREAM_IN_FLIGHT.inc()
+    try:
+        with tracer.span("deepseek.http", kind=kind) as span:
+            try:
+                yield
+            except Exception as e:
+                status = _status_of(e)
+                raise
+            except BaseException:
+                # Caller went away (cancelled task, closed stream)
+                status = "cancelled"
+                raise
+            finally:
+                span.set_attribute("status", status)
+    finally:
+        UPSTREAM_IN_FLIGHT.dec()
+        UPSTREAM_SECONDS.observe(time.perf_counter() - started, kind=kind, status=status)
+
+
+async def _traced_sleep(seconds: float):
+    """Backoff between tenacity attempts, visible in traces"""
+    with tracer.span("retry.wait", seconds=seconds):
+        await asyncio.sleep(seconds)
+
+
+def _record_usage(usage: Optional[dict]):
+    for field in ("prompt_tokens", "completion_tokens", "prompt_cache_hit_tokens"):
+        if usage and usage.get(field):
+            UPSTREAM_TOKENS.inc(usage[field], type=field[:-len("_tokens")])
+
+
+def _count_chunk(text: str, outcome: str):
+    CHUNKS.inc(outcome=outcome)
+    CHARACTERS.inc(len(text), outcome=outcome)
+
+
+def _count_retry(retry_state):
+    UPSTREAM_RETRIES.inc(status=_status_of(retry_state.outcome.exception()))
+
+class _EventLoopThread:
+    """
+    Process-wide background event loop that drives the async engine
+    for synchronous callers (Flask request threads, pool workers).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            # Restart after a fork, the loop thread does not survive it
+            if self._loop is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="deepseek-io",
+                    daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro: Awaitable[T]) -> T:
+        loop = self.get_loop()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Sync translator API called from inside its event loop")
+        return asyncio.run_coroutine_threadsafe(bind(coro), loop).result()
+
+    def iterate(self, agen: AsyncIterator[T]) -> Iterator[T]:
+        """Drain an async generator from a sync thread, item by item"""
+        loop = self.get_loop()
+        items: "queue.Queue" = queue.Queue()
+        end = object()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    items.put((item, None))
+                items.put((end, None))
+            except BaseException as e:
+                items.put((end, e))
+                raise
+
+        future = asyncio.run_coroutine_threadsafe(bind(pump()), loop)
+        try:
+            while True:
+                item, error = items.get()
+                if item is end:
+                    if error is not None and not isinstance(error, asyncio.CancelledError):
+                        raise error
+                    return
+                yield item
+        finally:
+            # Stops upstream work when the consumer goes away early
+            future.cancel()
+
+_io_loop = _EventLoopThread()
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """Run a coroutine on the shared translator event loop and wait for it"""
+    return _io_loop.run(coro)
+
 class DeepSeekTranslator:
     """
     Enhanced DeepSeek translation client with:
@@ -26,104 +186,609 @@ class DeepSeekTranslator:
     - Rate limiting
     - Improved error handling
     - Progress tracking
+    - Async engine with one shared keep-alive connection pool
+
+    The ``a``-prefixed coroutines are the engine; the plain methods are
+    sync wrappers that run them on a shared background event loop.
     """
     
-    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        pool_size: Optional[int] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[TranslationCache] = None
+    ):
         self.api_key = api_key or os.getenv("DEEPSEEK_API_KEY")
         if not self.api_key:
             raise ValueError("DeepSeek API key is required")
         
-        self.base_url = base_url or "https://api.deepseek.com/chat/completions"
+        self.base_url = base_url or os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/chat/completions")
+        self.model = "deepseek-chat"
         self.timeout = 30
+        self.connect_timeout = 3.05
         self.max_retries = 3
-        self.session = requests.Session()
-        self.last_request_time = 0
-        self.min_request_interval = 0.2  # 200ms between requests to avoid rate limiting
-        self.max_chunk_size = 1000  # Configurable
-        self.min_chunk_size = 200   # Don't go below this
+        # Requests/sec and tokens/min budget, shared across threads and workers
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        # Optional translation memory consulted before every API call
+        self.cache = cache
+        self.request_tokens = None  # Per-request token target, TRANSLATION_REQUEST_TOKENS if unset
+        self.min_chunk_tokens = MIN_CHUNK_TOKENS  # Don't go below this
+        self.max_batch_tokens = 2000  # Input budget for one multi-segment request
+        self.max_batch_segments = 50
+        # In-flight request cap shared by every caller of this translator
+        self.max_concurrency = max_concurrency or int(os.getenv("DEEPSEEK_MAX_CONCURRENCY", "8"))
+        # Keep-alive connections kept open to the API host
+        self.pool_size = pool_size or int(os.getenv("DEEPSEEK_POOL_SIZE", "32"))
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session_pid: Optional[int] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Return the pooled session bound to the running event loop. A
+        translator serves one loop at a time, so ``max_concurrency`` is a
+        single bound: calls from another loop are refused while the first
+        one is open. Once that loop is closed, or in a child process after
+        a fork, the next loop takes over.
+        """
+        loop = asyncio.get_running_loop()
+        self._claim_loop(loop)
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=60
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                    "Accept": "application/json"
+                },
+                timeout=aiohttp.ClientTimeout(
+                    total=None,
+                    sock_connect=self.connect_timeout,
+                    sock_read=self.timeout
+                )
+            )
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._session_loop = loop
+            self._session_pid = os.getpid()
+        return self._session
+
+    def _claim_loop(self, loop: asyncio.AbstractEventLoop):
+        if self._session_loop is None or self._session_loop is loop:
+            return
+        if self._session_pid == os.getpid() and not self._session_loop.is_closed():
+            raise RuntimeError(
+                "DeepSeekTranslator is bound to another event loop; call aclose() there first, "
+                "or use the sync API or one translator per loop"
+            )
+        if self._session is not None:
+            # Its connections can't be closed from here: their loop is
+            # gone, or they are the parent process's sockets
+            self._session.detach()
+        self._session = None
+        self._semaphore = None
+        self._session_loop = None
+
+    def _estimate_request_tokens(self, prompt: str, text: str) -> int:
+        """Prompt + expected completion size used for the tokens/min bucket"""
+        return estimate_tokens(prompt) + estimate_tokens(text)
+
+    def plan_chunks(
+        self,
+        text: str,
+        target_lang: str,
+        source_lang: str = "auto",
+        request_tokens: Optional[int] = None
+    ) -> ChunkPlan:
+        """How ``translate_large_text`` would cut this text into requests"""
+        planner = ChunkPlanner(request_tokens or self.request_tokens, source_lang, target_lang)
+        with tracer.span("chunking.plan", chars=len(text)):
+            return planner.plan(text)
+
+    async def aclose(self):
+        """Close the session on the loop it belongs to, releasing the translator for another loop"""
+        self._claim_loop(asyncio.get_running_loop())
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._semaphore = None
+        self._session_loop = None
+
+    def close(self):
+        loop = self._session_loop
+        if loop is not None and loop.is_running() and self._session_pid == os.getpid():
+            asyncio.run_coroutine_threadsafe(self.aclose(), loop).result()
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10),
-        retry=retry_if_exception_type((requests.exceptions.RequestException, RateLimitError)))
     def translate_text(
         self,
         text: str,
         target_lang: str,
         source_lang: str = "auto",
         **kwargs
+    ) -> str:
+        """Sync wrapper around :meth:`atranslate_text`"""
+        return _io_loop.run(self.atranslate_text(text, target_lang, source_lang, **kwargs))
+
+    def translate_large_text(
+        self,
+        text: str,
+        target_lang: str,
+        source_lang: str = "auto",
+        request_tokens: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        progress_callback: callable = None,
+        strict: bool = False,
+        **kwargs
+    ) -> str:
+        """Sync wrapper around :meth:`atranslate_large_text`"""
+        return _io_loop.run(self.atranslate_large_text(
+            text,
+            target_lang,
+            source_lang,
+            request_tokens=request_tokens,
+            max_workers=max_workers,
+            progress_callback=progress_callback,
+            strict=strict,
+            **kwargs
+        ))
+
+    async def atranslate_text(
+        self,
+        text: str,
+        target_lang: str,
+        source_lang: str = "auto",
+        **kwargs
     ) -> str:
         """
-        Direct text translation with rate limiting and retries
+        Direct text translation, served from the translation memory when possible
         """
-        # Rate limiting
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.min_request_interval:
-            time.sleep(self.min_request_interval - elapsed)
-        
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
+        outcome = "failed"
+        with tracer.span("translate_text", chars=len(text)) as span:
+            try:
+                if self.cache is None:
+                    translated = await self._arequest_translation(text, target_lang, source_lang, **kwargs)
+                    outcome = "translated"
+                else:
+                    model = kwargs.get("model", self.model)
+                    key = make_cache_key(text, source_lang, target_lang, model, PROMPT_VERSION, kwargs)
+                    translated = await asyncio.to_thread(self.cache.get, key)
+                    outcome = "cached"
+                    if translated is None:
+                        translated = await self._arequest_translation(text, target_lang, source_lang, **kwargs)
+                        outcome = "translated"
+                        await asyncio.to_thread(
+                            self.cache.set, key, translated, source_lang, target_lang, model, PROMPT_VERSION
+                        )
+            except Exception:
+                outcome = "failed"
+                raise
+            finally:
+                span.set_attribute("outcome", outcome)
+                _count_chunk(text, outcome)
+        return translated
 
-        prompt = (
+    def _build_prompt(self, text: str, target_lang: str, source_lang: str) -> str:
+        return (
             f"Translate the following text from {source_lang} to {target_lang}.\n"
             f"Preserve formatting, special characters, and proper nouns.\n"
             f"Text: {text}"
         )
-        
-        payload = {
-            "model": "deepseek-chat",
+
+    def _build_payload(self, prompt: str, **kwargs) -> dict:
+        return {
+            "model": self.model,
             "messages": [{"role": "user", "content": prompt}],
             "temperature": 0.3,
             **kwargs
         }
 
+    async def _apost(self, prompt: str, text: str, **kwargs) -> dict:
+        """Single chat completion attempt inside the concurrency and rate limits"""
+        session = self._get_session()
+        payload = self._build_payload(prompt, **kwargs)
+
+        async with self._semaphore:
+            # Rate limiting
+            with tracer.span("rate_limit.wait"):
+                await self.rate_limiter.acquire_async(self._estimate_request_tokens(prompt, text))
+            with _observe_upstream("complete"):
+                async with session.post(self.base_url, json=payload) as response:
+                    if response.status == 429:
+                        await self.rate_limiter.on_rate_limited_async()
+                        raise RateLimitError("Rate limit exceeded")
+                    if response.status == 401:
+                        raise AuthenticationError("Invalid API key")
+                    response.raise_for_status()
+                    response_data = await response.json(content_type=None)
+            await self.rate_limiter.on_success_async()
+        _record_usage(response_data.get("usage"))
+        return response_data
+
+    def translate_batch(
+        self,
+        segments: List[str],
+        target_lang: str,
+        source_lang: str = "auto",
+        max_batch_tokens: Optional[int] = None,
+        progress_callback: callable = None,
+        **kwargs
+    ) -> List[str]:
+        """Sync wrapper around :meth:`atranslate_batch`"""
+        return _io_loop.run(self.atranslate_batch(
+            segments,
+            target_lang,
+            source_lang,
+            max_batch_tokens=max_batch_tokens,
+            progress_callback=progress_callback,
+            **kwargs
+        ))
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        retry=retry_if_exception_type((aiohttp.ClientError, asyncio.TimeoutError, RateLimitError)),
+        before_sleep=_count_retry,
+        sleep=_traced_sleep)
+    async def _arequest_translation(
+        self,
+        text: str,
+        target_lang: str,
+        source_lang: str = "auto",
+        **kwargs
+    ) -> str:
+        """
+        Upstream translation call with rate limiting and retries
+        """
+        prompt = self._build_prompt(text, target_lang, source_lang)
+
         try:
-            self.last_request_time = time.time()
-            response = self.session.post(
-                self.base_url,
-                headers=headers,
-                json=payload,
-                timeout=(3.05, 30)  # Connect timeout, read timeout
+            response_data = await self._apost(prompt, text, **kwargs)
+            return self._parse_response(response_data)
+        except asyncio.TimeoutError:
+                tokens = estimate_tokens(text)
+                if tokens > self.min_chunk_tokens:
+                    new_budget = max(self.min_chunk_tokens, tokens // 2)
+                    logger.warning(f"Reducing chunk budget to {new_budget} tokens and retrying")
+                    return await self._atranslate_in_parts(text, new_budget, target_lang, source_lang, **kwargs)
+                raise
+
+    async def _atranslate_in_parts(
+        self,
+        text: str,
+        part_tokens: int,
+        target_lang: str,
+        source_lang: str,
+        **kwargs
+    ) -> str:
+        """Translate text as smaller chunks after a timeout"""
+        parts = list(ChunkPlanner(source_lang=source_lang, target_lang=target_lang).split(text, part_tokens))
+        translated = await asyncio.gather(*(
+            self.atranslate_text(part, target_lang, source_lang, **kwargs)
+            for part in parts
+        ))
+        return " ".join(translated)
+
+    async def atranslate_batch(
+        self,
+        segments: List[str],
+        target_lang: str,
+        source_lang: str = "auto",
+        max_batch_tokens: Optional[int] = None,
+        progress_callback: callable = None,
+        **kwargs
+    ) -> List[str]:
+        """
+        Translate many short segments (cells, shapes, short paragraphs)
+        with as few requests as possible:
+        - Blank segments pass through, cached ones are served locally
+        - The rest are packed into numbered batches up to ``max_batch_tokens``
+        - Batches whose output can't be aligned are split in half and retried
+        Returns one translation per segment, in input order.
+        """
+        max_batch_tokens = max_batch_tokens or self.max_batch_tokens
+        results: List[Optional[str]] = [None] * len(segments)
+        pending: List[int] = []
+        model = kwargs.get("model", self.model)
+        keys = {}
+
+        for index, segment in enumerate(segments):
+            if not segment.strip():
+                results[index] = segment
+            else:
+                pending.append(index)
+
+        if self.cache is not None and pending:
+            for index in pending:
+                keys[index] = make_cache_key(segments[index], source_lang, target_lang, model, PROMPT_VERSION, kwargs)
+            cached = await asyncio.to_thread(lambda: [self.cache.get(keys[index]) for index in pending])
+            for index, value in zip(list(pending), cached):
+                if value is not None:
+                    results[index] = value
+            pending = [index for index in pending if results[index] is None]
+
+        # Greedy packing in document order
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for index in pending:
+            tokens = estimate_tokens(segments[index])
+            if current and (current_tokens + tokens > max_batch_tokens or len(current) >= self.max_batch_segments):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+
+        done = len(segments) - len(pending)
+
+        async def run_batch(batch: List[int]):
+            nonlocal done
+            translated = await self._atranslate_packed(
+                [segments[index] for index in batch], target_lang, source_lang, **kwargs
             )
+            for index, text in zip(batch, translated):
+                results[index] = text
+            if self.cache is not None:
+                await asyncio.to_thread(lambda: [
+                    self.cache.set(keys[index], results[index], source_lang, target_lang, model, PROMPT_VERSION)
+                    for index in batch
+                ])
+            done += len(batch)
+            if progress_callback:
+                progress_callback(min(100, int(done / len(segments) * 100)))
 
-            if response.status_code == 429:
-                raise RateLimitError("Rate limit exceeded")
-            if response.status_code == 401:
-                raise AuthenticationError("Invalid API key")
-            response.raise_for_status()
-            
-            return self._parse_response(response.json())
-        except requests.exceptions.Timeout:
-                if len(text) > self.min_chunk_size:
-                    new_size = max(self.min_chunk_size, len(text)//2)
-                    logger.warning(f"Reducing chunk size to {new_size} and retrying")
-                    return self._translate_in_parts(text, new_size, target_lang, source_lang)
-                raise
+        await asyncio.gather(*(run_batch(batch) for batch in batches))
+        logger.info(f"Translated {len(pending)} segments in {len(batches)} batches")
+        return results
 
-    def translate_large_text(
+    async def _atranslate_packed(
+        self,
+        texts: List[str],
+        target_lang: str,
+        source_lang: str,
+        **kwargs
+    ) -> List[str]:
+        """Translate one batch, halving it until every part aligns"""
+        if len(texts) == 1:
+            return [await self._arequest_translation(texts[0], target_lang, source_lang, **kwargs)]
+        try:
+            return await self._arequest_batch(texts, target_lang, source_lang, **kwargs)
+        except BatchAlignmentError as e:
+            logger.warning(f"Splitting batch of {len(texts)} segments: {str(e)}")
+            middle = len(texts) // 2
+            left, right = await asyncio.gather(
+                self._atranslate_packed(texts[:middle], target_lang, source_lang, **kwargs),
+                self._atranslate_packed(texts[middle:], target_lang, source_lang, **kwargs)
+            )
+            return left + right
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        retry=retry_if_exception_type((aiohttp.ClientError, RateLimitError)),
+        before_sleep=_count_retry,
+        sleep=_traced_sleep)
+    async def _arequest_batch(
+        self,
+        texts: List[str],
+        target_lang: str,
+        source_lang: str,
+        **kwargs
+    ) -> List[str]:
+        """Send numbered segments in one request and align the numbered reply"""
+        body = "\n".join(f"[[{number}]]\n{text}" for number, text in enumerate(texts, 1))
+        prompt = (
+            f"Translate each numbered segment below from {source_lang} to {target_lang}.\n"
+            f"Preserve formatting, special characters, and proper nouns.\n"
+            f"Keep every [[n]] marker on its own line, in the same order, followed by its translation.\n"
+            f"Return exactly {len(texts)} segments and nothing else.\n\n"
+            f"{body}"
+        )
+
+        try:
+            response_data = await self._apost(prompt, body, **kwargs)
+        except asyncio.TimeoutError:
+            # Smaller batches are the remedy, not a retry of the same one
+            raise BatchAlignmentError("Batch request timed out")
+
+        try:
+            content = response_data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError):
+            raise TranslationError(f"Malformed API response: {response_data}")
+        return self._split_batch_output(content, len(texts))
+
+    def _split_batch_output(self, content: str, expected: int) -> List[str]:
+        markers = list(_SEGMENT_MARKER.finditer(content))
+        numbers = [int(marker.group(1)) for marker in markers]
+        if numbers != list(range(1, expected + 1)):
+            raise BatchAlignmentError(f"Expected markers 1..{expected}, got {numbers[:expected + 1]}")
+
+        segments = []
+        for marker, following in zip(markers, markers[1:] + [None]):
+            end = following.start() if following else len(content)
+            segments.append(content[marker.end():end].strip())
+        return segments
+
+    async def _astream(self, prompt: str, text: str, **kwargs) -> AsyncIterator[str]:
+        """Single streamed completion attempt, yielding content deltas"""
+        session = self._get_session()
+        # The last event then carries the token usage
+        payload = self._build_payload(prompt, stream=True, stream_options={"include_usage": True}, **kwargs)
+
+        async with self._semaphore:
+            # Rate limiting
+            with tracer.span("rate_limit.wait"):
+                await self.rate_limiter.acquire_async(self._estimate_request_tokens(prompt, text))
+            with _observe_upstream("stream"):
+                async with session.post(self.base_url, json=payload) as response:
+                    if response.status == 429:
+                        await self.rate_limiter.on_rate_limited_async()
+                        raise RateLimitError("Rate limit exceeded")
+                    if response.status == 401:
+                        raise AuthenticationError("Invalid API key")
+                    response.raise_for_status()
+
+                    async for raw_line in response.content:
+                        line = raw_line.decode("utf-8").strip()
+                        if not line.startswith("data:"):
+                            continue  # Blank separators and keep-alive comments
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            event = json.loads(data)
+                            choices = event["choices"]
+                            delta = choices[0].get("delta", {}).get("content") if choices else None
+                        except (ValueError, KeyError, IndexError, AttributeError):
+                            raise TranslationError(f"Malformed stream event: {data}")
+                        _record_usage(event.get("usage"))
+                        if delta:
+                            yield delta
+            await self.rate_limiter.on_success_async()
+
+    async def astream_text(
         self,
         text: str,
         target_lang: str,
         source_lang: str = "auto",
-        chunk_size: int = 1000,  # Reduced chunk size for reliability
-        max_workers: int = 2,    # Reduced parallelism to avoid rate limiting
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Stream a translation as tokens arrive. Failures before the first
+        token are retried like translate_text; later ones propagate.
+        """
+        model = kwargs.get("model", self.model)
+        key = None
+        if self.cache is not None:
+            key = make_cache_key(text, source_lang, target_lang, model, PROMPT_VERSION, kwargs)
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                _count_chunk(text, "cached")
+                yield cached
+                return
+
+        prompt = self._build_prompt(text, target_lang, source_lang)
+        parts: List[str] = []
+        for attempt in range(self.max_retries):
+            try:
+                async for delta in self._astream(prompt, text, **kwargs):
+                    parts.append(delta)
+                    yield delta
+                _count_chunk(text, "translated")
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError, RateLimitError) as e:
+                if parts or attempt == self.max_retries - 1:
+                    _count_chunk(text, "failed")
+                    raise
+                UPSTREAM_RETRIES.inc(status=_status_of(e))
+                # Same schedule as the tenacity policy on translate_text
+                wait = min(10, max(4, 2 ** attempt))
+                logger.warning(f"Stream attempt {attempt + 1} failed ({str(e) or type(e).__name__}), retrying in {wait}s")
+                await asyncio.sleep(wait)
+
+        if key is not None:
+            await asyncio.to_thread(
+                self.cache.set, key, "".join(parts), source_lang, target_lang, model, PROMPT_VERSION
+            )
+
+    async def astream_large_text(
+        self,
+        text: str,
+        target_lang: str,
+        source_lang: str = "auto",
+        request_tokens: Optional[int] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chunked translation in document order. All chunks are
+        translated concurrently; each chunk's tokens are emitted live once
+        every earlier chunk has finished, buffered until then. A failed
+        chunk raises its error once the chunks before it have been emitted.
+        """
+        chunks = self.plan_chunks(text, target_lang, source_lang, request_tokens).chunks
+        queues = [asyncio.Queue() for _ in chunks]
+        end = object()
+
+        async def produce(chunk_num: int, chunk: str):
+            try:
+                async for delta in self.astream_text(chunk, target_lang, source_lang, **kwargs):
+                    queues[chunk_num].put_nowait(delta)
+            except Exception as e:
+                logger.error(f"Chunk {chunk_num} failed: {str(e)}")
+                queues[chunk_num].put_nowait(e)
+            finally:
+                queues[chunk_num].put_nowait(end)
+
+        tasks = [asyncio.create_task(produce(chunk_num, chunk)) for chunk_num, chunk in enumerate(chunks)]
+        try:
+            for chunk_num, chunk_queue in enumerate(queues):
+                if chunk_num:
+                    yield " "
+                while True:
+                    delta = await chunk_queue.get()
+                    if delta is end:
+                        break
+                    if isinstance(delta, Exception):
+                        raise delta
+                    yield delta
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stream_large_text(
+        self,
+        text: str,
+        target_lang: str,
+        source_lang: str = "auto",
+        request_tokens: Optional[int] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """Sync generator over :meth:`astream_large_text` for WSGI responses"""
+        return _io_loop.iterate(self.astream_large_text(
+            text,
+            target_lang,
+            source_lang,
+            request_tokens=request_tokens,
+            **kwargs
+        ))
+
+    async def atranslate_large_text(
+        self,
+        text: str,
+        target_lang: str,
+        source_lang: str = "auto",
+        request_tokens: Optional[int] = None,  # Token target per request, prompt and output included
+        max_workers: Optional[int] = None,  # Per-call cap below max_concurrency
         progress_callback: callable = None,
+        strict: bool = False,  # Raise IncompleteTranslationError instead of leaving placeholders
         **kwargs
     ) -> str:
         """
         Translate large text with:
-        - Smart chunking
+        - Token-budgeted chunking
         - Progress reporting
         - Error recovery
         """
-        chunks = list(self._split_text_into_chunks(text, chunk_size))
+        plan = self.plan_chunks(text, target_lang, source_lang, request_tokens)
+        logger.info(
+            f"Planned {plan.chunk_count} chunks, ~{plan.estimated_tokens} input tokens "
+            f"(max {plan.max_chunk_tokens}/chunk)"
+        )
+        chunks = plan.chunks
         total_chunks = len(chunks)
         results: List[Tuple[int, str]] = []
         completed = 0
         errors = 0
+        call_limit = asyncio.Semaphore(max_workers) if max_workers else None
         
         def update_progress():
             if progress_callback:
@@ -131,34 +796,51 @@ class DeepSeekTranslator:
                 progress = min(100, int((completed / total_chunks) * 100))
                 progress_callback(progress)
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {
-                executor.submit(
-                    self._safe_translate_chunk,
-                    chunk,
-                    chunk_num,
-                    target_lang,
-                    source_lang,
-                    **kwargs
-                ): chunk_num
-                for chunk_num, chunk in enumerate(chunks)
-            }
-            
-            for future in as_completed(futures):
-                chunk_num = futures[future]
-                try:
-                    result = future.result()
-                    if result is not None:  # Skip failed chunks
-                        results.append((chunk_num, result))
-                    completed += 1
-                    update_progress()
-                except Exception as e:
-                    logger.error(f"Chunk {chunk_num} failed: {str(e)}")
-                    errors += 1
-                    # Add placeholder for failed chunk
-                    results.append((chunk_num, f"[TRANSLATION ERROR: {str(e)}]"))
-                    completed += 1
-                    update_progress()
+        async def run_chunk(chunk_num: int, chunk: str):
+            try:
+                if call_limit is None:
+                    result = await self._safe_translate_chunk(chunk, chunk_num, target_lang, source_lang, **kwargs)
+                else:
+                    async with call_limit:
+                        result = await self._safe_translate_chunk(chunk, chunk_num, target_lang, source_lang, **kwargs)
+                return chunk_num, result, None
+            except Exception as e:
+                return chunk_num, None, e
+
+        failed = {}
+        tasks = [run_chunk(chunk_num, chunk) for chunk_num, chunk in enumerate(chunks)]
+        for future in asyncio.as_completed(tasks):
+            chunk_num, result, error = await future
+            if error is None:
+                if result is not None:  # Skip failed chunks
+                    results.append((chunk_num, result))
+                completed += 1
+                update_progress()
+            else:
+                logger.error(f"Chunk {chunk_num} failed: {str(error)}")
+                failed[chunk_num] = chunks[chunk_num]
+
+        # Second chance for failed chunks once the rest is done
+        retried = await self.aretry_chunks(
+            failed,
+            target_lang,
+            source_lang,
+            concurrency=max(1, (max_workers or self.max_concurrency) // RETRY_CONCURRENCY_DIVISOR),
+            **kwargs
+        )
+        if strict:
+            failures = {chunk_num: result for chunk_num, result in retried.items() if isinstance(result, Exception)}
+            if failures:
+                raise IncompleteTranslationError(failures)
+        for chunk_num, result in retried.items():
+            if isinstance(result, Exception):
+                errors += 1
+                # Add placeholder for failed chunk
+                results.append((chunk_num, f"[TRANSLATION ERROR: {str(result)}]"))
+            else:
+                results.append((chunk_num, result))
+            completed += 1
+            update_progress()
 
         # Final progress update
         if progress_callback:
@@ -173,7 +855,43 @@ class DeepSeekTranslator:
             
         return translated_text
 
-    def _safe_translate_chunk(
+    async def aretry_chunks(
+        self,
+        chunks: Dict[int, str],
+        target_lang: str,
+        source_lang: str = "auto",
+        concurrency: Optional[int] = None,
+        translate: Optional[Callable[[str], Awaitable[str]]] = None,
+        **kwargs
+    ) -> Dict[int, Union[str, Exception]]:
+        """
+        Final pass over chunks that already failed, at a fraction of the
+        normal concurrency. Maps each index to its translation, or to the
+        exception if it failed again. ``translate`` replaces the plain
+        :meth:`atranslate_text` call for callers that wrap it.
+        """
+        if not chunks:
+            return {}
+        limit = asyncio.Semaphore(concurrency or max(1, self.max_concurrency // RETRY_CONCURRENCY_DIVISOR))
+        logger.info(f"Retrying {len(chunks)} failed chunks")
+
+        async def retry_chunk(chunk_num: int, chunk: str):
+            async with limit:
+                try:
+                    if translate is not None:
+                        translated = await translate(chunk)
+                    else:
+                        translated = await self.atranslate_text(chunk, target_lang, source_lang, **kwargs)
+                except Exception as e:
+                    logger.error(f"Chunk {chunk_num} failed again: {str(e)}")
+                    CHUNK_RETRIES.inc(outcome="failed")
+                    return chunk_num, e
+                CHUNK_RETRIES.inc(outcome="ok")
+                return chunk_num, translated
+
+        return dict(await asyncio.gather(*(retry_chunk(n, c) for n, c in chunks.items())))
+
+    async def _safe_translate_chunk(
         self,
         chunk: str,
         chunk_num: int,
@@ -185,7 +903,7 @@ class DeepSeekTranslator:
         Safely translate a single chunk with error handling
         """
         try:
-            return self.translate_text(
+            return await self.atranslate_text(
                 chunk,
                 target_lang,
                 source_lang,
@@ -195,56 +913,6 @@ class DeepSeekTranslator:
             logger.error(f"Failed to translate chunk {chunk_num}: {str(e)}")
             raise  # Re-raise to handle in the caller
 
-    def _split_text_into_chunks(self, text: str, chunk_size: int) -> Generator[str, None, None]:
-        """
-        Smart text chunking that preserves:
-        - Paragraph boundaries
-        - Sentence boundaries when possible
-        - Natural language breaks
-        """
-        if len(text) <= chunk_size:
-            yield text
-            return
-
-        # First try to split by paragraphs
-        paragraphs = text.split('\n\n')
-        current_chunk = ""
-        
-        for para in paragraphs:
-            if len(current_chunk) + len(para) > chunk_size:
-                if current_chunk:
-                    yield current_chunk
-                    current_chunk = para
-                else:
-                    # Paragraph is too big, split by sentences
-                    sentences = para.split('. ')
-                    for sent in sentences:
-                        if len(current_chunk) + len(sent) > chunk_size:
-                            if current_chunk:
-                                yield current_chunk
-                                current_chunk = sent
-                            else:
-                                # Sentence is too big, split by words
-                                words = sent.split(' ')
-                                for word in words:
-                                    if len(current_chunk) + len(word) > chunk_size:
-                                        if current_chunk:
-                                            yield current_chunk
-                                            current_chunk = word
-                                        else:
-                                            # Word is too big (unlikely), split by characters
-                                            for i in range(0, len(word), chunk_size):
-                                                yield word[i:i+chunk_size]
-                                    else:
-                                        current_chunk += ' ' + word if current_chunk else word
-                        else:
-                            current_chunk += '. ' + sent if current_chunk else sent
-            else:
-                current_chunk += '\n\n' + para if current_chunk else para
-        
-        if current_chunk:
-            yield current_chunk
-
     def _parse_response(self, response_data: dict) -> str:
         """Extract translated text from API response."""
         try:
@@ -1,334 +1,540 @@
 import os
+import re
 import tempfile
-from typing import Generator, Tuple
-import PyPDF2
+from copy import copy, deepcopy
+from typing import Generator, List, Mapping, Tuple, Optional
 from docx import Document
+from docx.oxml.ns import qn as w_qn
+from docx.parts.hdrftr import FooterPart, HeaderPart
 import pandas as pd
 from pptx import Presentation
+from pptx.oxml.ns import qn as a_qn
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
 import logging
-import re
+from chunking import ChunkPlanner
+from segments import Segment, pack_segments, encode_batch
+from metrics import registry, timed_iter, SLOW_BUCKETS
+from tracing import tracer
+from pdf_pages import iter_page_texts
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+EXTRACT_SECONDS = registry.histogram(
+    "document_extract_seconds", "Time spent extracting text from uploads", ["method", "format"], buckets=SLOW_BUCKETS
+)
+RECONSTRUCT_SECONDS = registry.histogram(
+    "document_reconstruct_seconds", "Time spent writing translated documents", ["format"], buckets=SLOW_BUCKETS
+)
+_FORMATS = {'.pdf', '.docx', '.pptx', '.xlsx', '.txt'}
+# Formats translated as addressed segments and written back in place
+_SEGMENTED_FORMATS = {'.xlsx', '.docx', '.pptx'}
+_CELL_STYLES = ('font', 'fill', 'border', 'alignment', 'protection', 'number_format')
+_W_P, _W_R, _W_T = w_qn('w:p'), w_qn('w:r'), w_qn('w:t')
+_W_TAB, _W_BR, _W_CR = w_qn('w:tab'), w_qn('w:br'), w_qn('w:cr')
+_MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+_XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+_A_P, _A_R, _A_T, _A_BR = a_qn('a:p'), a_qn('a:r'), a_qn('a:t'), a_qn('a:br')
+# Tabs and line breaks inside a paragraph travel as characters of its
+# segment and become elements again on write-back. PPTX keeps tabs as
+# plain text in a:t.
+_BREAKS = {_W_TAB: '\t', _W_BR: '\n', _W_CR: '\n', _A_BR: '\n'}
+_BREAK_TAGS = {_W_T: {'\t': _W_TAB, '\n': _W_BR}, _A_T: {'\n': _A_BR}}
+
+# A paragraph's segment: its id, the text and break nodes holding it, and the text
+TextUnit = Tuple[str, list, str]
+
+
+def _format_label(ext: str) -> str:
+    return ext.lstrip('.') if ext in _FORMATS else "other"
+
+
+def _is_translatable(text: str) -> bool:
+    """Only text with letters in it goes upstream; numbers and codes stay as they are"""
+    return any(ch.isalpha() for ch in text)
+
+
+def _is_translatable_cell(cell) -> bool:
+    """Text cells with letters in them; numbers, dates and formulas stay as they are"""
+    return cell.data_type == 's' and isinstance(cell.value, str) and _is_translatable(cell.value)
+
+
+def _cell_segment_id(sheet_index: int, cell) -> str:
+    return f"{sheet_index}:{cell.row}:{cell.column}"
+
+
+def _text_unit(segment_id: str, nodes: list) -> Optional[TextUnit]:
+    """
+    The unit for a paragraph's nodes in document order. Breaks before
+    the first or after the last text node (a trailing page break, say)
+    are not part of it and stay where they are.
+    """
+    texts = [index for index, node in enumerate(nodes) if node.tag not in _BREAKS]
+    if not texts:
+        return None
+    nodes = nodes[texts[0]:texts[-1] + 1]
+    text = "".join(_BREAKS.get(node.tag) or node.text or "" for node in nodes)
+    return (segment_id, nodes, text) if _is_translatable(text) else None
+
+
+def _mixes_runs(nodes: list) -> bool:
+    """Whether a stretch of text between breaks is spread over several runs"""
+    spread = 0
+    for node in nodes:
+        if node.tag in _BREAKS:
+            spread = 0
+        elif node.text:
+            spread += 1
+            if spread > 1:
+                return True
+    return False
+
+
+def _new_text(template, text: str):
+    """A copy of a text node's element (the w:t itself, or the whole a:r) holding ``text``"""
+    element = deepcopy(template if template.tag == _W_T else template.getparent())
+    node = element if template.tag == _W_T else element.find(_A_T)
+    node.text = text
+    if node.tag == _W_T:
+        node.set(_XML_SPACE, 'preserve')
+    return element
+
+
+def _break_anchor(text_node):
+    """The element a break is placed next to: w:tab/w:br sit in the run, a:br beside it"""
+    return text_node if text_node.tag == _W_T else text_node.getparent()
+
+
 class FileProcessor:
+    def __init__(
+        self,
+        pdf_workers: Optional[int] = None,
+        pdf_parallel_min_pages: Optional[int] = None,
+        pdf_pages_per_task: Optional[int] = None,
+        xlsx_stream_min_bytes: Optional[int] = None
+    ):
+        # Processes parsing PDF pages in parallel, 0 or 1 to stay serial
+        self.pdf_workers = pdf_workers if pdf_workers is not None else int(
+            os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1)))
+        )
+        # Smaller PDFs are parsed serially, a pool round trip isn't worth it
+        self.pdf_parallel_min_pages = pdf_parallel_min_pages or int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+        self.pdf_pages_per_task = pdf_pages_per_task or int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+        # Workbooks at least this big are written back by streaming, which
+        # drops their formatting; 0 always rewrites them in place
+        self.xlsx_stream_min_bytes = xlsx_stream_min_bytes if xlsx_stream_min_bytes is not None else int(
+            os.getenv("XLSX_STREAM_MIN_BYTES", "0")
+        )
+
     def extract_text(self, file_path: str) -> str:
         """Extract text from various file formats"""
         ext = os.path.splitext(file_path)[1].lower()
         logger.info(f"Extracting text from {file_path} with extension {ext}")
 
-        try:
-            if ext == '.pdf':
-                return self._extract_from_pdf(file_path)
-            elif ext == '.docx':
-                return self._extract_from_docx(file_path)
-            elif ext == '.pptx':
-                return self._extract_from_pptx(file_path)
-            elif ext == '.xlsx':
-                return self._extract_from_xlsx(file_path)
-            elif ext == '.txt':
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return f.read()
-            else:
-                raise ValueError(f"Unsupported file extension: {ext}")
-        except Exception as e:
-            logger.error(f"Error extracting text from {file_path}: {str(e)}")
-            raise ValueError(f"Could not process file: {str(e)}")
+        with tracer.span("FileProcessor.extract_text", format=_format_label(ext)), \
+                EXTRACT_SECONDS.time(method="extract_text", format=_format_label(ext)):
+            try:
+                if ext == '.pdf':
+                    return self._extract_from_pdf(file_path)
+                elif ext == '.docx':
+                    return self._extract_from_docx(file_path)
+                elif ext == '.pptx':
+                    return self._extract_from_pptx(file_path)
+                elif ext == '.xlsx':
+                    return self._extract_from_xlsx(file_path)
+                elif ext == '.txt':
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        return f.read()
+                else:
+                    raise ValueError(f"Unsupported file extension: {ext}")
+            except Exception as e:
+                logger.error(f"Error extracting text from {file_path}: {str(e)}")
+                raise ValueError(f"Could not process file: {str(e)}")
         
-    def extract_large_text(self, file_path: str, chunk_size: int = 1000) -> Generator[str, None, None]:
-        """Yield text chunks from large files with smart splitting"""
+    def extract_large_text(self, file_path: str, planner: Optional[ChunkPlanner] = None) -> Generator[str, None, None]:
+        """Yield text chunks from large files, packed to the planner's token budget"""
         ext = os.path.splitext(file_path)[1].lower()
-        logger.info(f"Extracting large text from {file_path}")
+        planner = planner or ChunkPlanner()
+        logger.info(f"Extracting large text from {file_path} (max {planner.max_tokens} tokens/chunk)")
         
+        extractors = {
+            '.pdf': self._extract_smart_chunks_from_pdf,
+            '.docx': self._extract_smart_chunks_from_docx,
+            '.pptx': self._extract_smart_chunks_from_pptx,
+            '.xlsx': self._extract_smart_chunks_from_xlsx,
+            '.txt': self._extract_smart_chunks_from_txt
+        }
         try:
-            if ext == '.pdf':
-                yield from self._extract_smart_chunks_from_pdf(file_path, chunk_size)
-            elif ext == '.docx':
-                yield from self._extract_smart_chunks_from_docx(file_path, chunk_size)
-            elif ext == '.pptx':
-                yield from self._extract_smart_chunks_from_pptx(file_path, chunk_size)
-            elif ext == '.xlsx':
-                yield from self._extract_smart_chunks_from_xlsx(file_path, chunk_size)
-            elif ext == '.txt':
-                yield from self._extract_smart_chunks_from_txt(file_path, chunk_size)
-            else:
+            if ext not in extractors:
                 raise ValueError(f"Unsupported file extension: {ext}")
+            # Only time spent extracting counts, not time the consumer holds a chunk
+            chunks = timed_iter(
+                extractors[ext](file_path, planner),
+                EXTRACT_SECONDS, method="extract_large_text", format=_format_label(ext)
+            )
+            # Each chunk's span covers parsing and packing it
+            yield from tracer.traced_iter(chunks, "FileProcessor.extract_large_text", format=_format_label(ext))
         except Exception as e:
             logger.error(f"Error extracting large text: {str(e)}")
             raise
 
-    def _extract_smart_chunks_from_pdf(self, file_path: str, chunk_size: int) -> Generator[str, None, None]:
+    def supports_segments(self, file_path: str) -> bool:
+        """Whether the format is translated segment by segment and patched in place"""
+        return os.path.splitext(file_path)[1].lower() in _SEGMENTED_FORMATS
+
+    def extract_segments(self, file_path: str) -> Generator[Segment, None, None]:
+        """Yield every translatable unit with its id, in document order"""
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext == '.xlsx':
+            yield from self._extract_segments_from_xlsx(file_path)
+        elif ext == '.docx':
+            for segment_id, _, text in self._docx_units(Document(file_path)):
+                yield Segment(segment_id, text)
+        elif ext == '.pptx':
+            for segment_id, _, text in self._pptx_units(Presentation(file_path)):
+                yield Segment(segment_id, text)
+        else:
+            raise ValueError(f"Segment extraction not supported for {ext}")
+
+    def extract_segment_chunks(self, file_path: str, planner: Optional[ChunkPlanner] = None) -> Generator[str, None, None]:
+        """Segments packed to the planner's token budget, each batch encoded as one chunk"""
+        ext = os.path.splitext(file_path)[1].lower()
+        planner = planner or ChunkPlanner()
+        logger.info(f"Extracting segments from {file_path} (max {planner.max_tokens} tokens/chunk)")
+        batches = (encode_batch(batch) for batch in pack_segments(self.extract_segments(file_path), planner.max_tokens))
+        chunks = timed_iter(batches, EXTRACT_SECONDS, method="extract_segments", format=_format_label(ext))
+        yield from tracer.traced_iter(chunks, "FileProcessor.extract_segments", format=_format_label(ext))
+
+    def reconstruction_notes(self, original_path: str) -> List[str]:
+        """What the translated copy of this upload leaves out, for the API response"""
+        ext = os.path.splitext(original_path)[1].lower()
+        notes = []
+        if ext == '.xlsx' and self._streams_xlsx(original_path):
+            notes.append(
+                "Workbook too large to rewrite in place: merged cells, column widths, charts, "
+                "images, data validation and conditional formatting were dropped"
+            )
+        elif ext in ('.docx', '.pptx'):
+            units = self._docx_units(Document(original_path)) if ext == '.docx' \
+                else self._pptx_units(Presentation(original_path))
+            mixed = sum(1 for _, nodes, _ in units if _mixes_runs(nodes))
+            if mixed:
+                notes.append(
+                    f"{mixed} paragraphs mix formatting between their tabs and line breaks: each such "
+                    f"stretch was translated whole and takes the formatting of its first run"
+                )
+        return notes
+
+    def _streams_xlsx(self, file_path: str) -> bool:
+        return 0 < self.xlsx_stream_min_bytes <= os.path.getsize(file_path)
+
+    def _extract_segments_from_xlsx(self, file_path: str) -> Generator[Segment, None, None]:
+        """Text cells of every sheet, streamed without loading the workbook"""
+        workbook = load_workbook(file_path, read_only=True)
+        try:
+            for sheet_index, sheet in enumerate(workbook.worksheets):
+                # Stored dimensions are often wrong; read whatever rows there are
+                sheet.reset_dimensions()
+                for row in sheet.iter_rows():
+                    for cell in row:
+                        if _is_translatable_cell(cell):
+                            yield Segment(_cell_segment_id(sheet_index, cell), cell.value)
+        finally:
+            workbook.close()
+
+    def _docx_units(self, document) -> Generator[TextUnit, None, None]:
+        """
+        Every paragraph of the body (tables, nested tables and text boxes
+        included), then of each header and footer part. Ids are the part
+        name and the paragraph's position in it.
+        """
+        package_parts = document.part.package.iter_parts()
+        parts = [document.part] + sorted(
+            (part for part in package_parts if isinstance(part, (HeaderPart, FooterPart))),
+            key=lambda part: str(part.partname)
+        )
+        for part in parts:
+            for index, paragraph in enumerate(part.element.iter(_W_P)):
+                # Word keeps a legacy copy of text boxes under mc:Fallback;
+                # readers use mc:Choice, and translating both bills the text twice
+                if any(ancestor.tag == _MC_FALLBACK for ancestor in paragraph.iterancestors()):
+                    continue
+                # Text of this paragraph, not of paragraphs in its text boxes;
+                # w:tab also names tab stops in the paragraph properties
+                nodes = [
+                    node for node in paragraph.iter(_W_T, _W_TAB, _W_BR, _W_CR)
+                    if node.getparent().tag == _W_R and next(node.iterancestors(_W_P)) is paragraph
+                ]
+                unit = _text_unit(f"{part.partname}:{index}", nodes)
+                if unit is not None:
+                    yield unit
+
+    def _pptx_units(self, presentation) -> Generator[TextUnit, None, None]:
+        """Every paragraph of every slide"""
+        for slide in presentation.slides:
+            yield from self._slide_units(slide)
+
+    def _slide_units(self, slide) -> Generator[TextUnit, None, None]:
+        """
+        Every paragraph of the slide, in shapes, groups and tables alike.
+        Fields (slide numbers, dates) are left alone.
+        """
+        for index, paragraph in enumerate(slide._element.iter(_A_P)):
+            nodes = [
+                node
+                for child in paragraph.iterchildren(_A_R, _A_BR)
+                for node in (child.iterchildren(_A_T) if child.tag == _A_R else [child])
+            ]
+            unit = _text_unit(f"{slide.part.partname}:{index}", nodes)
+            if unit is not None:
+                yield unit
+
+    def _patch_units(self, units: Generator[TextUnit, None, None], segments: Mapping[str, str]) -> int:
+        """Write each translation back over its unit's nodes"""
+        patched = 0
+        for segment_id, nodes, _ in units:
+            translated = segments.get(segment_id)
+            if translated is not None:
+                self._patch_nodes(nodes, translated)
+                patched += 1
+        return patched
+
+    def _patch_nodes(self, nodes: list, translated: str):
+        """
+        When the translation kept the unit's tabs and breaks, each stretch
+        of text between them goes into the first run it came from, so runs
+        keep their formatting stretch by stretch (the last stretch in the
+        first run's formatting if its words were spread over several).
+        Otherwise the whole translation takes the first run's formatting,
+        with its tabs and breaks rebuilt there.
+        """
+        template = nodes[0]
+        tags = _BREAK_TAGS[template.tag]
+        pieces = re.split(f"([{''.join(tags)}])", translated)
+        texts, breaks = pieces[0::2], pieces[1::2]
+        stretches = [[]]
+        markers = []
+        for node in nodes:
+            if node.tag in _BREAKS:
+                markers.append(node)
+                stretches.append([])
+            else:
+                stretches[-1].append(node)
+
+        if breaks == [_BREAKS[marker.tag] for marker in markers]:
+            for index, (stretch, text) in enumerate(zip(stretches, texts)):
+                if stretch:
+                    stretch[0].text = text
+                    if stretch[0].tag == _W_T:
+                        stretch[0].set(_XML_SPACE, 'preserve')
+                    for node in stretch[1:]:
+                        node.text = ""
+                elif text:
+                    # Two breaks in a row with words now between them
+                    markers[index - 1].addnext(_new_text(template, text))
+            return
+
+        # Reuse the original break elements in order, so a page break stays one
+        spare = {char: [marker for marker in markers if _BREAKS[marker.tag] == char] for char in tags}
+        for marker in markers:
+            marker.getparent().remove(marker)
+        for node in nodes[1:]:
+            if node.tag not in _BREAKS:
+                node.text = ""
+        template.text = texts[0]
+        if template.tag == _W_T:
+            template.set(_XML_SPACE, 'preserve')
+        anchor = _break_anchor(template)
+        for char, text in zip(breaks, texts[1:]):
+            marker = spare[char].pop(0) if spare[char] else anchor.makeelement(tags[char], {})
+            anchor.addnext(marker)
+            anchor = marker
+            if text:
+                element = _new_text(template, text)
+                anchor.addnext(element)
+                anchor = element
+
+    def _extract_smart_chunks_from_pdf(self, file_path: str, planner: ChunkPlanner) -> Generator[str, None, None]:
         """Yield PDF text in chunks with paragraph awareness"""
-        current_chunk = ""
-        with open(file_path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                page_text = page.extract_text() or ""
-                paragraphs = page_text.split('\n\n')
-                
-                for para in paragraphs:
-                    if len(current_chunk) + len(para) > chunk_size:
-                        if current_chunk:
-                            yield current_chunk
-                            current_chunk = para
-                        else:
-                            # Paragraph is too big, split by sentences
-                            sentences = re.split(r'(?<=[.!?])\s+', para)
-                            for sent in sentences:
-                                if len(current_chunk) + len(sent) > chunk_size:
-                                    if current_chunk:
-                                        yield current_chunk
-                                        current_chunk = sent
-                                    else:
-                                        # Sentence is too big, split by words
-                                        words = sent.split()
-                                        for word in words:
-                                            if len(current_chunk) + len(word) > chunk_size:
-                                                if current_chunk:
-                                                    yield current_chunk
-                                                    current_chunk = word
-                                                else:
-                                                    # Word is too big, split by characters
-                                                    for i in range(0, len(word), chunk_size):
-                                                        yield word[i:i+chunk_size]
-                                            else:
-                                                current_chunk += ' ' + word if current_chunk else word
-                                else:
-                                    current_chunk += ' ' + sent if current_chunk else sent
-                    else:
-                        current_chunk += '\n\n' + para if current_chunk else para
-        
-        if current_chunk:
-            yield current_chunk
+        def paragraphs():
+            for page_text in iter_page_texts(
+                file_path,
+                workers=self.pdf_workers,
+                min_pages=self.pdf_parallel_min_pages,
+                pages_per_task=self.pdf_pages_per_task
+            ):
+                yield from page_text.split('\n\n')
 
-    def _extract_smart_chunks_from_docx(self, file_path: str, chunk_size: int) -> Generator[str, None, None]:
-        """Yield DOCX text in chunks with paragraph awareness"""
-        current_chunk = ""
-        doc = Document(file_path)
-        for para in doc.paragraphs:
-            if para.text:
-                if len(current_chunk) + len(para.text) > chunk_size:
-                    if current_chunk:
-                        yield current_chunk
-                        current_chunk = para.text
-                    else:
-                        # Paragraph is too big, split by sentences
-                        sentences = re.split(r'(?<=[.!?])\s+', para.text)
-                        for sent in sentences:
-                            if len(current_chunk) + len(sent) > chunk_size:
-                                if current_chunk:
-                                    yield current_chunk
-                                    current_chunk = sent
-                                else:
-                                    # Sentence is too big, split by words
-                                    words = sent.split()
-                                    for word in words:
-                                        if len(current_chunk) + len(word) > chunk_size:
-                                            if current_chunk:
-                                                yield current_chunk
-                                                current_chunk = word
-                                            else:
-                                                # Word is too big, split by characters
-                                                for i in range(0, len(word), chunk_size):
-                                                    yield word[i:i+chunk_size]
-                                        else:
-                                            current_chunk += ' ' + word if current_chunk else word
-                            else:
-                                current_chunk += ' ' + sent if current_chunk else sent
-                else:
-                    current_chunk += '\n\n' + para.text if current_chunk else para.text
-        if current_chunk:
-            yield current_chunk
+        yield from planner.pack(paragraphs(), '\n\n')
 
+    def _extract_smart_chunks_from_docx(self, file_path: str, planner: ChunkPlanner) -> Generator[str, None, None]:
+        """Yield DOCX text in chunks with paragraph awareness"""
+        # The paragraphs write-back patches: tables, text boxes, headers and footers too
+        units = self._docx_units(Document(file_path))
+        yield from planner.pack((text for _, _, text in units), '\n\n')
 
-    def _extract_smart_chunks_from_pptx(self, file_path: str, chunk_size: int) -> Generator[str, None, None]:
+    def _extract_smart_chunks_from_pptx(self, file_path: str, planner: ChunkPlanner) -> Generator[str, None, None]:
         """Yield PPTX text in chunks with slide awareness"""
-        current_chunk = ""
         prs = Presentation(file_path)
-        
-        for slide in prs.slides:
-            slide_text = []
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text.strip():
-                    slide_text.append(shape.text.strip())
-            
-            slide_content = "\n".join(slide_text)
-            
-            # Try to keep slide content together when possible
-            if len(current_chunk) + len(slide_content) > chunk_size:
-                if current_chunk:
-                    yield current_chunk
-                    current_chunk = slide_content
-                else:
-                    # Slide content is too big, split by shape
-                    for shape_text in slide_text:
-                        if len(current_chunk) + len(shape_text) > chunk_size:
-                            if current_chunk:
-                                yield current_chunk
-                                current_chunk = shape_text
-                            else:
-                                # Shape text is too big, split by lines
-                                lines = shape_text.split('\n')
-                                for line in lines:
-                                    if len(current_chunk) + len(line) > chunk_size:
-                                        if current_chunk:
-                                            yield current_chunk
-                                            current_chunk = line
-                                        else:
-                                            # Line is too big, split by words
-                                            words = line.split()
-                                            for word in words:
-                                                if len(current_chunk) + len(word) > chunk_size:
-                                                    if current_chunk:
-                                                        yield current_chunk
-                                                        current_chunk = word
-                                                    else:
-                                                        # Word is too big, split by characters
-                                                        for i in range(0, len(word), chunk_size):
-                                                            yield word[i:i+chunk_size]
-                                                else:
-                                                    current_chunk += ' ' + word if current_chunk else word
-                                    else:
-                                        current_chunk += '\n' + line if current_chunk else line
-                        else:
-                            current_chunk += '\n' + shape_text if current_chunk else shape_text
-            else:
-                current_chunk += '\n\n' + slide_content if current_chunk else slide_content
-        
-        if current_chunk:
-            yield current_chunk
 
-    def _extract_smart_chunks_from_xlsx(self, file_path: str, chunk_size: int) -> Generator[str, None, None]:
+        def slides():
+            for slide in prs.slides:
+                # Slides too big for one chunk are split at paragraph/line breaks
+                yield "\n".join(text for _, _, text in self._slide_units(slide))
+
+        yield from planner.pack(slides(), '\n\n')
+
+    def _extract_smart_chunks_from_xlsx(self, file_path: str, planner: ChunkPlanner) -> Generator[str, None, None]:
         """Yield XLSX text in chunks with cell awareness"""
-        current_chunk = ""
-        df = pd.read_excel(file_path)
-        
-        # Convert dataframe to text representation
-        for _, row in df.iterrows():
-            row_text = " | ".join(str(cell) for cell in row.values if pd.notna(cell))
-            
-            if len(current_chunk) + len(row_text) > chunk_size:
-                if current_chunk:
-                    yield current_chunk
-                    current_chunk = row_text
-                else:
-                    # Row is too big, split by cells
-                    cells = [str(cell) for cell in row.values if pd.notna(cell)]
-                    for cell in cells:
-                        if len(current_chunk) + len(cell) > chunk_size:
-                            if current_chunk:
-                                yield current_chunk
-                                current_chunk = cell
-                            else:
-                                # Cell is too big, split by words
-                                words = cell.split()
-                                for word in words:
-                                    if len(current_chunk) + len(word) > chunk_size:
-                                        if current_chunk:
-                                            yield current_chunk
-                                            current_chunk = word
-                                        else:
-                                            # Word is too big, split by characters
-                                            for i in range(0, len(word), chunk_size):
-                                                yield word[i:i+chunk_size]
-                                    else:
-                                        current_chunk += ' ' + word if current_chunk else word
-                        else:
-                            current_chunk += ' | ' + cell if current_chunk else cell
-            else:
-                current_chunk += '\n' + row_text if current_chunk else row_text
-        
-        if current_chunk:
-            yield current_chunk
+        def rows():
+            workbook = load_workbook(file_path, read_only=True)
+            try:
+                for sheet in workbook.worksheets:
+                    sheet.reset_dimensions()
+                    for values in sheet.iter_rows(values_only=True):
+                        cells = [str(value) for value in values if value is not None]
+                        if cells:
+                            yield " | ".join(cells)
+            finally:
+                workbook.close()
+
+        yield from planner.pack(rows(), '\n')
 
-    def _extract_smart_chunks_from_txt(self, file_path: str, chunk_size: int) -> Generator[str, None, None]:
+    def _extract_smart_chunks_from_txt(self, file_path: str, planner: ChunkPlanner) -> Generator[str, None, None]:
         """Yield text file content in chunks with paragraph awareness"""
-        current_chunk = ""
-        
         with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                if len(current_chunk) + len(line) > chunk_size:
-                    if current_chunk:
-                        yield current_chunk
-                        current_chunk = line
-                    else:
-                        # Line is too big, split by sentences
-                        sentences = re.split(r'(?<=[.!?])\s+', line)
-                        for sent in sentences:
-                            if len(current_chunk) + len(sent) > chunk_size:
-                                if current_chunk:
-                                    yield current_chunk
-                                    current_chunk = sent
-                                else:
-                                    # Sentence is too big, split by words
-                                    words = sent.split()
-                                    for word in words:
-                                        if len(current_chunk) + len(word) > chunk_size:
-                                            if current_chunk:
-                                                yield current_chunk
-                                                current_chunk = word
-                                            else:
-                                                # Word is too big, split by characters
-                                                for i in range(0, len(word), chunk_size):
-                                                    yield word[i:i+chunk_size]
-                                        else:
-                                            current_chunk += ' ' + word if current_chunk else word
-                            else:
-                                current_chunk += ' ' + sent if current_chunk else sent
-                else:
-                    current_chunk += '\n' + line if current_chunk else line
-        
-        if current_chunk:
-            yield current_chunk
+            yield from planner.pack((line.strip() for line in f), '\n')
 
     # Similar smart chunking methods for other file types...
 
-    def reconstruct_document(self, original_path: str, translated_text: str, target_lang: str) -> str:
-        """Recreate document with translated text with improved handling"""
+    def reconstruct_document(
+        self,
+        original_path: str,
+        translated_text: str,
+        target_lang: str,
+        segments: Optional[Mapping[str, str]] = None
+    ) -> str:
+        """
+        Recreate document with translated text with improved handling.
+        For segmented formats, ``segments`` (segment id -> translation)
+        is written back into a copy of the original instead.
+        """
         ext = os.path.splitext(original_path)[1].lower()
         output_dir = tempfile.mkdtemp()
         output_filename = f"translated_{target_lang}{ext}"
         output_path = os.path.join(output_dir, output_filename)
         logger.info(f"Reconstructing document at {output_path}")
 
-        try:
-            if ext == '.pdf':
-                from fpdf import FPDF
-                pdf = FPDF()
-                pdf.add_page()
-                pdf.set_font("Arial", size=12)
-                # Split text into chunks that fit on PDF pages
-                for chunk in [translated_text[i:i+2000] for i in range(0, len(translated_text), 2000)]:
-                    pdf.multi_cell(0, 10, txt=chunk)
+        with tracer.span("FileProcessor.reconstruct_document", format=_format_label(ext)), \
+                RECONSTRUCT_SECONDS.time(format=_format_label(ext)):
+            try:
+                if segments is not None and ext == '.xlsx':
+                    self._write_segments_to_xlsx(original_path, segments, output_path)
+                elif segments is not None and ext == '.docx':
+                    # Patched in place, so layout, styles and images survive
+                    doc = Document(original_path)
+                    self._patch_units(self._docx_units(doc), segments)
+                    doc.save(output_path)
+                elif segments is not None and ext == '.pptx':
+                    prs = Presentation(original_path)
+                    self._patch_units(self._pptx_units(prs), segments)
+                    prs.save(output_path)
+                elif ext == '.pdf':
+                    from fpdf import FPDF
+                    pdf = FPDF()
                     pdf.add_page()
-                pdf.output(output_path)
-            elif ext == '.docx':
-                doc = Document()
-                for paragraph in translated_text.split('\n'):
-                    doc.add_paragraph(paragraph)
-                doc.save(output_path)
-            elif ext == '.pptx':
-                prs = Presentation()
-                slide = prs.slides.add_slide(prs.slide_layouts[1])
-                for i, paragraph in enumerate(translated_text.split('\n')):
-                    if i == 0:
-                        slide.shapes.title.text = paragraph
-                    else:
-                        slide.placeholders[1].text += "\n" + paragraph
-                prs.save(output_path)
-            elif ext == '.xlsx':
-                df = pd.DataFrame({"Translated Text": translated_text.split('\n')})
-                df.to_excel(output_path, index=False)
-            else:
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(translated_text)
+                    pdf.set_font("Arial", size=12)
+                    # Split text into chunks that fit on PDF pages
+                    for chunk in [translated_text[i:i+2000] for i in range(0, len(translated_text), 2000)]:
+                        pdf.multi_cell(0, 10, txt=chunk)
+                        pdf.add_page()
+                    pdf.output(output_path)
+                elif ext == '.docx':
+                    doc = Document()
+                    for paragraph in translated_text.split('\n'):
+                        doc.add_paragraph(paragraph)
+                    doc.save(output_path)
+                elif ext == '.pptx':
+                    prs = Presentation()
+                    slide = prs.slides.add_slide(prs.slide_layouts[1])
+                    for i, paragraph in enumerate(translated_text.split('\n')):
+                        if i == 0:
+                            slide.shapes.title.text = paragraph
+                        else:
+                            slide.placeholders[1].text += "\n" + paragraph
+                    prs.save(output_path)
+                elif ext == '.xlsx':
+                    df = pd.DataFrame({"Translated Text": translated_text.split('\n')})
+                    df.to_excel(output_path, index=False)
+                else:
+                    with open(output_path, 'w', encoding='utf-8') as f:
+                        f.write(translated_text)
             
-            return output_path
-        except Exception as e:
-            logger.error(f"Document reconstruction error: {str(e)}")
-            raise ValueError(f"Failed to reconstruct document: {str(e)}")
\ No newline at end of file
+                return output_path
+            except Exception as e:
+                logger.error(f"Document reconstruction error: {str(e)}")
+                raise ValueError(f"Failed to reconstruct document: {str(e)}")
+
+    def _write_segments_to_xlsx(self, original_path: str, segments: Mapping[str, str], output_path: str):
+        """
+        Set the translated text cells in the original workbook and save it
+        as the copy, so formatting, merged cells, charts and validation
+        stay as they were.
+        """
+        if self._streams_xlsx(original_path):
+            self._stream_segments_to_xlsx(original_path, segments, output_path)
+            return
+        workbook = load_workbook(original_path)
+        for sheet_index, sheet in enumerate(workbook.worksheets):
+            for row in sheet.iter_rows():
+                for cell in row:
+                    if not _is_translatable_cell(cell):
+                        continue
+                    translated = segments.get(_cell_segment_id(sheet_index, cell))
+                    if translated is None:
+                        continue
+                    cell.value = translated
+                    # Text starting with '=' must not turn into a formula
+                    cell.data_type = 's'
+        workbook.save(output_path)
+
+    def _stream_segments_to_xlsx(self, original_path: str, segments: Mapping[str, str], output_path: str):
+        """
+        Stream the original into a write-only copy with translated text
+        cells, for workbooks too big to load. Values, formulas and cell
+        styles are kept; read-only mode does not expose merged ranges,
+        column widths, charts or images, so those are lost.
+        """
+        source = load_workbook(original_path, read_only=True)
+        target = Workbook(write_only=True)
+        try:
+            for sheet_index, sheet in enumerate(source.worksheets):
+                sheet.reset_dimensions()
+                out = target.create_sheet(sheet.title)
+                for row in sheet.iter_rows():
+                    values = []
+                    for cell in row:
+                        value = cell.value
+                        if value is None:
+                            values.append(None)
+                            continue
+                        if _is_translatable_cell(cell):
+                            value = segments.get(_cell_segment_id(sheet_index, cell), value)
+                        # Text starting with '=' must not turn into a formula
+                        as_text = cell.data_type == 's' and isinstance(value, str) and value.startswith('=')
+                        if not cell.has_style and not as_text:
+                            values.append(value)
+                            continue
+                        out_cell = WriteOnlyCell(out, value)
+                        if as_text:
+                            out_cell.data_type = 's'
+                        if cell.has_style:
+                            for style in _CELL_STYLES:
+                                setattr(out_cell, style, copy(getattr(cell, style)))
+                        values.append(out_cell)
+                    out.append(values)
+            target.save(output_path)
+        finally:
+            source.close()
@@ -0,0 +1,187 @@
+import os
+import re
+import gzip
+import argparse
+import logging
+from datetime import date
+from typing import List, Dict, Any, Optional
+
+from psycopg2 import sql
+
+from database import db
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PARENT = "translation_history"
+DEFAULT_PARTITION = "translation_history_default"
+_PARTITION_NAME = re.compile(r"^translation_history_y(\d{4})m(\d{2})$")
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_y{month.year:04d}m{month.month:02d}"
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_of(value: date) -> date:
+    return value.replace(day=1)
+
+
+def list_partitions() -> List[Dict[str, Any]]:
+    """
+    Monthly translation_history tables, oldest first, including ones
+    already detached (``attached`` is False) but not yet archived
+    """
+    with db.get_cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname AS name, c.reltuples::bigint AS estimated_rows,
+                   pg_total_relation_size(c.oid) AS bytes,
+                   i.inhparent IS NOT NULL AS attached
+            FROM pg_class c
+            LEFT JOIN pg_inherits i ON i.inhrelid = c.oid AND i.inhparent = %s::regclass
+            WHERE c.relkind = 'r'
+            AND c.relnamespace = 'public'::regnamespace
+            AND c.relname ~ %s
+            ORDER BY c.relname
+            """, (PARENT, _PARTITION_NAME.pattern))
+        rows = cursor.fetchall()
+    return [
+        {**row, 'month': date(int(match.group(1)), int(match.group(2)), 1)}
+        for row in rows
+        for match in [_PARTITION_NAME.match(row['name'])]
+    ]
+
+
+def ensure_partition(month: date) -> bool:
+    """
+    Create the partition for ``month`` if it is missing. Rows for that
+    month already sitting in the default partition are moved into it
+    first, since attaching would fail otherwise.
+    """
+    name = partition_name(month)
+    start, end = month, add_months(month, 1)
+    with db.get_cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL AS present", (name,))
+        if cursor.fetchone()['present']:
+            return False
+        cursor.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)").format(
+            sql.Identifier(name), sql.Identifier(PARENT)
+        ))
+        cursor.execute(sql.SQL("""
+            WITH moved AS (
+                DELETE FROM {} WHERE created_at >= %s AND created_at < %s RETURNING *
+            )
+            INSERT INTO {} SELECT * FROM moved
+            """).format(sql.Identifier(DEFAULT_PARTITION), sql.Identifier(name)), (start, end))
+        if cursor.rowcount:
+            logger.info(f"Moved {cursor.rowcount} rows from {DEFAULT_PARTITION} into {name}")
+        cursor.execute(sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM (%s) TO (%s)").format(
+            sql.Identifier(PARENT), sql.Identifier(name)
+        ), (start, end))
+    logger.info(f"Created partition {name}")
+    return True
+
+
+def ensure_future_partitions(months_ahead: int, today: Optional[date] = None) -> List[str]:
+    current = month_of(today or date.today())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if ensure_partition(month):
+            created.append(partition_name(month))
+    return created
+
+
+def archive_partition(name: str, archive_dir: Optional[str], attached: bool = True) -> Optional[str]:
+    """
+    Detach a partition, then, if ``archive_dir`` is given, write it to a
+    gzipped CSV there and drop it. Without an archive directory the table
+    is only detached and stays queryable on its own.
+    """
+    if attached:
+        with db.get_cursor() as cursor:
+            cursor.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+                sql.Identifier(PARENT), sql.Identifier(name)
+            ))
+        logger.info(f"Detached {name}")
+    if not archive_dir:
+        return None
+
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+    partial = path + ".partial"
+    with db.get_cursor() as cursor:
+        with gzip.open(partial, "wt", encoding="utf-8") as archive:
+            cursor.copy_expert(
+                sql.SQL("COPY {} TO STDOUT WITH (FORMAT csv, HEADER)").format(sql.Identifier(name)).as_string(cursor),
+                archive
+            )
+        # Only drop the table once the archive is complete on disk
+        with open(partial, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(partial, path)
+        cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+    logger.info(f"Archived {name} to {path}")
+    return path
+
+
+def apply_retention(
+    retention_months: int,
+    archive_dir: Optional[str],
+    dry_run: bool = False,
+    today: Optional[date] = None
+) -> List[str]:
+    """Detach (and archive) partitions wholly older than ``retention_months``"""
+    cutoff = add_months(month_of(today or date.today()), -retention_months)
+    expired = [
+        p for p in list_partitions()
+        # Detached tables only need work when they still have to be archived
+        if p['month'] < cutoff and (p['attached'] or archive_dir)
+    ]
+    if not dry_run:
+        for partition in expired:
+            archive_partition(partition['name'], archive_dir, partition['attached'])
+    return [p['name'] for p in expired]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain monthly translation_history partitions")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("list", help="Show monthly partitions")
+
+    ensure = subparsers.add_parser("ensure", help="Create partitions for upcoming months")
+    ensure.add_argument("--months-ahead", type=int, default=int(os.getenv("HISTORY_PARTITIONS_AHEAD", "3")))
+
+    retention = subparsers.add_parser("retention", help="Detach or archive partitions past retention")
+    retention.add_argument(
+        "--months", type=int, default=int(os.getenv("HISTORY_RETENTION_MONTHS", "12")),
+        help="Full months to keep before the current one"
+    )
+    retention.add_argument(
+        "--archive-dir", default=os.getenv("HISTORY_ARCHIVE_DIR"),
+        help="Write expired partitions here as .csv.gz and drop them (default: only detach)"
+    )
+    retention.add_argument("--dry-run", action="store_true", help="List what would be detached")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for partition in list_partitions():
+            state = "" if partition['attached'] else "\tdetached"
+            print(f"{partition['name']}\t~{partition['estimated_rows']} rows\t{partition['bytes']} bytes{state}")
+    elif args.command == "ensure":
+        created = ensure_future_partitions(args.months_ahead)
+        print(f"Created {len(created)} partitions" + (f": {', '.join(created)}" if created else ""))
+    elif args.command == "retention":
+        expired = apply_retention(args.months, args.archive_dir, args.dry_run)
+        verb = "Would detach" if args.dry_run else ("Archived" if args.archive_dir else "Detached")
+        print(f"{verb} {len(expired)} partitions" + (f": {', '.join(expired)}" if expired else ""))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+import os
+import time
+import threading
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, Any, List, Optional
+
+import psycopg2
+from psycopg2.pool import PoolError
+
+from database import record_translation, record_translations_batch, get_user_usage_stats
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class HistoryRecorder:
+    """
+    Write-behind front for ``record_translation``. Calls are buffered in
+    memory and a background thread writes them in batches once
+    ``flush_rows`` are waiting or every ``flush_interval`` seconds. When
+    the buffer already holds ``max_buffer`` rows the call is written
+    synchronously instead, so a slow database pushes back on requests
+    rather than growing memory. With ``enabled=False`` every call is
+    written synchronously, as before.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_buffer: int = 10000,
+        flush_rows: int = 500,
+        flush_interval: float = 1.0
+    ):
+        self.enabled = enabled
+        self.max_buffer = max_buffer
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Characters buffered but not yet written, per user
+        self._pending: Dict[int, int] = {}
+        self.max_depth = 0
+        self.buffered = 0
+        self.sync_writes = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+        self.flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.last_flush_seconds = 0.0
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="history-recorder", daemon=True)
+        self._thread.start()
+        logger.info(f"History write-behind enabled (buffer {self.max_buffer}, {self.flush_rows} rows / {self.flush_interval}s)")
+
+    def close(self):
+        """Stop the flusher and write out everything still buffered"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        while self._buffer:
+            if not self.flush():
+                break
+
+    def record(self, **kwargs) -> bool:
+        """Same arguments as ``record_translation``"""
+        if self.enabled and self._thread is not None:
+            with self._lock:
+                if len(self._buffer) < self.max_buffer:
+                    self._buffer.append({**kwargs, 'created_at': datetime.now(timezone.utc)})
+                    self._pending[kwargs['user_id']] = self._pending.get(kwargs['user_id'], 0) + kwargs['character_count']
+                    self.buffered += 1
+                    depth = len(self._buffer)
+                    self.max_depth = max(self.max_depth, depth)
+                    if depth >= self.flush_rows:
+                        self._wakeup.set()
+                    return True
+        with self._lock:
+            self.sync_writes += 1
+        return record_translation(**kwargs)
+
+    def pending_characters(self, user_id: int) -> int:
+        """Characters recorded for ``user_id`` that are still buffered"""
+        with self._lock:
+            return self._pending.get(user_id, 0)
+
+    def usage_stats(self, user_id: int) -> Dict[str, Any]:
+        """``get_user_usage_stats`` including characters not yet flushed"""
+        stats = get_user_usage_stats(user_id)
+        pending = self.pending_characters(user_id)
+        if pending:
+            stats = {
+                **stats,
+                'monthly_usage': stats['monthly_usage'] + pending,
+                'total_usage': stats['total_usage'] + pending,
+                'remaining': stats['remaining'] - pending
+            }
+        return stats
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            while self._buffer and not self._stopping.is_set():
+                if not self.flush() or len(self._buffer) < self.flush_rows:
+                    break
+
+    def flush(self) -> bool:
+        """Write up to ``flush_rows`` buffered rows; False if the write failed"""
+        with self._flush_lock:
+            with self._lock:
+                batch: List[Dict[str, Any]] = [
+                    self._buffer.popleft() for _ in range(min(self.flush_rows, len(self._buffer)))
+                ]
+            if not batch:
+                return True
+            started = time.perf_counter()
+            try:
+                record_translations_batch(batch)
+            except (psycopg2.OperationalError, psycopg2.InterfaceError, PoolError) as e:
+                # Database unreachable, keep the rows for the next attempt
+                logger.error(f"History flush of {len(batch)} rows failed: {e}")
+                self._requeue(batch)
+                return False
+            except Exception as e:
+                # A bad row fails the whole batch; write them one by one instead
+                logger.error(f"History batch rejected, writing {len(batch)} rows individually: {e}")
+                for row in batch:
+                    record_translation(**{k: v for k, v in row.items() if k != 'created_at'})
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                for row in batch:
+                    remaining = self._pending.get(row['user_id'], 0) - row['character_count']
+                    if remaining > 0:
+                        self._pending[row['user_id']] = remaining
+                    else:
+                        self._pending.pop(row['user_id'], None)
+                self.flushes += 1
+                self.rows_flushed += len(batch)
+                self.flush_seconds += elapsed
+                self.last_flush_seconds = elapsed
+                self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+            return True
+
+    def _requeue(self, batch: List[Dict[str, Any]]):
+        """Put a failed batch back at the front, as far as the buffer has room"""
+        with self._lock:
+            self.failed_flushes += 1
+            room = max(0, self.max_buffer - len(self._buffer))
+            kept, lost = batch[:room], batch[room:]
+            self._buffer.extendleft(reversed(kept))
+            for row in lost:
+                self._pending[row['user_id']] = self._pending.get(row['user_id'], 0) - row['character_count']
+                if self._pending[row['user_id']] <= 0:
+                    self._pending.pop(row['user_id'], None)
+            self.dropped += len(lost)
+        if lost:
+            logger.error(f"Dropped {len(lost)} translation history rows, buffer full")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'queue_depth': len(self._buffer),
+                'max_queue_depth': self.max_depth,
+                'max_buffer': self.max_buffer,
+                'buffered': self.buffered,
+                'sync_writes': self.sync_writes,
+                'flushes': self.flushes,
+                'rows_flushed': self.rows_flushed,
+                'failed_flushes': self.failed_flushes,
+                'dropped': self.dropped,
+                'flush_seconds_last': round(self.last_flush_seconds, 6),
+                'flush_seconds_max': round(self.max_flush_seconds, 6),
+                'flush_seconds_avg': round(self.flush_seconds / self.flushes, 6) if self.flushes else 0.0
+            }
+
+
+def create_history_recorder() -> HistoryRecorder:
+    """HISTORY_WRITE_BEHIND=1 turns buffering on; it is off by default"""
+    return HistoryRecorder(
+        enabled=os.getenv("HISTORY_WRITE_BEHIND", "0").lower() in ("1", "true", "yes"),
+        max_buffer=int(os.getenv("HISTORY_BUFFER_SIZE", "10000")),
+        flush_rows=int(os.getenv("HISTORY_FLUSH_ROWS", "500")),
+        flush_interval=float(os.getenv("HISTORY_FLUSH_SECONDS", "1.0"))
+    )
@@ -2,15 +2,40 @@ import os
 from database import db
 from psycopg2 import sql
 
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
 def run_migrations():
     with db.get_cursor() as cursor:
-        # Read migration file
-        with open('migrations/001_initial_schema.sql', 'r') as f:
-            migration_sql = f.read()
-        
-        # Execute migration in a transaction
-        cursor.execute(migration_sql)
-        print("Database schema initialized successfully")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name VARCHAR(255) PRIMARY KEY,
+                applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+        cursor.execute("SELECT name FROM schema_migrations")
+        applied = {row['name'] for row in cursor.fetchall()}
+
+        if not applied:
+            # Databases initialised before migrations were tracked
+            cursor.execute("SELECT to_regclass('public.users') IS NOT NULL AS has_schema")
+            if cursor.fetchone()['has_schema']:
+                cursor.execute("INSERT INTO schema_migrations (name) VALUES ('001_initial_schema.sql')")
+                applied.add('001_initial_schema.sql')
+
+    for name in sorted(os.listdir(MIGRATIONS_DIR)):
+        if not name.endswith('.sql') or name in applied:
+            continue
+        with db.get_cursor() as cursor:
+            # Read migration file
+            with open(os.path.join(MIGRATIONS_DIR, name), 'r') as f:
+                migration_sql = f.read()
+            
+            # Execute migration in a transaction
+            cursor.execute(migration_sql)
+            cursor.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+            print(f"Applied migration {name}")
+
+    print("Database schema initialized successfully")
 
 if __name__ == '__main__':
-    run_migrations()
\ No newline at end of file
+    run_migrations()
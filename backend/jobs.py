@@ -0,0 +1,576 @@
+import os
+import time
+import uuid
+import shutil
+import sqlite3
+import tempfile
+import threading
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Any, List, Optional
+
+from pipeline import TranslationPipeline, Checkpoints
+from tracing import tracer
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Columns a worker may change after a job is created
+_UPDATABLE = {
+    "status", "progress", "result_path", "character_count",
+    "error", "started_at", "finished_at"
+}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class PostgresJobStore:
+    """Jobs in the ``translation_jobs`` table, claimable by any worker process"""
+
+    def __init__(self):
+        from database import db
+        self.db = db
+
+    def create(self, job: Dict[str, Any]):
+        with self.db.get_cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO translation_jobs (
+                    id, user_id, status, file_name, input_path,
+                    source_language, target_language
+                )
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """, (
+                    job['id'], job['user_id'], QUEUED, job['file_name'],
+                    job['input_path'], job['source_language'], job['target_language']
+                ))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.db.get_cursor() as cursor:
+            cursor.execute("SELECT * FROM translation_jobs WHERE id = %s", (job_id,))
+            row = cursor.fetchone()
+            return _normalize(row) if row else None
+
+    def update(self, job_id: str, **fields):
+        columns = [name for name in fields if name in _UPDATABLE]
+        if not columns:
+            return
+        assignments = ", ".join(f"{name} = %s" for name in columns)
+        with self.db.get_cursor() as cursor:
+            cursor.execute(
+                f"UPDATE translation_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+                [fields[name] for name in columns] + [job_id]
+            )
+
+    def claim_next(self, stale_after: float) -> Optional[Dict[str, Any]]:
+        """
+        Atomically move the oldest queued job to running. Running jobs
+        without a heartbeat for ``stale_after`` seconds lost their worker
+        and are claimed again.
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute("""
+                UPDATE translation_jobs
+                SET status = %s, started_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                WHERE id = (
+                    SELECT id FROM translation_jobs
+                    WHERE status = %s
+                    OR (status = %s AND updated_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 second')
+                    ORDER BY created_at
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING *
+                """, (RUNNING, QUEUED, RUNNING, stale_after))
+            row = cursor.fetchone()
+            return _normalize(row) if row else None
+
+    def delete_expired(self, older_than: float) -> List[Dict[str, Any]]:
+        """Delete jobs finished more than ``older_than`` seconds ago and return them"""
+        with self.db.get_cursor() as cursor:
+            cursor.execute("""
+                DELETE FROM translation_jobs
+                WHERE status IN (%s, %s)
+                AND finished_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 second'
+                RETURNING id, input_path, result_path
+                """, (SUCCEEDED, FAILED, older_than))
+            return [_normalize(row) for row in cursor.fetchall()]
+
+    def heartbeat(self, job_ids: List[str]):
+        with self.db.get_cursor() as cursor:
+            cursor.execute(
+                "UPDATE translation_jobs SET updated_at = CURRENT_TIMESTAMP WHERE id = ANY(%s::uuid[])",
+                (list(job_ids),)
+            )
+
+    def save_checkpoint(self, job_id: str, index: int, digest: str, translated: str):
+        with self.db.get_cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO translation_job_chunks (job_id, chunk_index, source_digest, translated_text)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (job_id, chunk_index) DO UPDATE
+                SET source_digest = EXCLUDED.source_digest,
+                    translated_text = EXCLUDED.translated_text
+                """, (job_id, index, digest, translated))
+
+    def load_checkpoints(self, job_id: str) -> Checkpoints:
+        with self.db.get_cursor() as cursor:
+            cursor.execute("""
+                SELECT chunk_index, source_digest, translated_text
+                FROM translation_job_chunks
+                WHERE job_id = %s
+                """, (job_id,))
+            return {
+                row['chunk_index']: (row['source_digest'], row['translated_text'])
+                for row in cursor.fetchall()
+            }
+
+    def delete_checkpoints(self, job_id: str):
+        with self.db.get_cursor() as cursor:
+            cursor.execute("DELETE FROM translation_job_chunks WHERE job_id = %s", (job_id,))
+
+
+class SQLiteJobStore:
+    """Jobs in a local SQLite file, for development and tests"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS translation_jobs (
+                id TEXT PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                progress INTEGER NOT NULL DEFAULT 0,
+                file_name TEXT NOT NULL,
+                input_path TEXT NOT NULL,
+                result_path TEXT,
+                source_language TEXT,
+                target_language TEXT,
+                character_count INTEGER,
+                error TEXT,
+                created_at TEXT,
+                updated_at TEXT,
+                started_at TEXT,
+                finished_at TEXT
+            )
+            """)
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS translation_job_chunks (
+                job_id TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                source_digest TEXT NOT NULL,
+                translated_text TEXT NOT NULL,
+                PRIMARY KEY (job_id, chunk_index)
+            )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def create(self, job: Dict[str, Any]):
+        now = _now().isoformat()
+        self._connect().execute("""
+            INSERT INTO translation_jobs (
+                id, user_id, status, file_name, input_path,
+                source_language, target_language, created_at, updated_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                job['id'], job['user_id'], QUEUED, job['file_name'], job['input_path'],
+                job['source_language'], job['target_language'], now, now
+            ))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT * FROM translation_jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def update(self, job_id: str, **fields):
+        columns = [name for name in fields if name in _UPDATABLE]
+        if not columns:
+            return
+        values = [
+            fields[name].isoformat() if isinstance(fields[name], datetime) else fields[name]
+            for name in columns
+        ]
+        assignments = ", ".join(f"{name} = ?" for name in columns)
+        self._connect().execute(
+            f"UPDATE translation_jobs SET {assignments}, updated_at = ? WHERE id = ?",
+            values + [_now().isoformat(), job_id]
+        )
+
+    def claim_next(self, stale_after: float) -> Optional[Dict[str, Any]]:
+        # Timestamps are all UTC ISO strings, so they compare as text
+        cutoff = (_now() - timedelta(seconds=stale_after)).isoformat()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("""
+                SELECT id FROM translation_jobs
+                WHERE status = ? OR (status = ? AND updated_at < ?)
+                ORDER BY created_at LIMIT 1
+                """, (QUEUED, RUNNING, cutoff)
+            ).fetchone()
+            if row:
+                now = _now().isoformat()
+                conn.execute(
+                    "UPDATE translation_jobs SET status = ?, started_at = ?, updated_at = ? WHERE id = ?",
+                    (RUNNING, now, now, row['id'])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row['id']) if row else None
+
+    def delete_expired(self, older_than: float) -> List[Dict[str, Any]]:
+        cutoff = (_now() - timedelta(seconds=older_than)).isoformat()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = [dict(row) for row in conn.execute("""
+                SELECT id, input_path, result_path FROM translation_jobs
+                WHERE status IN (?, ?) AND finished_at < ?
+                """, (SUCCEEDED, FAILED, cutoff)
+            ).fetchall()]
+            for row in rows:
+                conn.execute("DELETE FROM translation_job_chunks WHERE job_id = ?", (row['id'],))
+                conn.execute("DELETE FROM translation_jobs WHERE id = ?", (row['id'],))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def heartbeat(self, job_ids: List[str]):
+        now = _now().isoformat()
+        self._connect().executemany(
+            "UPDATE translation_jobs SET updated_at = ? WHERE id = ?",
+            [(now, job_id) for job_id in job_ids]
+        )
+
+    def save_checkpoint(self, job_id: str, index: int, digest: str, translated: str):
+        self._connect().execute("""
+            INSERT OR REPLACE INTO translation_job_chunks (job_id, chunk_index, source_digest, translated_text)
+            VALUES (?, ?, ?, ?)
+            """, (job_id, index, digest, translated))
+
+    def load_checkpoints(self, job_id: str) -> Checkpoints:
+        rows = self._connect().execute(
+            "SELECT chunk_index, source_digest, translated_text FROM translation_job_chunks WHERE job_id = ?",
+            (job_id,)
+        ).fetchall()
+        return {row['chunk_index']: (row['source_digest'], row['translated_text']) for row in rows}
+
+    def delete_checkpoints(self, job_id: str):
+        self._connect().execute("DELETE FROM translation_job_chunks WHERE job_id = ?", (job_id,))
+
+
+def _normalize(row: Dict[str, Any]) -> Dict[str, Any]:
+    job = dict(row)
+    job['id'] = str(job['id'])
+    return job
+
+
+def create_job_store(spec: Optional[str] = None):
+    """
+    JOB_STORE is ``postgres`` or ``sqlite:<path>``. Defaults to Postgres
+    when a database is configured, SQLite otherwise.
+    """
+    spec = spec or os.getenv("JOB_STORE")
+    if not spec:
+        spec = "postgres" if os.getenv("DB_NAME") else "sqlite:translation_jobs.db"
+    if spec.startswith("sqlite:"):
+        return SQLiteJobStore(spec[len("sqlite:"):])
+    return PostgresJobStore()
+
+
+class JobManager:
+    """
+    Queue of document translations run off the request path. Uploads
+    are kept under ``jobs_dir/<job id>/`` and a pool of worker threads
+    claims queued jobs from the store, so with the Postgres store every
+    web process can submit and every process's workers share the queue.
+
+    Each translated chunk is checkpointed in the store. A job whose
+    worker died (no heartbeat for ``stale_after`` seconds) is claimed
+    again, and a failed job can be retried; either way only chunks
+    without a checkpoint are translated. A job only succeeds once every
+    chunk has a translation.
+
+    With a ``quota`` service, chunks reserve against the owner's monthly
+    limit as they are translated; a job that runs out fails like any
+    other and can be retried once there is room.
+
+    Finished jobs, with their upload and result, are deleted
+    ``retention`` seconds after they finish.
+    """
+
+    def __init__(
+        self,
+        store,
+        pipeline: TranslationPipeline,
+        jobs_dir: Optional[str] = None,
+        workers: Optional[int] = None,
+        poll_interval: float = 1.0,
+        stale_after: Optional[float] = None,
+        quota=None,
+        on_success: Optional[Callable[[Dict[str, Any]], None]] = None,
+        retention: Optional[float] = None,
+        cleanup_interval: float = 600.0
+    ):
+        self.store = store
+        self.pipeline = pipeline
+        self.file_processor = pipeline.file_processor
+        self.jobs_dir = jobs_dir or os.getenv(
+            "JOBS_DIR", os.path.join(tempfile.gettempdir(), "translation_jobs")
+        )
+        self.workers = workers if workers is not None else int(os.getenv("JOB_WORKERS", "2"))
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after or float(os.getenv("JOB_STALE_SECONDS", "300"))
+        self.quota = quota
+        self.on_success = on_success
+        self.retention = retention or float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+        self.cleanup_interval = cleanup_interval
+        self._next_cleanup = 0.0
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._active: set = set()
+        self._active_lock = threading.Lock()
+        os.makedirs(self.jobs_dir, exist_ok=True)
+
+    def submit(self, user_id: int, file, file_name: str, target_lang: str, source_lang: str = "auto") -> Dict[str, Any]:
+        """Save the upload (a werkzeug ``FileStorage``) and queue it"""
+        job_id = str(uuid.uuid4())
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir)
+        input_path = os.path.join(job_dir, file_name)
+        try:
+            file.save(input_path)
+            job = {
+                'id': job_id,
+                'user_id': user_id,
+                'file_name': file_name,
+                'input_path': input_path,
+                'source_language': source_lang,
+                'target_language': target_lang
+            }
+            self.store.create(job)
+        except Exception:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+        logger.info(f"Queued job {job_id} for {file_name}")
+        self._wakeup.set()
+        return self.store.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def retry(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Queue a failed job again; it resumes from its checkpoints"""
+        job = self.store.get(job_id)
+        if not job or job['status'] != FAILED:
+            return job
+        self.store.update(job_id, status=QUEUED, progress=0, error=None, finished_at=None)
+        logger.info(f"Requeued job {job_id}")
+        self._wakeup.set()
+        return self.store.get(job_id)
+
+    def start(self):
+        if self._threads or self.workers <= 0:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        logger.info(f"Started {self.workers} job workers")
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _worker(self):
+        while not self._stopping.is_set():
+            try:
+                job = self.store.claim_next(self.stale_after)
+            except Exception as e:
+                logger.error(f"Claiming job failed: {str(e)}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            with self._active_lock:
+                self._active.add(job['id'])
+            try:
+                self.process(job)
+            finally:
+                with self._active_lock:
+                    self._active.discard(job['id'])
+
+    def _heartbeat(self):
+        """Keep claimed jobs fresh so other workers don't reclaim them"""
+        while not self._stopping.wait(self.stale_after / 3):
+            if time.monotonic() >= self._next_cleanup:
+                self._next_cleanup = time.monotonic() + self.cleanup_interval
+                self.delete_expired()
+            with self._active_lock:
+                active = list(self._active)
+            if not active:
+                continue
+            try:
+                self.store.heartbeat(active)
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {str(e)}")
+
+    def delete_expired(self) -> int:
+        """Delete jobs past their retention, with their files"""
+        try:
+            expired = self.store.delete_expired(self.retention)
+        except Exception as e:
+            logger.error(f"Expiring jobs failed: {str(e)}")
+            return 0
+        for job in expired:
+            shutil.rmtree(os.path.join(self.jobs_dir, job['id']), ignore_errors=True)
+            # Results written before they were kept in the job directory
+            result_path = job['result_path']
+            if result_path and os.path.exists(result_path):
+                os.remove(result_path)
+                try:
+                    os.rmdir(os.path.dirname(result_path))
+                except OSError:
+                    pass
+        if expired:
+            logger.info(f"Deleted {len(expired)} expired jobs")
+        return len(expired)
+
+    def process(self, job: Dict[str, Any]):
+        job_id = job['id']
+        logger.info(f"Processing job {job_id}")
+
+        def progress_callback(progress: int):
+            try:
+                self.store.update(job_id, progress=progress)
+            except Exception as e:
+                logger.error(f"Job {job_id} progress update failed: {str(e)}")
+
+        def on_checkpoint(index: int, digest: str, translated: str):
+            self.store.save_checkpoint(job_id, index, digest, translated)
+
+        hold = self.quota.hold(job['user_id'], owner=job_id) if self.quota else None
+        succeeded = False
+        # Root span of the job's trace
+        with tracer.span("job", root=True, job_id=job_id, file_name=job['file_name']) as span:
+            try:
+                succeeded = self._run_job(job, progress_callback, on_checkpoint, hold)
+            finally:
+                span.set_attribute("succeeded", succeeded)
+                if hold is not None:
+                    # on_success has charged the usage by now; otherwise nothing is owed
+                    if succeeded:
+                        hold.commit_all()
+                    else:
+                        hold.release_all()
+
+    def _run_job(self, job, progress_callback, on_checkpoint, hold) -> bool:
+        job_id = job['id']
+        started = time.perf_counter()
+        try:
+            checkpoints = self.store.load_checkpoints(job_id)
+            if checkpoints:
+                logger.info(f"Resuming job {job_id} from {len(checkpoints)} checkpointed chunks")
+            result = self.pipeline.run(
+                job['input_path'],
+                target_lang=job['target_language'],
+                source_lang=job['source_language'],
+                progress_callback=progress_callback,
+                checkpoints=checkpoints,
+                on_checkpoint=on_checkpoint,
+                quota=hold
+            )
+            if not result.complete:
+                first_error = result.errors[result.failed_chunks[0]]
+                raise ValueError(
+                    f"{len(result.failed_chunks)} of {result.stats.extraction.items} chunks failed "
+                    f"after retrying ({first_error}); retry the job to resume"
+                )
+            # Segmented documents without text come back as unchanged copies
+            if result.segments is None and not result.text.strip():
+                raise ValueError("Translation returned empty result")
+            output_path = self.file_processor.reconstruct_document(
+                original_path=job['input_path'],
+                translated_text=result.text,
+                target_lang=job['target_language'],
+                segments=result.segments
+            )
+            # Kept next to the upload so both expire together
+            result_dir = os.path.join(self.jobs_dir, job_id, "result")
+            os.makedirs(result_dir, exist_ok=True)
+            result_path = shutil.move(output_path, os.path.join(result_dir, os.path.basename(output_path)))
+            shutil.rmtree(os.path.dirname(output_path), ignore_errors=True)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            self.store.update(job_id, status=FAILED, error=str(e), finished_at=_now())
+            return False
+
+        self.store.update(
+            job_id,
+            status=SUCCEEDED,
+            progress=100,
+            result_path=result_path,
+            character_count=result.stats.extracted_bytes,
+            finished_at=_now()
+        )
+        logger.info(f"Job {job_id} finished in {time.perf_counter() - started:.1f}s")
+        try:
+            self.store.delete_checkpoints(job_id)
+        except Exception as e:
+            logger.error(f"Job {job_id} checkpoint cleanup failed: {str(e)}")
+        if self.on_success:
+            try:
+                self.on_success(self.store.get(job_id))
+            except Exception as e:
+                logger.error(f"Job {job_id} completion hook failed: {str(e)}")
+        return True
+
+
+def _timestamp(value) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def job_to_dict(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job, without server paths"""
+    return {
+        'id': job['id'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'file_name': job['file_name'],
+        'source_lang': job['source_language'],
+        'target_lang': job['target_language'],
+        'character_count': job['character_count'],
+        'error': job['error'],
+        'created_at': _timestamp(job['created_at']),
+        'started_at': _timestamp(job['started_at']),
+        'finished_at': _timestamp(job['finished_at'])
+    }
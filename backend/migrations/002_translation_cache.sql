@@ -0,0 +1,14 @@
+-- Content-addressed translation memory shared by all users
+CREATE TABLE IF NOT EXISTS translation_cache (
+    cache_key CHAR(64) PRIMARY KEY,
+    source_language VARCHAR(10),
+    target_language VARCHAR(10),
+    model VARCHAR(50) NOT NULL,
+    prompt_version VARCHAR(20) NOT NULL,
+    translated_text TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Invalidation works by language pair
+CREATE INDEX IF NOT EXISTS idx_translation_cache_language_pair
+    ON translation_cache(source_language, target_language);
@@ -0,0 +1,25 @@
+-- Asynchronous document translation jobs
+CREATE TABLE IF NOT EXISTS translation_jobs (
+    id UUID PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    progress SMALLINT NOT NULL DEFAULT 0,
+    file_name VARCHAR(255) NOT NULL,
+    input_path TEXT NOT NULL,
+    result_path TEXT,
+    source_language VARCHAR(10),
+    target_language VARCHAR(10),
+    character_count INTEGER,
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    CONSTRAINT job_status CHECK (status IN ('queued', 'running', 'succeeded', 'failed'))
+);
+
+-- Workers claim the oldest queued job
+CREATE INDEX IF NOT EXISTS idx_translation_jobs_queued
+    ON translation_jobs(created_at) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_translation_jobs_user_id
+    ON translation_jobs(user_id, created_at DESC);
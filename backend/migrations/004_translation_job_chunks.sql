@@ -0,0 +1,13 @@
+-- Per-chunk checkpoints so interrupted jobs resume where they stopped
+CREATE TABLE IF NOT EXISTS translation_job_chunks (
+    job_id UUID NOT NULL REFERENCES translation_jobs(id) ON DELETE CASCADE,
+    chunk_index INTEGER NOT NULL,
+    source_digest CHAR(64) NOT NULL,
+    translated_text TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (job_id, chunk_index)
+);
+
+-- Workers reclaim running jobs whose heartbeat stopped
+CREATE INDEX IF NOT EXISTS idx_translation_jobs_running
+    ON translation_jobs(updated_at) WHERE status = 'running';
@@ -0,0 +1,26 @@
+-- Monthly usage per user and language pair, maintained by record_translation.
+-- The ('*', '*') row of each month holds the user's total.
+CREATE TABLE IF NOT EXISTS usage_rollups (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    month DATE NOT NULL,
+    source_language VARCHAR(10) NOT NULL,
+    target_language VARCHAR(10) NOT NULL,
+    characters BIGINT NOT NULL DEFAULT 0,
+    requests INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, month, source_language, target_language)
+);
+
+-- Backfill from existing history
+INSERT INTO usage_rollups (user_id, month, source_language, target_language, characters, requests)
+SELECT user_id, date_trunc('month', created_at)::date,
+       COALESCE(source_language, 'auto'), COALESCE(target_language, 'auto'),
+       SUM(character_count), COUNT(*)
+FROM translation_history
+GROUP BY 1, 2, 3, 4
+UNION ALL
+SELECT user_id, date_trunc('month', created_at)::date, '*', '*',
+       SUM(character_count), COUNT(*)
+FROM translation_history
+GROUP BY 1, 2
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,8 @@
+-- Keyset pagination for a user's history: newest first, ties broken by id.
+-- INCLUDE lets the history listing be answered from the index alone.
+CREATE INDEX IF NOT EXISTS idx_translation_history_user_created
+    ON translation_history (user_id, created_at DESC, id DESC)
+    INCLUDE (session_id, source_language, target_language, character_count, document_type, file_name);
+
+-- Covered by the leading column of the index above
+DROP INDEX IF EXISTS idx_translation_history_user_id;
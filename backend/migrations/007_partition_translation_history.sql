@@ -0,0 +1,66 @@
+-- Convert translation_history to monthly range partitions on created_at.
+-- Rows are copied into the new table, so run this in a quiet period on
+-- large installs. Later partitions are created by history_partitions.py.
+
+ALTER TABLE translation_history RENAME TO translation_history_unpartitioned;
+-- Keep the id sequence when the old table is dropped
+ALTER SEQUENCE translation_history_id_seq OWNED BY NONE;
+
+CREATE TABLE translation_history (
+    id INTEGER NOT NULL DEFAULT nextval('translation_history_id_seq'),
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    session_id UUID NOT NULL,
+    source_text TEXT,
+    translated_text TEXT,
+    source_language VARCHAR(10),
+    target_language VARCHAR(10),
+    character_count INTEGER NOT NULL,
+    document_type VARCHAR(50),
+    file_name VARCHAR(255),
+    ip_address VARCHAR(45),
+    user_agent TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    -- The partition key has to be part of every unique constraint
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+ALTER SEQUENCE translation_history_id_seq OWNED BY translation_history.id;
+
+-- Rows outside every monthly partition land here until maintenance moves them
+CREATE TABLE translation_history_default PARTITION OF translation_history DEFAULT;
+
+-- One partition per month from the oldest row through three months ahead
+DO $$
+DECLARE
+    part_month DATE := date_trunc('month', COALESCE(
+        (SELECT MIN(created_at) FROM translation_history_unpartitioned), CURRENT_DATE
+    ));
+BEGIN
+    WHILE part_month <= date_trunc('month', CURRENT_DATE) + INTERVAL '3 months' LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF translation_history FOR VALUES FROM (%L) TO (%L)',
+            'translation_history_' || to_char(part_month, '"y"YYYY"m"MM'),
+            part_month,
+            part_month + INTERVAL '1 month'
+        );
+        part_month := part_month + INTERVAL '1 month';
+    END LOOP;
+END $$;
+
+INSERT INTO translation_history (
+    id, user_id, session_id, source_text, translated_text, source_language,
+    target_language, character_count, document_type, file_name, ip_address,
+    user_agent, created_at
+)
+SELECT id, user_id, session_id, source_text, translated_text, source_language,
+       target_language, character_count, document_type, file_name, ip_address,
+       user_agent, COALESCE(created_at, CURRENT_TIMESTAMP)
+FROM translation_history_unpartitioned;
+
+DROP TABLE translation_history_unpartitioned;
+
+-- Partitioned indexes, created on every partition
+CREATE INDEX idx_translation_history_created_at ON translation_history (created_at);
+CREATE INDEX idx_translation_history_user_created
+    ON translation_history (user_id, created_at DESC, id DESC)
+    INCLUDE (session_id, source_language, target_language, character_count, document_type, file_name);
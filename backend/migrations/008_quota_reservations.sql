@@ -0,0 +1,18 @@
+-- Characters held by in-flight translations, on each month's ('*', '*') row
+ALTER TABLE usage_rollups ADD COLUMN IF NOT EXISTS reserved BIGINT NOT NULL DEFAULT 0;
+
+-- One row per hold, so holds left by a crashed process can expire
+CREATE TABLE IF NOT EXISTS quota_reservations (
+    id UUID PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    month DATE NOT NULL,
+    characters INTEGER NOT NULL,
+    owner VARCHAR(64),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_quota_reservations_user_expires
+    ON quota_reservations(user_id, expires_at);
+CREATE INDEX IF NOT EXISTS idx_quota_reservations_owner
+    ON quota_reservations(owner) WHERE owner IS NOT NULL;
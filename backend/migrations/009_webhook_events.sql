@@ -0,0 +1,19 @@
+-- Verified Stripe events, applied asynchronously. The event id makes
+-- redeliveries a no-op.
+CREATE TABLE IF NOT EXISTS webhook_events (
+    id VARCHAR(255) PRIMARY KEY,
+    type VARCHAR(100) NOT NULL,
+    payload JSONB NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    received_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    next_attempt_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    processed_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT webhook_event_status CHECK (status IN ('pending', 'processing', 'processed', 'failed'))
+);
+
+-- Consumers claim the oldest due event
+CREATE INDEX IF NOT EXISTS idx_webhook_events_pending
+    ON webhook_events(received_at) WHERE status IN ('pending', 'processing');
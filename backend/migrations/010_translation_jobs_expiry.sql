@@ -0,0 +1,3 @@
+-- Finished jobs are deleted once past their retention
+CREATE INDEX IF NOT EXISTS idx_translation_jobs_finished
+    ON translation_jobs(finished_at) WHERE status IN ('succeeded', 'failed');
@@ -0,0 +1,186 @@
+import os
+import threading
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Deque, Dict, Generator, List, Optional, Tuple
+
+import PyPDF2
+
+from tracing import tracer
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+# Extractions still using each pool, the current one or one retired
+# while they ran; a pool is only shut down once it has none
+_pool_users: Dict[ProcessPoolExecutor, int] = {}
+_pool_lock = threading.Lock()
+_idle_timer: Optional[threading.Timer] = None
+# A worker gets many ranges of the same document, so it keeps the one
+# being parsed instead of re-reading its page tree for every range
+_worker_reader: Optional[Tuple[str, float, PyPDF2.PdfReader]] = None
+# A broken or shut down pool fails submits and results with these; the
+# extraction then finishes serially
+_POOL_ERRORS = (BrokenProcessPool, CancelledError, RuntimeError)
+
+
+def extract_page_range(file_path: str, start: int, stop: int) -> List[str]:
+    """Text of pages ``start`` to ``stop - 1``; runs in a pool worker"""
+    global _worker_reader
+    modified = os.path.getmtime(file_path)
+    if _worker_reader is None or _worker_reader[:2] != (file_path, modified):
+        _worker_reader = (file_path, modified, PyPDF2.PdfReader(file_path))
+    reader = _worker_reader[2]
+    texts = [reader.pages[number].extract_text() or "" for number in range(start, stop)]
+    if stop >= len(reader.pages):
+        # Last range of the file, nobody will ask this worker for it again
+        _worker_reader = None
+    return texts
+
+
+def _start_method() -> str:
+    """
+    Forkserver where available, spawn otherwise. Forking the server
+    itself would copy locks held by its other threads (logging, the
+    database pool, the tracer) into the workers; ``fork`` is only used
+    when PDF_EXTRACT_START_METHOD asks for it. Workers import the main
+    module as ``__mp_main__``, which app.py checks before starting its
+    background threads.
+    """
+    default = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return os.getenv("PDF_EXTRACT_START_METHOD", default)
+
+
+def _context() -> multiprocessing.context.BaseContext:
+    context = multiprocessing.get_context(_start_method())
+    if context.get_start_method() == "forkserver":
+        # Workers are forked from a server that has PyPDF2 loaded already
+        context.set_forkserver_preload([__name__])
+    return context
+
+
+def _acquire_pool(workers: int) -> ProcessPoolExecutor:
+    """Process-wide pool, created on first use; pair with :func:`_release_pool`"""
+    global _pool, _pool_workers
+    idle = None
+    with _pool_lock:
+        if _idle_timer is not None:
+            _idle_timer.cancel()
+        # A pool in use is not resized; its users keep sharing it
+        if _pool is None or (_pool_workers != workers and not _pool_users.get(_pool)):
+            idle = _pool
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=_context())
+            _pool_workers = workers
+            logger.info(f"Started PDF extraction pool with {workers} workers")
+        _pool_users[_pool] = _pool_users.get(_pool, 0) + 1
+        pool = _pool
+    if idle is not None:
+        idle.shutdown(wait=False)
+    return pool
+
+
+def _release_pool(pool: ProcessPoolExecutor):
+    """
+    Shut a retired pool down with its last user, and the current one once
+    nobody has used it for PDF_POOL_IDLE_SECONDS
+    """
+    global _idle_timer
+    with _pool_lock:
+        _pool_users[pool] -= 1
+        if _pool_users[pool]:
+            return
+        del _pool_users[pool]
+        if pool is _pool:
+            _idle_timer = threading.Timer(float(os.getenv("PDF_POOL_IDLE_SECONDS", "60")), _shutdown_idle_pool)
+            _idle_timer.daemon = True
+            _idle_timer.start()
+            return
+    pool.shutdown(wait=False)
+
+
+def _shutdown_idle_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool_users.get(_pool):
+            return
+        pool, _pool = _pool, None
+    pool.shutdown(wait=False)
+    logger.info("Stopped idle PDF extraction pool")
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """
+    Retire a broken pool so later extractions get a new one. Its other
+    users may still be waiting on it, so it is shut down by the last of
+    them in :func:`_release_pool`, never cancelled from here.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+
+def iter_page_texts(
+    file_path: str,
+    workers: int = 0,
+    min_pages: int = 64,
+    pages_per_task: int = 16
+) -> Generator[str, None, None]:
+    """
+    Yield each page's text in page order. PDFs of at least ``min_pages``
+    pages are split into ranges of ``pages_per_task`` and parsed in the
+    process pool, a few ranges ahead of the consumer, so chunking starts
+    on the first pages while later ones are still being parsed.
+    """
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        page_count = len(reader.pages)
+        if workers <= 1 or page_count < min_pages:
+            for number, page in enumerate(reader.pages):
+                with tracer.span("PyPDF2.extract_page", page=number):
+                    yield page.extract_text() or ""
+            return
+
+    ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+    pool = _acquire_pool(workers)
+    # Bounded lookahead keeps memory flat when the consumer is slower
+    lookahead = workers * 2
+    pending: Deque[Tuple[Tuple[int, int], Future]] = deque()
+    next_range = 0
+    next_page = 0
+    serial_from = None
+    try:
+        while next_range < len(ranges) or pending:
+            try:
+                while next_range < len(ranges) and len(pending) < lookahead:
+                    start, stop = ranges[next_range]
+                    pending.append(((start, stop), pool.submit(extract_page_range, file_path, start, stop)))
+                    next_range += 1
+                (start, stop), future = pending.popleft()
+                with tracer.span("PyPDF2.extract_pages", first_page=start, last_page=stop - 1):
+                    texts = future.result()
+            except _POOL_ERRORS as e:
+                # A worker died (e.g. out of memory), here or in another
+                # extraction sharing the pool; finish in this process
+                logger.error(f"PDF extraction pool failed at page {next_page} ({e!r}), continuing serially")
+                _discard_pool(pool)
+                serial_from = next_page
+                break
+            yield from texts
+            next_page = stop
+    finally:
+        for _, future in pending:
+            future.cancel()
+        _release_pool(pool)
+
+    if serial_from is not None:
+        with open(file_path, 'rb') as f:
+            reader = PyPDF2.PdfReader(f)
+            for number in range(serial_from, page_count):
+                yield reader.pages[number].extract_text() or ""
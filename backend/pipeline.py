@@ -0,0 +1,352 @@
+import time
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+from chunking import ChunkPlanner
+from deepseek_api import DeepSeekTranslator, run_sync, RETRY_CONCURRENCY_DIVISOR
+from file_processor import FileProcessor
+from quota import QuotaExceeded
+from segments import Segment, encode_batch, decode_batch, batch_text_bytes, collect_translations
+from tracing import tracer
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# index -> (source digest, translated text) of chunks finished in an earlier run
+Checkpoints = Dict[int, Tuple[str, str]]
+
+
+def chunk_digest(chunk: str) -> str:
+    """Identifies a chunk's source so stale checkpoints are not reused"""
+    return hashlib.sha256(chunk.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    chars: int = 0
+    busy_seconds: float = 0.0
+
+    def as_dict(self, wall_seconds: float) -> Dict[str, Any]:
+        return {
+            'items': self.items,
+            'chars': self.chars,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'items_per_second': round(self.items / wall_seconds, 2) if wall_seconds else 0.0,
+            'chars_per_second': round(self.chars / wall_seconds, 1) if wall_seconds else 0.0,
+        }
+
+
+@dataclass
+class PipelineStats:
+    extraction: StageStats = field(default_factory=lambda: StageStats("extraction"))
+    translation: StageStats = field(default_factory=lambda: StageStats("translation"))
+    reassembly: StageStats = field(default_factory=lambda: StageStats("reassembly"))
+    extracted_bytes: int = 0
+    errors: int = 0
+    resumed: int = 0
+    retried: int = 0
+    failed: int = 0
+    max_queue_depth: int = 0
+    max_pending: int = 0
+    wall_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'wall_seconds': round(self.wall_seconds, 3),
+            'extracted_bytes': self.extracted_bytes,
+            'errors': self.errors,
+            'resumed': self.resumed,
+            'retried': self.retried,
+            'failed': self.failed,
+            'max_queue_depth': self.max_queue_depth,
+            'max_pending': self.max_pending,
+            'stages': {
+                stage.name: stage.as_dict(self.wall_seconds)
+                for stage in (self.extraction, self.translation, self.reassembly)
+            }
+        }
+
+
+@dataclass
+class PipelineResult:
+    text: str
+    stats: PipelineStats
+    # Chunks still holding an error placeholder after the retry pass
+    failed_chunks: List[int] = field(default_factory=list)
+    # Last exception raised for each of those chunks
+    errors: Dict[int, Exception] = field(default_factory=dict)
+    # Segment id -> translation, for formats patched in place
+    segments: Optional[Dict[str, str]] = None
+
+    @property
+    def complete(self) -> bool:
+        return not self.failed_chunks
+
+
+class TranslationPipeline:
+    """
+    Document translation as three overlapping stages:
+    - Extraction runs as a producer in a worker thread
+    - A bounded queue feeds ``workers`` translation tasks on the shared
+      translator event loop
+    - Reassembly hands chunks to ``sink`` strictly in document order
+    At most ``max_pending`` chunks are held at once (queued, in flight or
+    waiting for an earlier chunk), so memory stays flat for any file size.
+
+    Chunks found in ``checkpoints`` are not translated again, and each
+    newly translated chunk is passed to ``on_checkpoint``. Chunks that fail
+    get one more try after the main pass at reduced concurrency. With a
+    ``sink`` they have already been emitted as placeholders by then, so
+    only the collected text and the checkpoints pick up the retry.
+
+    With ``quota`` (a :class:`quota.QuotaHold`) each chunk reserves its
+    UTF-8 size before it is sent upstream, and gives it back if it fails.
+    The first chunk refused by the quota stops the run: the remaining
+    chunks are cancelled and QuotaExceeded propagates. Settling the hold is
+    left to the caller.
+
+    Formats the file processor handles as segments (XLSX cells, DOCX and
+    PPTX paragraphs) flow through the same stages as encoded batches of segments, are
+    translated with the translator's aligned batch requests, and come
+    back in ``PipelineResult.segments``.
+    """
+
+    def __init__(
+        self,
+        translator: DeepSeekTranslator,
+        file_processor: FileProcessor,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None
+    ):
+        self.translator = translator
+        self.file_processor = file_processor
+        self.workers = workers or translator.max_concurrency
+        self.max_pending = max_pending or self.workers * 4
+
+    def run(
+        self,
+        file_path: str,
+        target_lang: str,
+        source_lang: str = "auto",
+        sink: Optional[Callable[[int, str], None]] = None,
+        progress_callback: callable = None,
+        checkpoints: Optional[Checkpoints] = None,
+        on_checkpoint: Optional[Callable[[int, str, str], None]] = None,
+        quota=None
+    ) -> PipelineResult:
+        """Sync wrapper around :meth:`arun`"""
+        return run_sync(self.arun(
+            file_path, target_lang, source_lang, sink, progress_callback, checkpoints, on_checkpoint, quota
+        ))
+
+    @tracer.traced("TranslationPipeline.run")
+    async def arun(
+        self,
+        file_path: str,
+        target_lang: str,
+        source_lang: str = "auto",
+        sink: Optional[Callable[[int, str], None]] = None,
+        progress_callback: callable = None,
+        checkpoints: Optional[Checkpoints] = None,
+        on_checkpoint: Optional[Callable[[int, str, str], None]] = None,
+        quota=None
+    ) -> PipelineResult:
+        checkpoints = checkpoints or {}
+        segmented = self.file_processor.supports_segments(file_path)
+        stats = PipelineStats(max_pending=self.max_pending)
+        planner = ChunkPlanner(source_lang=source_lang, target_lang=target_lang)
+        chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_pending)
+        # One permit per chunk held anywhere in the pipeline
+        pending = asyncio.Semaphore(self.max_pending)
+        finished: Dict[int, str] = {}
+        failed: Dict[int, str] = {}
+        failure_errors: Dict[int, Exception] = {}
+        collected: List[str] = []
+        extracted = 0
+        extraction_done = False
+        next_to_emit = 0
+        last_progress = -1
+        emitted = asyncio.Event()
+        started = time.perf_counter()
+
+        def report_progress():
+            nonlocal last_progress
+            if not progress_callback:
+                return
+            # The total is only known once extraction ends
+            total = extracted if extraction_done else extracted + 1
+            done = extraction_done and not failed
+            progress = min(100 if done else 99, int(next_to_emit / max(total, 1) * 100))
+            if progress > last_progress:
+                last_progress = progress
+                progress_callback(progress)
+
+        def text_bytes(chunk: str) -> int:
+            return batch_text_bytes(chunk) if segmented else len(chunk.encode('utf-8'))
+
+        async def extract():
+            nonlocal extracted, extraction_done
+            if segmented:
+                chunks = self.file_processor.extract_segment_chunks(file_path, planner)
+            else:
+                chunks = self.file_processor.extract_large_text(file_path, planner)
+            end = object()
+            try:
+                while True:
+                    await pending.acquire()
+                    stage_start = time.perf_counter()
+                    chunk = await asyncio.to_thread(next, chunks, end)
+                    stats.extraction.busy_seconds += time.perf_counter() - stage_start
+                    if chunk is end:
+                        pending.release()
+                        break
+                    stats.extraction.items += 1
+                    stats.extraction.chars += len(chunk)
+                    stats.extracted_bytes += text_bytes(chunk)
+                    await chunk_queue.put((extracted, chunk))
+                    extracted += 1
+                    stats.max_queue_depth = max(stats.max_queue_depth, chunk_queue.qsize())
+            finally:
+                extraction_done = True
+                for _ in range(self.workers):
+                    await chunk_queue.put(None)
+
+        async def save_checkpoint(index: int, chunk: str, translated: str):
+            if on_checkpoint is None:
+                return
+            try:
+                await asyncio.to_thread(on_checkpoint, index, chunk_digest(chunk), translated)
+            except Exception as e:
+                # A lost checkpoint only costs a re-translation on resume
+                logger.error(f"Checkpoint for chunk {index} failed: {str(e)}")
+
+        async def translate_chunk(chunk: str) -> str:
+            reservation = None
+            if quota is not None:
+                # Raises QuotaExceeded before anything is sent upstream
+                reservation = await asyncio.to_thread(quota.reserve, text_bytes(chunk))
+            try:
+                if segmented:
+                    batch = decode_batch(chunk)
+                    translated = await self.translator.atranslate_batch(
+                        [segment.text for segment in batch], target_lang, source_lang
+                    )
+                    return encode_batch([
+                        Segment(segment.id, text) for segment, text in zip(batch, translated)
+                    ])
+                return await self.translator.atranslate_text(chunk, target_lang, source_lang)
+            except BaseException:
+                # Cancellation included: the pipeline stops when quota runs out
+                if reservation is not None:
+                    await asyncio.shield(asyncio.to_thread(quota.release, reservation))
+                raise
+
+        async def translate():
+            while True:
+                item = await chunk_queue.get()
+                if item is None:
+                    return
+                index, chunk = item
+                checkpoint = checkpoints.get(index)
+                if checkpoint is not None and checkpoint[0] == chunk_digest(chunk):
+                    stats.resumed += 1
+                    finished[index] = checkpoint[1]
+                    emitted.set()
+                    continue
+                stage_start = time.perf_counter()
+                try:
+                    translated = await translate_chunk(chunk)
+                    await save_checkpoint(index, chunk, translated)
+                except QuotaExceeded:
+                    # Retrying can't help and the other chunks would only
+                    # keep reserving; stop the whole document
+                    raise
+                except Exception as e:
+                    logger.error(f"Chunk {index} failed: {str(e)}")
+                    stats.errors += 1
+                    failed[index] = chunk
+                    failure_errors[index] = e
+                    translated = f"[TRANSLATION ERROR: {str(e)}]"
+                stats.translation.busy_seconds += time.perf_counter() - stage_start
+                stats.translation.items += 1
+                stats.translation.chars += len(chunk)
+                finished[index] = translated
+                emitted.set()
+
+        async def reassemble():
+            nonlocal next_to_emit
+            while not (extraction_done and next_to_emit >= extracted):
+                if next_to_emit not in finished:
+                    emitted.clear()
+                    await emitted.wait()
+                    continue
+                translated = finished.pop(next_to_emit)
+                stage_start = time.perf_counter()
+                if sink is not None:
+                    await asyncio.to_thread(sink, next_to_emit, translated)
+                else:
+                    collected.append(translated)
+                stats.reassembly.busy_seconds += time.perf_counter() - stage_start
+                stats.reassembly.items += 1
+                stats.reassembly.chars += len(translated)
+                next_to_emit += 1
+                pending.release()
+                report_progress()
+
+        producer = asyncio.create_task(extract())
+        workers = [asyncio.create_task(translate()) for _ in range(self.workers)]
+        reassembler = asyncio.create_task(reassemble())
+        # Wake the reassembler when extraction ends with nothing left to wait for
+        producer.add_done_callback(lambda _: emitted.set())
+        tasks = [producer, reassembler, *workers]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            # Let in-flight chunks give back their reservations first
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        if failed:
+            stats.retried = len(failed)
+            retried = await self.translator.aretry_chunks(
+                failed,
+                target_lang,
+                source_lang,
+                concurrency=max(1, self.workers // RETRY_CONCURRENCY_DIVISOR),
+                translate=translate_chunk
+            )
+            for translated in retried.values():
+                if isinstance(translated, QuotaExceeded):
+                    raise translated
+            for index, translated in retried.items():
+                if isinstance(translated, Exception):
+                    failure_errors[index] = translated
+                    continue
+                await save_checkpoint(index, failed.pop(index), translated)
+                if sink is None:
+                    collected[index] = translated
+
+        stats.failed = len(failed)
+        stats.wall_seconds = time.perf_counter() - started
+        report_progress()
+        logger.info(f"Pipeline finished: {stats.as_dict()}")
+        segments = None
+        text = " ".join(collected)
+        if segmented and sink is None and not failed:
+            segments = collect_translations(collected)
+            text = "\n".join(segments.values())
+        return PipelineResult(
+            text=text,
+            stats=stats,
+            failed_chunks=sorted(failed),
+            errors={index: failure_errors[index] for index in sorted(failed)},
+            segments=segments
+        )
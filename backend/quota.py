@@ -0,0 +1,225 @@
+import os
+import uuid
+import threading
+import logging
+from typing import Callable, Dict, Any, List, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, remaining: int, requested: int):
+        self.remaining = max(0, remaining)
+        self.requested = requested
+        super().__init__(
+            f"Monthly character limit exceeded: {requested} requested, {self.remaining} remaining"
+        )
+
+
+class QuotaService:
+    """
+    Holds characters against a user's monthly limit before any upstream
+    spend. A reservation is one conditional UPDATE on the month's total
+    rollup row: it only succeeds while used + reserved + requested fits
+    the limit, so concurrent requests cannot overshoot it. Usage itself
+    is still charged by ``record_translation``; afterwards the caller
+    commits the reservation, or releases it if the translation failed.
+    Reservations a crashed process never settled expire after ``ttl``.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 900.0,
+        enabled: bool = True,
+        pending_usage: Optional[Callable[[int], int]] = None
+    ):
+        from database import db
+        self.db = db
+        self.ttl = ttl
+        self.enabled = enabled
+        # Usage recorded but not yet written (write-behind history)
+        self.pending_usage = pending_usage
+        self._lock = threading.Lock()
+        self.reservations = 0
+        self.rejections = 0
+        self.commits = 0
+        self.releases = 0
+
+    def reserve(self, user_id: int, characters: int, owner: Optional[str] = None) -> Optional[str]:
+        """Return a reservation id, or raise :class:`QuotaExceeded`"""
+        if not self.enabled:
+            return None
+        pending = self.pending_usage(user_id) if self.pending_usage else 0
+        reservation_id = str(uuid.uuid4())
+        with self.db.get_cursor() as cursor:
+            self._expire(cursor, user_id)
+            if owner is not None:
+                # Long jobs keep their earlier holds alive while they progress
+                cursor.execute("""
+                    UPDATE quota_reservations
+                    SET expires_at = CURRENT_TIMESTAMP + %s * INTERVAL '1 second'
+                    WHERE owner = %s
+                    """, (self.ttl, owner))
+            cursor.execute("""
+                INSERT INTO usage_rollups (user_id, month, source_language, target_language)
+                VALUES (%s, date_trunc('month', CURRENT_DATE), '*', '*')
+                ON CONFLICT DO NOTHING
+                """, (user_id,))
+            cursor.execute("""
+                UPDATE usage_rollups r
+                SET reserved = r.reserved + %s
+                FROM users u
+                WHERE u.id = r.user_id
+                AND r.user_id = %s
+                AND r.month = date_trunc('month', CURRENT_DATE)
+                AND r.source_language = '*'
+                AND r.target_language = '*'
+                AND r.characters + r.reserved + %s + %s <= u.monthly_character_limit
+                RETURNING r.month
+                """, (characters, user_id, pending, characters))
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute("""
+                    SELECT u.monthly_character_limit - r.characters - r.reserved AS remaining
+                    FROM usage_rollups r
+                    JOIN users u ON u.id = r.user_id
+                    WHERE r.user_id = %s
+                    AND r.month = date_trunc('month', CURRENT_DATE)
+                    AND r.source_language = '*'
+                    AND r.target_language = '*'
+                    """, (user_id,))
+                remaining = cursor.fetchone()
+                with self._lock:
+                    self.rejections += 1
+                raise QuotaExceeded((remaining['remaining'] if remaining else 0) - pending, characters)
+            cursor.execute("""
+                INSERT INTO quota_reservations (id, user_id, month, characters, owner, expires_at)
+                VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP + %s * INTERVAL '1 second')
+                """, (reservation_id, user_id, row['month'], characters, owner, self.ttl))
+        with self._lock:
+            self.reservations += 1
+        return reservation_id
+
+    def commit(self, reservation_id: Optional[str]):
+        """The translation succeeded and its usage has been recorded"""
+        if self._settle(reservation_id):
+            with self._lock:
+                self.commits += 1
+
+    def release(self, reservation_id: Optional[str]):
+        """The translation failed, give the characters back"""
+        if self._settle(reservation_id):
+            with self._lock:
+                self.releases += 1
+
+    def _settle(self, reservation_id: Optional[str]) -> bool:
+        if reservation_id is None:
+            return False
+        try:
+            with self.db.get_cursor() as cursor:
+                cursor.execute("""
+                    WITH settled AS (
+                        DELETE FROM quota_reservations WHERE id = %s
+                        RETURNING user_id, month, characters
+                    )
+                    UPDATE usage_rollups r
+                    SET reserved = GREATEST(0, r.reserved - settled.characters)
+                    FROM settled
+                    WHERE r.user_id = settled.user_id
+                    AND r.month = settled.month
+                    AND r.source_language = '*'
+                    AND r.target_language = '*'
+                    """, (reservation_id,))
+            return True
+        except Exception as e:
+            # The hold expires on its own
+            logger.error(f"Settling quota reservation {reservation_id} failed: {e}")
+            return False
+
+    def _expire(self, cursor, user_id: int):
+        cursor.execute("""
+            WITH expired AS (
+                DELETE FROM quota_reservations
+                WHERE user_id = %s AND expires_at < CURRENT_TIMESTAMP
+                RETURNING month, characters
+            )
+            UPDATE usage_rollups r
+            SET reserved = GREATEST(0, r.reserved - e.characters)
+            FROM (SELECT month, SUM(characters) AS characters FROM expired GROUP BY month) e
+            WHERE r.user_id = %s
+            AND r.month = e.month
+            AND r.source_language = '*'
+            AND r.target_language = '*'
+            """, (user_id, user_id))
+
+    def hold(self, user_id: int, owner: Optional[str] = None) -> "QuotaHold":
+        return QuotaHold(self, user_id, owner)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'reservations': self.reservations,
+                'rejections': self.rejections,
+                'commits': self.commits,
+                'releases': self.releases,
+                'ttl_seconds': self.ttl
+            }
+
+
+class QuotaHold:
+    """
+    Reservations made piecemeal for one document, e.g. per chunk as the
+    pipeline reaches it. Settled together once the document is done.
+    """
+
+    def __init__(self, service: QuotaService, user_id: int, owner: Optional[str] = None):
+        self.service = service
+        self.user_id = user_id
+        self.owner = owner
+        self._lock = threading.Lock()
+        self._reservations: Dict[str, int] = {}
+
+    def reserve(self, characters: int) -> Optional[str]:
+        reservation_id = self.service.reserve(self.user_id, characters, self.owner)
+        if reservation_id is not None:
+            with self._lock:
+                self._reservations[reservation_id] = characters
+        return reservation_id
+
+    def release(self, reservation_id: Optional[str]):
+        """Give back one piece, e.g. for a chunk that failed"""
+        with self._lock:
+            if self._reservations.pop(reservation_id, None) is None:
+                return
+        self.service.release(reservation_id)
+
+    @property
+    def reserved(self) -> int:
+        with self._lock:
+            return sum(self._reservations.values())
+
+    def _take_all(self) -> List[str]:
+        with self._lock:
+            reservations = list(self._reservations)
+            self._reservations.clear()
+        return reservations
+
+    def commit_all(self):
+        for reservation_id in self._take_all():
+            self.service.commit(reservation_id)
+
+    def release_all(self):
+        for reservation_id in self._take_all():
+            self.service.release(reservation_id)
+
+
+def create_quota_service(pending_usage: Optional[Callable[[int], int]] = None) -> QuotaService:
+    """QUOTA_ENABLED=0 turns enforcement off"""
+    return QuotaService(
+        ttl=float(os.getenv("QUOTA_RESERVATION_TTL_SECONDS", "900")),
+        enabled=os.getenv("QUOTA_ENABLED", "1").lower() not in ("0", "false", "no"),
+        pending_usage=pending_usage
+    )
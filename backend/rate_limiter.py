@@ -0,0 +1,292 @@
+import os
+import time
+import asyncio
+import sqlite3
+import threading
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# (bucket name, amount to take, capacity, refill rate per second)
+BucketRequest = Tuple[str, float, float, float]
+# Gets a stored (value, updated) pair; returns the pair to store, or None to keep it
+ValueUpdate = Callable[[float, float], Optional[Tuple[float, float]]]
+
+
+class LocalBackend:
+    """In-process bucket store, safe across threads."""
+
+    # Calls only hold an in-memory lock, so they may run on the event loop
+    blocking = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._values: Dict[str, Tuple[float, float]] = {}
+
+    def take(self, requests: List[BucketRequest], now: float) -> float:
+        """
+        Atomically take from every bucket or from none.
+        Returns 0 when granted, otherwise the seconds to wait.
+        """
+        with self._lock:
+            levels = []
+            wait = 0.0
+            for name, amount, capacity, rate in requests:
+                tokens, updated = self._buckets.get(name, (capacity, now))
+                tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+                levels.append(tokens)
+                if tokens < amount:
+                    wait = max(wait, (amount - tokens) / rate)
+            if wait > 0:
+                return wait
+            for (name, amount, _, _), tokens in zip(requests, levels):
+                self._buckets[name] = (tokens - amount, now)
+            return 0.0
+
+    def get_value(self, name: str, default: float) -> Tuple[float, float]:
+        with self._lock:
+            return self._values.get(name, (default, 0.0))
+
+    def set_value(self, name: str, value: float, now: float):
+        with self._lock:
+            self._values[name] = (value, now)
+
+    def update_value(self, name: str, default: float, update: ValueUpdate) -> float:
+        """Read-modify-write one value atomically; returns the value now stored"""
+        with self._lock:
+            current = self._values.get(name, (default, 0.0))
+            updated = update(*current)
+            if updated is None:
+                return current[0]
+            self._values[name] = updated
+            return updated[0]
+
+
+class SQLiteBackend:
+    """
+    Bucket store in a SQLite file, shared by every worker process
+    on the host (e.g. all gunicorn workers).
+    """
+
+    # Every call may wait up to the 5s busy timeout for the file lock
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+                """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_values (
+                    name TEXT PRIMARY KEY,
+                    value REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+                """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, requests: List[BucketRequest], now: float) -> float:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            levels = []
+            wait = 0.0
+            for name, amount, capacity, rate in requests:
+                row = conn.execute(
+                    "SELECT tokens, updated FROM rate_buckets WHERE name = ?", (name,)
+                ).fetchone()
+                tokens, updated = row if row else (capacity, now)
+                tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+                levels.append(tokens)
+                if tokens < amount:
+                    wait = max(wait, (amount - tokens) / rate)
+            if wait == 0:
+                for (name, amount, _, _), tokens in zip(requests, levels):
+                    conn.execute(
+                        "INSERT OR REPLACE INTO rate_buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                        (name, tokens - amount, now)
+                    )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_value(self, name: str, default: float) -> Tuple[float, float]:
+        row = self._connect().execute(
+            "SELECT value, updated FROM rate_values WHERE name = ?", (name,)
+        ).fetchone()
+        return (row[0], row[1]) if row else (default, 0.0)
+
+    def set_value(self, name: str, value: float, now: float):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO rate_values (name, value, updated) VALUES (?, ?, ?)",
+            (name, value, now)
+        )
+
+    def update_value(self, name: str, default: float, update: ValueUpdate) -> float:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value, updated FROM rate_values WHERE name = ?", (name,)
+            ).fetchone()
+            current = (row[0], row[1]) if row else (default, 0.0)
+            updated = update(*current)
+            if updated is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_values (name, value, updated) VALUES (?, ?, ?)",
+                    (name, updated[0], updated[1])
+                )
+            conn.execute("COMMIT")
+            return current[0] if updated is None else updated[0]
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for requests/sec and tokens/min with AIMD:
+    the allowed rate is multiplied down on every 429 and creeps back
+    up by a fixed step after each success.
+
+    The ``*_async`` methods are for the shared event loop: with a backend
+    that can block (SQLite waits on a file lock), they run its calls on a
+    thread so one contended lock does not stall every translation.
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = 5.0,
+        tokens_per_minute: float = 1_000_000,
+        backend=None,
+        name: str = "deepseek",
+        min_factor: float = 0.1,
+        increase_step: float = 0.02,
+        decrease_factor: float = 0.5,
+        decrease_cooldown: float = 1.0
+    ):
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second must be positive")
+        if tokens_per_minute <= 0:
+            raise ValueError("tokens_per_minute must be positive")
+        self.requests_per_second = requests_per_second
+        self.tokens_per_minute = tokens_per_minute
+        self.backend = backend or LocalBackend()
+        self.name = name
+        self.min_factor = min_factor
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        # A burst of 429s from one overload only halves the rate once
+        self.decrease_cooldown = decrease_cooldown
+
+    @property
+    def factor(self) -> float:
+        return self.backend.get_value(f"{self.name}:factor", 1.0)[0]
+
+    def try_acquire(self, tokens: int = 0) -> float:
+        """Take one request and ``tokens`` tokens; return seconds to wait, 0 if granted"""
+        factor = self.factor
+        rps = self.requests_per_second * factor
+        tps = self.tokens_per_minute * factor / 60.0
+        requests = [(f"{self.name}:requests", 1, max(1.0, rps), rps)]
+        if tokens:
+            # Oversized requests would never fit, let them drain a full bucket
+            capacity = self.tokens_per_minute * factor
+            requests.append((f"{self.name}:tokens", min(tokens, capacity), capacity, tps))
+        return self.backend.take(requests, time.time())
+
+    def acquire(self, tokens: int = 0):
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def _call_backend(self, function, *args):
+        if getattr(self.backend, "blocking", True):
+            return await asyncio.to_thread(function, *args)
+        return function(*args)
+
+    async def acquire_async(self, tokens: int = 0):
+        while True:
+            wait = await self._call_backend(self.try_acquire, tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    # The factor's ``updated`` time is when it was last decreased, which
+    # is what the cooldown needs; increases keep it as it was
+    def _increase(self, factor: float, decreased_at: float) -> Optional[Tuple[float, float]]:
+        if factor >= 1.0:
+            return None
+        return min(1.0, factor + self.increase_step), decreased_at
+
+    def _decrease(self, factor: float, decreased_at: float) -> Optional[Tuple[float, float]]:
+        now = time.time()
+        if now - decreased_at < self.decrease_cooldown:
+            return None
+        return max(self.min_factor, factor * self.decrease_factor), now
+
+    def on_success(self):
+        self.backend.update_value(f"{self.name}:factor", 1.0, self._increase)
+
+    def on_rate_limited(self):
+        before = self.factor
+        factor = self.backend.update_value(f"{self.name}:factor", 1.0, self._decrease)
+        if factor < before:
+            logger.warning(f"Rate limited upstream, backing off to {factor:.2f}x of configured rate")
+
+    async def on_success_async(self):
+        await self._call_backend(self.on_success)
+
+    async def on_rate_limited_async(self):
+        await self._call_backend(self.on_rate_limited)
+
+
+_default_limiter: Optional[RateLimiter] = None
+_default_lock = threading.Lock()
+
+
+def create_rate_limiter() -> RateLimiter:
+    """
+    Build the limiter from the environment. RATE_LIMIT_BACKEND is
+    ``local`` (default) or ``sqlite:<path>`` to share limits across processes.
+    """
+    backend_spec = os.getenv("RATE_LIMIT_BACKEND", "local")
+    if backend_spec.startswith("sqlite:"):
+        backend = SQLiteBackend(backend_spec[len("sqlite:"):])
+    else:
+        backend = LocalBackend()
+    return RateLimiter(
+        requests_per_second=float(os.getenv("DEEPSEEK_REQUESTS_PER_SECOND", "5")),
+        tokens_per_minute=float(os.getenv("DEEPSEEK_TOKENS_PER_MINUTE", "1000000")),
+        backend=backend
+    )
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide limiter shared by every translator instance"""
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = create_rate_limiter()
+        return _default_limiter
@@ -0,0 +1,157 @@
+import re
+import logging
+from functools import lru_cache
+from typing import Callable, Iterator, NamedTuple, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Boundary kinds, strongest first. Each chunk is cut at the latest
+# boundary of the strongest kind that fits in its budget.
+PARAGRAPH = "paragraph"
+LINE = "line"
+SENTENCE = "sentence"
+WORD = "word"
+CHAR = "char"
+END = "end"
+
+# Sentence terminators beyond . ! ? by language
+_TERMINATORS = {
+    "zh": "\u3002\uff01\uff1f",
+    "ja": "\u3002\uff01\uff1f",
+    "hi": "\u0964",
+    "ar": "\u061f",
+}
+_ALL_TERMINATORS = "".join(sorted(set("".join(_TERMINATORS.values()))))
+
+# Periods after these words do not end a sentence
+_ABBREVIATIONS = {
+    "en": {"mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "inc", "ltd", "co", "no", "fig"},
+    "de": {"z.b", "bzw", "usw", "ca", "nr", "dr", "prof", "str", "vgl", "ggf"},
+    "fr": {"m", "mme", "mlle", "dr", "etc", "p.ex", "cf"},
+    "es": {"sr", "sra", "srta", "dr", "etc", "ej", "p\u00e1g"},
+}
+_WORD_BEFORE_PERIOD = re.compile(r"([\w.]+)[.]$")
+
+
+class Span(NamedTuple):
+    """A chunk of the source text, by offsets; ``kind`` is the boundary it ends on"""
+    start: int
+    end: int
+    kind: str
+
+
+class BoundaryRules:
+    """Precompiled paragraph and sentence boundaries for one language"""
+
+    def __init__(self, lang: str):
+        self.lang = lang
+        if lang in _TERMINATORS:
+            extra = _TERMINATORS[lang]
+        elif lang == "auto":
+            extra = _ALL_TERMINATORS
+        else:
+            extra = ""
+        # Closing quotes and brackets that may follow a terminator
+        closers = "\"')\\]\u201d\u2019\u00bb\u300d\u300f\uff09"
+        sentence = rf"[.!?][{closers}]*[ \t]+"
+        if extra:
+            # These scripts don't put a space after the terminator
+            sentence += rf"|[{extra}]+[{closers}]*[ \t]*"
+        self.paragraph = re.compile(r"\n[ \t\r]*\n\s*")
+        self.sentence = re.compile(sentence)
+        if lang == "auto":
+            self.abbreviations = set().union(*_ABBREVIATIONS.values())
+        else:
+            self.abbreviations = _ABBREVIATIONS.get(lang, set())
+
+    def is_abbreviation(self, text: str, match: "re.Match") -> bool:
+        if not self.abbreviations or text[match.start()] != ".":
+            return False
+        before = _WORD_BEFORE_PERIOD.search(text, max(0, match.start() - 12), match.start() + 1)
+        return bool(before) and before.group(1).lower() in self.abbreviations
+
+
+@lru_cache(maxsize=None)
+def rules_for(lang: str) -> BoundaryRules:
+    return BoundaryRules((lang or "auto").lower().split("-")[0].split("_")[0])
+
+
+class Segmenter:
+    """
+    Single-pass, offset-based chunker. Each chunk's window is sized with
+    a few calls to ``measure`` (characters by default, the planner passes
+    a token estimate), then its cut point is found by scanning only that
+    window backwards for the strongest boundary. Every character is looked
+    at a bounded number of times and no text is copied until a caller
+    slices a span.
+    """
+
+    def __init__(self, lang: str = "auto", measure: Callable[[str], int] = len):
+        self.rules = rules_for(lang)
+        self.measure = measure
+
+    def segment(self, text: str, budget: int) -> Iterator[Span]:
+        """Yield contiguous spans covering ``text`` whose measured size fits ``budget``"""
+        start = 0
+        length = len(text)
+        while start < length:
+            end = self._fit(text, start, budget)
+            if end >= length:
+                yield Span(start, length, END)
+                return
+            cut, kind = self._last_boundary(text, start, end)
+            yield Span(start, cut, kind)
+            start = cut
+
+    def _fit(self, text: str, start: int, budget: int) -> int:
+        """Furthest end offset (within a few percent) whose window fits the budget"""
+        measure = self.measure
+        length = len(text)
+        end = min(length, start + budget)
+        size = measure(text[start:end])
+        for _ in range(4):
+            if size > budget:
+                end = start + max(1, (end - start) * budget // size)
+            elif end < length and size < budget * 0.95:
+                # Measure is sublinear in characters (e.g. tokens), widen by the density
+                end = min(length, start + max(end - start + 1, (end - start) * budget // max(size, 1)))
+            else:
+                break
+            size = measure(text[start:end])
+        while size > budget and end - start > 1:
+            end = start + max(1, (end - start) * budget * 9 // (size * 10))
+            size = measure(text[start:end])
+        return end
+
+    def _last_boundary(self, text: str, start: int, end: int) -> Tuple[int, str]:
+        """Latest cut point in ``text[start:end]``, preferring stronger boundaries"""
+        rules = self.rules
+
+        cut = -1
+        for match in rules.paragraph.finditer(text, start, end):
+            cut = match.end()
+        if cut > start:
+            return cut, PARAGRAPH
+
+        newline = text.rfind("\n", start, end)
+        if newline >= start and newline + 1 < end:
+            return newline + 1, LINE
+
+        sentences = [match for match in rules.sentence.finditer(text, start, end) if match.end() > start]
+        for match in reversed(sentences):
+            if not rules.is_abbreviation(text, match):
+                return match.end(), SENTENCE
+
+        space = max(text.rfind(" ", start + 1, end), text.rfind("\t", start + 1, end))
+        if space > start:
+            return space + 1, WORD
+        return end, CHAR
+
+    def chunks(self, text: str, budget: int) -> Iterator[str]:
+        """Chunk texts, trimmed, skipping whitespace-only spans"""
+        for span in self.segment(text, budget):
+            chunk = text[span.start:span.end].strip()
+            if chunk:
+                yield chunk
@@ -0,0 +1,57 @@
+import json
+from dataclasses import dataclass
+from typing import Dict, Generator, Iterable, List
+
+from chunking import estimate_tokens
+
+
+@dataclass
+class Segment:
+    """
+    One translatable unit of a structured document: a spreadsheet cell,
+    or a DOCX/PPTX paragraph. ``id`` is opaque to everything but the
+    format that produced it, and the same file always yields the same
+    ids, so translations can be written back by id whatever order they
+    were made in.
+    """
+    id: str
+    text: str
+
+
+def pack_segments(
+    segments: Iterable[Segment],
+    max_tokens: int,
+    max_segments: int = 200
+) -> Generator[List[Segment], None, None]:
+    """Group segments in document order into batches of at most ``max_tokens``"""
+    batch: List[Segment] = []
+    batch_tokens = 0
+    for segment in segments:
+        tokens = estimate_tokens(segment.text)
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_segments):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(segment)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+# A batch travels through the pipeline (queue, checkpoints, retries) as
+# one string, so it is encoded as JSON rather than with text markers
+def encode_batch(batch: List[Segment]) -> str:
+    return json.dumps([[segment.id, segment.text] for segment in batch], ensure_ascii=False)
+
+
+def decode_batch(chunk: str) -> List[Segment]:
+    return [Segment(segment_id, text) for segment_id, text in json.loads(chunk)]
+
+
+def batch_text_bytes(chunk: str) -> int:
+    """UTF-8 size of the text alone, which is what gets billed"""
+    return sum(len(segment.text.encode('utf-8')) for segment in decode_batch(chunk))
+
+
+def collect_translations(chunks: Iterable[str]) -> Dict[str, str]:
+    """Translated batches, in any order, as segment id -> text"""
+    return {segment.id: segment.text for chunk in chunks for segment in decode_batch(chunk)}
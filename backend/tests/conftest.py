@@ -0,0 +1,40 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+# The backend modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# database opens its pool on import; with no minimum it connects lazily
+os.environ.setdefault("DB_POOL_MIN", "0")
+# Tests using the postgres fixture migrate and write to this scratch
+# database (connection settings otherwise from DB_USER, DB_HOST...)
+if os.getenv("TEST_DB_NAME"):
+    os.environ["DB_NAME"] = os.environ["TEST_DB_NAME"]
+
+
+@pytest.fixture(scope="session")
+def postgres():
+    if not os.getenv("TEST_DB_NAME"):
+        pytest.skip("set TEST_DB_NAME to a scratch Postgres database")
+    from database import db
+    from init_db import run_migrations
+    run_migrations()
+    return db
+
+
+@pytest.fixture
+def pg_user(postgres):
+    """A user with a 1000 character monthly limit, deleted afterwards"""
+    name = f"test-{uuid.uuid4().hex[:12]}"
+    with postgres.get_cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO users (username, email, hashed_password, monthly_character_limit)
+            VALUES (%s, %s, 'x', 1000)
+            RETURNING id
+            """, (name, f"{name}@example.com"))
+        user_id = cursor.fetchone()['id']
+    yield user_id
+    with postgres.get_cursor() as cursor:
+        cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
@@ -0,0 +1,55 @@
+import math
+
+from chunking import MIN_CHUNK_TOKENS, ChunkPlanner, estimate_tokens, expansion_ratio
+
+
+def test_estimate_tokens_by_script():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a" * 100) == 30
+    assert estimate_tokens("中" * 100) == 60
+    assert estimate_tokens("ж" * 100) == 45
+    assert estimate_tokens("ab中") == 2
+
+
+def test_budget_shrinks_with_expansion():
+    assert expansion_ratio("zh-CN", "en") == 1.6
+    assert expansion_ratio("auto", "de") == 1.3
+    assert expansion_ratio("auto", "xx") == 1.3
+    english = ChunkPlanner(request_tokens=1000, source_lang="fr", target_lang="en")
+    german = ChunkPlanner(request_tokens=1000, source_lang="en", target_lang="de")
+    assert english.max_tokens == int((1000 - 40) / 2.0)
+    assert german.max_tokens < english.max_tokens
+    assert ChunkPlanner(request_tokens=50).max_tokens == MIN_CHUNK_TOKENS
+
+
+def test_pack_fills_chunks_up_to_the_budget():
+    planner = ChunkPlanner(request_tokens=300)
+    paragraphs = [f"Paragraph {n} has a few words in it." for n in range(40)]
+    chunks = list(planner.pack(paragraphs))
+    assert "\n\n".join(chunks) == "\n\n".join(paragraphs)
+    assert all(estimate_tokens(chunk) <= planner.max_tokens for chunk in chunks)
+    # Greedy: the next paragraph, counted the way pack counts, would not have fit
+    def packed_tokens(units):
+        return sum(estimate_tokens(unit) for unit in units) + (len(units) - 1) * estimate_tokens("\n\n")
+
+    for chunk, following in zip(chunks, chunks[1:]):
+        units = chunk.split("\n\n") + following.split("\n\n")[:1]
+        assert packed_tokens(units) > planner.max_tokens
+
+
+def test_pack_splits_oversized_units_on_their_own():
+    planner = ChunkPlanner(request_tokens=300)
+    long = "This sentence is fairly long. " * 60
+    chunks = list(planner.pack(["Short intro.", long, "", "Short outro."]))
+    assert chunks[0] == "Short intro."
+    assert chunks[-1] == "Short outro."
+    assert len(chunks) > 3
+    assert all(estimate_tokens(chunk) <= planner.max_tokens for chunk in chunks)
+
+
+def test_plan_reports_the_chunks():
+    planner = ChunkPlanner(request_tokens=300, target_lang="fr")
+    plan = planner.plan("Some words here. " * 100)
+    assert plan.chunk_count == len(plan.token_counts) > 1
+    assert plan.estimated_output_tokens == math.ceil(plan.estimated_tokens * 1.3)
+    assert plan.as_dict()['max_chunk_tokens'] == planner.max_tokens
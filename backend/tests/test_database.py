@@ -0,0 +1,91 @@
+import pytest
+
+import database
+
+
+class FakeConnection:
+    def __init__(self, fail_rollback=False):
+        self.closed = 0
+        self.fail_rollback = fail_rollback
+        self.calls = []
+
+    def cursor(self):
+        return FakeCursor()
+
+    def commit(self):
+        self.calls.append("commit")
+
+    def rollback(self):
+        self.calls.append("rollback")
+        if self.fail_rollback:
+            raise RuntimeError("connection lost")
+
+
+class FakeCursor:
+    def close(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+        self.returned = []
+
+    def getconn(self):
+        return self.conn
+
+    def putconn(self, conn, discard=False):
+        self.returned.append(discard)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    def make(conn):
+        pool = FakePool(conn)
+        monkeypatch.setattr(database.db, "pool", pool)
+        return pool
+    return make
+
+
+def test_commits_on_success(db):
+    conn = FakeConnection()
+    pool = db(conn)
+    with database.db.get_cursor():
+        pass
+    assert conn.calls == ["commit"]
+    assert pool.returned == [False]
+
+
+@pytest.mark.parametrize("error", [ValueError, KeyboardInterrupt, GeneratorExit])
+def test_rolls_back_on_any_exit(db, error):
+    conn = FakeConnection()
+    pool = db(conn)
+    with pytest.raises(error):
+        with database.db.get_cursor():
+            raise error()
+    assert conn.calls == ["rollback"]
+    assert pool.returned == [False]
+
+
+def test_abandoned_generator_rolls_back(db):
+    conn = FakeConnection()
+    pool = db(conn)
+
+    def rows():
+        with database.db.get_cursor():
+            yield 1
+            yield 2
+
+    iterator = rows()
+    next(iterator)
+    iterator.close()
+    assert conn.calls == ["rollback"]
+    assert pool.returned == [False]
+
+
+def test_discards_connection_when_rollback_fails(db):
+    pool = db(FakeConnection(fail_rollback=True))
+    with pytest.raises(KeyboardInterrupt):
+        with database.db.get_cursor():
+            raise KeyboardInterrupt()
+    assert pool.returned == [True]
@@ -0,0 +1,202 @@
+import asyncio
+import gc
+import warnings
+
+import pytest
+from aiohttp import web
+from tenacity import wait_none
+
+from benchmarks.mock_deepseek import MockDeepSeek
+from deepseek_api import (
+    AuthenticationError,
+    BatchAlignmentError,
+    DeepSeekTranslator,
+    IncompleteTranslationError,
+)
+from rate_limiter import RateLimiter
+
+TEXT = " ".join(f"Sentence number {n} talks about something else entirely." for n in range(300))
+
+
+@pytest.fixture
+def translator():
+    return DeepSeekTranslator(api_key="test", rate_limiter=RateLimiter())
+
+
+def fail_on(translator, marker: str):
+    """Translate by upper-casing, failing every chunk that contains ``marker``"""
+    async def atranslate_text(text, target_lang, source_lang="auto", **kwargs):
+        if marker in text:
+            raise ConnectionError("upstream down")
+        return text.upper()
+
+    async def astream_text(text, target_lang, source_lang="auto", **kwargs):
+        yield await atranslate_text(text, target_lang, source_lang)
+
+    translator.atranslate_text = atranslate_text
+    translator.astream_text = astream_text
+
+
+def test_split_batch_output_aligns_markers(translator):
+    content = "[[1]]\nBonjour\n[[2]]\n  Au revoir \n"
+    assert translator._split_batch_output(content, 2) == ["Bonjour", "Au revoir"]
+
+
+@pytest.mark.parametrize("content", [
+    "[[1]]\nBonjour",
+    "[[2]]\nAu revoir\n[[1]]\nBonjour",
+    "[[1]]\nBonjour\n[[2]]\nSalut\n[[3]]\nEn trop",
+    "Bonjour\nAu revoir",
+])
+def test_split_batch_output_rejects_misaligned(translator, content):
+    with pytest.raises(BatchAlignmentError):
+        translator._split_batch_output(content, 2)
+
+
+def test_misaligned_batches_are_halved_until_they_align(translator):
+    sizes = []
+
+    async def request_batch(texts, target_lang, source_lang, **kwargs):
+        sizes.append(len(texts))
+        if len(texts) > 2:
+            raise BatchAlignmentError("too many")
+        return [text.upper() for text in texts]
+
+    async def request_translation(text, target_lang, source_lang="auto", **kwargs):
+        sizes.append(1)
+        return text.upper()
+
+    translator._arequest_batch = request_batch
+    translator._arequest_translation = request_translation
+    segments = ["a", "", "b", "c", "d", "e"]
+    result = asyncio.run(translator.atranslate_batch(segments, "fr"))
+    assert result == ["A", "", "B", "C", "D", "E"]
+    # 5 -> 2 + 3, and the 3 -> 1 + 2
+    assert sorted(sizes) == [1, 2, 2, 3, 5]
+
+
+def test_large_text_leaves_placeholders_unless_strict(translator):
+    assert translator.plan_chunks(TEXT, "fr", request_tokens=300).chunk_count > 2
+    fail_on(translator, "number 150 ")
+
+    translated = asyncio.run(translator.atranslate_large_text(TEXT, "fr", request_tokens=300))
+    assert "[TRANSLATION ERROR" in translated
+
+    with pytest.raises(IncompleteTranslationError) as raised:
+        asyncio.run(translator.atranslate_large_text(TEXT, "fr", request_tokens=300, strict=True))
+    assert len(raised.value.errors) == 1
+
+
+def test_stream_raises_at_the_failed_chunk(translator):
+    fail_on(translator, "number 150 ")
+    received = []
+
+    async def consume():
+        async for delta in translator.astream_large_text(TEXT, "fr", request_tokens=300):
+            received.append(delta)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(consume())
+    streamed = "".join(received)
+    assert streamed.startswith("SENTENCE NUMBER 0 ")
+    assert "NUMBER 149 " in streamed or "NUMBER 149." in streamed
+    assert "TRANSLATION ERROR" not in streamed
+
+
+class ScriptedDeepSeek(MockDeepSeek):
+    """The mock server, answering each request with the next scripted status"""
+
+    def __init__(self, *statuses, hang_above=None):
+        super().__init__()
+        self.statuses = list(statuses)
+        self.hang_above = hang_above
+        self.texts = []
+
+    async def _complete(self, request, body):
+        text = self._translate(body["messages"][-1]["content"])
+        self.texts.append(text)
+        if self.hang_above is not None and len(text) > self.hang_above:
+            await asyncio.sleep(1)
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status == 429:
+            return self._rate_limited()
+        if status != 200:
+            return web.json_response({'error': {'message': 'scripted'}}, status=status)
+        return web.json_response({'choices': [{'message': {'content': text.upper()}}]})
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    # No backoff between attempts
+    monkeypatch.setattr(DeepSeekTranslator._arequest_translation.retry, "wait", wait_none())
+    servers = []
+
+    def start(*statuses, **kwargs):
+        server = ScriptedDeepSeek(*statuses, **kwargs)
+        servers.append(server)
+        translator = DeepSeekTranslator(api_key="test", base_url=server.start(), rate_limiter=RateLimiter())
+        return server, translator
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+async def translate_and_close(translator, text):
+    try:
+        return await translator.atranslate_text(text, "fr")
+    finally:
+        await translator.aclose()
+
+
+def test_rate_limited_request_backs_off_and_retries(upstream, monkeypatch):
+    server, translator = upstream(429)
+    backoffs = []
+
+    async def on_rate_limited_async():
+        backoffs.append(True)
+
+    monkeypatch.setattr(translator.rate_limiter, "on_rate_limited_async", on_rate_limited_async)
+    assert asyncio.run(translate_and_close(translator, "Hello")) == "HELLO"
+    assert backoffs == [True]
+    assert server.texts == ["Hello", "Hello"]
+
+
+def test_bad_api_key_is_not_retried(upstream):
+    server, translator = upstream(401)
+    with pytest.raises(AuthenticationError):
+        asyncio.run(translate_and_close(translator, "Hello"))
+    assert server.texts == ["Hello"]
+
+
+def test_timeout_splits_the_text_into_parts(upstream):
+    text = " ".join(f"Sentence {n} is long enough to matter." for n in range(30))
+    server, translator = upstream(hang_above=len(text) // 2 + 50)
+    translator.timeout = 0.3
+    assert asyncio.run(translate_and_close(translator, text)) == text.upper()
+    assert server.texts[0] == text
+    assert len(server.texts) > 2 and all(len(part) < len(text) for part in server.texts[1:])
+
+
+def test_translator_serves_one_loop_at_a_time(upstream):
+    server, translator = upstream()
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(translator.atranslate_text("Hello", "fr")) == "HELLO"
+        # Another loop would get its own session and concurrency bound
+        with pytest.raises(RuntimeError):
+            asyncio.run(translator.atranslate_text("Hello", "fr"))
+        loop.run_until_complete(translator.aclose())
+    finally:
+        loop.close()
+    assert asyncio.run(translate_and_close(translator, "Bye")) == "BYE"
+
+
+def test_session_of_a_closed_loop_is_not_left_unclosed(upstream):
+    server, translator = upstream()
+    assert asyncio.run(translator.atranslate_text("Hello", "fr")) == "HELLO"
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        assert asyncio.run(translate_and_close(translator, "Bye")) == "BYE"
+        gc.collect()
+    assert not [w for w in caught if "Unclosed client session" in str(w.message)]
@@ -0,0 +1,171 @@
+import os
+
+import pytest
+from docx import Document
+from docx.enum.text import WD_BREAK
+from docx.oxml.ns import qn
+from openpyxl import Workbook, load_workbook
+from openpyxl.formatting.rule import CellIsRule
+from openpyxl.styles import Font, PatternFill
+from openpyxl.worksheet.datavalidation import DataValidation
+from pptx import Presentation
+from pptx.oxml.ns import qn as pptx_qn
+from pptx.util import Inches
+
+from file_processor import FileProcessor
+from segments import collect_translations
+
+
+def translate_all(processor, path):
+    """Echo translation: every segment upper-cased"""
+    chunks = list(processor.extract_segment_chunks(path))
+    segments = {segment_id: text.upper() for segment_id, text in collect_translations(chunks).items()}
+    output = processor.reconstruct_document(path, "", "fr", segments=segments)
+    return segments, output
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Prices"
+    sheet["A1"] = "Product name"
+    sheet["A1"].font = Font(bold=True)
+    sheet["B1"] = "Price"
+    sheet["A2"] = "Green apple"
+    sheet["B2"] = 1.5
+    sheet["B2"].number_format = "0.00"
+    sheet["A3"] = "Total"
+    sheet["B3"] = "=SUM(B2:B2)"
+    sheet["A4"] = "=not a formula"
+    sheet["A4"].data_type = "s"
+    sheet["C1"] = "12345"
+    sheet.merge_cells("A6:C6")
+    sheet["A6"] = "Merged heading"
+    sheet.column_dimensions["A"].width = 42
+    validation = DataValidation(type="list", formula1='"yes,no"')
+    sheet.add_data_validation(validation)
+    validation.add("D2")
+    sheet.conditional_formatting.add(
+        "B2:B3", CellIsRule(operator="greaterThan", formula=["1"], fill=PatternFill(bgColor="FFC7CE"))
+    )
+    other = workbook.create_sheet("Notes")
+    other["A1"] = "Second sheet text"
+    path = tmp_path / "book.xlsx"
+    workbook.save(path)
+    return str(path)
+
+
+def test_xlsx_cells_are_translated_in_place(workbook_path):
+    processor = FileProcessor(xlsx_stream_min_bytes=0)
+    segments, output = translate_all(processor, workbook_path)
+    # Numbers, formulas and digit-only text are not sent
+    assert sorted(segments.values()) == sorted([
+        "PRODUCT NAME", "PRICE", "GREEN APPLE", "TOTAL", "=NOT A FORMULA", "MERGED HEADING", "SECOND SHEET TEXT"
+    ])
+
+    sheet = load_workbook(output)["Prices"]
+    assert sheet["A1"].value == "PRODUCT NAME" and sheet["A1"].font.bold
+    assert sheet["B2"].value == 1.5 and sheet["B2"].number_format == "0.00"
+    assert sheet["B3"].value == "=SUM(B2:B2)" and sheet["B3"].data_type == "f"
+    assert sheet["A4"].value == "=NOT A FORMULA" and sheet["A4"].data_type == "s"
+    assert sheet["C1"].value == "12345"
+    assert [str(cells) for cells in sheet.merged_cells.ranges] == ["A6:C6"]
+    assert sheet.column_dimensions["A"].width == 42
+    assert len(sheet.data_validations.dataValidation) == 1
+    assert len(sheet.conditional_formatting) == 1
+    assert load_workbook(output)["Notes"]["A1"].value == "SECOND SHEET TEXT"
+    assert processor.reconstruction_notes(workbook_path) == []
+
+
+def test_xlsx_streaming_is_opt_in_and_reported(workbook_path):
+    processor = FileProcessor(xlsx_stream_min_bytes=1)
+    _, output = translate_all(processor, workbook_path)
+    sheet = load_workbook(output)["Prices"]
+    assert sheet["A2"].value == "GREEN APPLE"
+    assert sheet["A4"].data_type == "s"
+    assert not sheet.merged_cells.ranges
+    assert processor.reconstruction_notes(workbook_path)
+    assert os.path.getsize(output) > 0
+
+
+def tab_and_break_paragraph(paragraph):
+    paragraph.add_run("Hello").bold = True
+    paragraph.add_run(" dear").italic = True
+    paragraph.add_run().add_tab()
+    paragraph.add_run("world").add_break()
+    paragraph.add_run("again")
+
+
+@pytest.fixture
+def docx_path(tmp_path):
+    document = Document()
+    tab_and_break_paragraph(document.add_paragraph())
+    document.add_paragraph("Chapter end").runs[0].add_break(WD_BREAK.PAGE)
+    document.add_table(rows=1, cols=1).cell(0, 0).text = "Table cell"
+    document.sections[0].header.paragraphs[0].text = "Running header"
+    path = tmp_path / "doc.docx"
+    document.save(path)
+    return str(path)
+
+
+def test_docx_keeps_tabs_breaks_and_runs(docx_path):
+    processor = FileProcessor()
+    segments, output = translate_all(processor, docx_path)
+    assert "HELLO DEAR\tWORLD\nAGAIN" in segments.values()
+
+    document = Document(output)
+    runs = document.paragraphs[0].runs
+    assert runs[0].text == "HELLO DEAR" and runs[0].bold
+    assert [run.text for run in runs[1:]] == ["", "\t", "WORLD\n", "AGAIN"]
+    # The page break after the last text is not part of the segment
+    assert document.paragraphs[1].text == "CHAPTER END"
+    assert document.paragraphs[1].runs[0]._r.find(qn("w:br")).get(qn("w:type")) == "page"
+    assert document.tables[0].cell(0, 0).text == "TABLE CELL"
+    assert document.sections[0].header.paragraphs[0].text == "RUNNING HEADER"
+    assert processor.reconstruction_notes(docx_path) == [
+        "1 paragraphs mix formatting between their tabs and line breaks: each such "
+        "stretch was translated whole and takes the formatting of its first run"
+    ]
+
+
+def test_docx_translation_that_moves_breaks_is_rebuilt_in_first_run(docx_path):
+    processor = FileProcessor()
+    segments = {
+        segment_id: "BONJOUR\nLE MONDE" if "\t" in text else text
+        for segment_id, text in collect_translations(processor.extract_segment_chunks(docx_path)).items()
+    }
+    output = processor.reconstruct_document(docx_path, "", "fr", segments=segments)
+    paragraph = Document(output).paragraphs[0]
+    assert paragraph.text == "BONJOUR\nLE MONDE"
+    assert paragraph.runs[0].text == "BONJOUR\nLE MONDE" and paragraph.runs[0].bold
+
+
+def test_docx_plain_extraction_covers_patched_paragraphs(docx_path):
+    text = "\n\n".join(FileProcessor().extract_large_text(docx_path))
+    assert "Table cell" in text and "Running header" in text
+
+
+def test_pptx_keeps_line_breaks(tmp_path):
+    presentation = Presentation()
+    slide = presentation.slides.add_slide(presentation.slide_layouts[6])
+    frame = slide.shapes.add_textbox(Inches(1), Inches(1), Inches(4), Inches(2)).text_frame
+    frame.text = "First line\vSecond line\v\vLast"
+    frame.paragraphs[0].runs[0].font.bold = True
+    path = tmp_path / "deck.pptx"
+    presentation.save(path)
+
+    processor = FileProcessor()
+    segments = {
+        segment_id: text.upper().replace("\n\n", "\nEXTRA\n")
+        for segment_id, text in collect_translations(processor.extract_segment_chunks(str(path))).items()
+    }
+    assert list(segments.values()) == ["FIRST LINE\nSECOND LINE\nEXTRA\nLAST"]
+    output = processor.reconstruct_document(str(path), "", "fr", segments=segments)
+
+    paragraph = Presentation(output).slides[0].shapes[0].text_frame.paragraphs[0]
+    assert [run.text for run in paragraph.runs] == ["FIRST LINE", "SECOND LINE", "EXTRA", "LAST"]
+    # Each line keeps its run; the added one copies the first
+    assert [run.font.bold for run in paragraph.runs] == [True, None, True, None]
+    assert len(paragraph._p.findall(pptx_qn("a:br"))) == 3
+    assert "First line\nSecond line" in "".join(processor.extract_large_text(str(path)))
@@ -0,0 +1,47 @@
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+import pytest
+
+import database
+from database import decode_history_cursor, encode_history_cursor, get_user_translation_history
+
+
+def test_cursor_round_trip_is_url_safe():
+    created_at = datetime(2026, 3, 1, 12, 30, 5, 123456, tzinfo=timezone.utc)
+    cursor = encode_history_cursor({'created_at': created_at, 'id': 987654321})
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+    assert decode_history_cursor(cursor) == (created_at, 987654321)
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "bm90IGpzb24", "WzFd"])
+def test_malformed_cursors_raise(cursor):
+    with pytest.raises(Exception):
+        decode_history_cursor(cursor)
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, sql, params):
+        self.executed.append((sql, params))
+
+    def fetchall(self):
+        return []
+
+
+def test_keyset_query_bounds_the_partition_key(monkeypatch):
+    cursor = RecordingCursor()
+
+    class Db:
+        def get_cursor(self):
+            return nullcontext(cursor)
+
+    monkeypatch.setattr(database, "db", Db())
+    before = decode_history_cursor(encode_history_cursor({'created_at': datetime(2026, 3, 1), 'id': 7}))
+    get_user_translation_history(1, limit=11, before=before)
+
+    sql, params = cursor.executed[0]
+    assert "(created_at, id) < (%s, %s)" in sql and "OFFSET" not in sql
+    assert params == (1, datetime(2026, 3, 1), datetime(2026, 3, 1), 7, 11)
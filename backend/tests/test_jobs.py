@@ -0,0 +1,84 @@
+import io
+import os
+
+import pytest
+from openpyxl import Workbook, load_workbook
+from werkzeug.datastructures import FileStorage
+
+import jobs
+from deepseek_api import DeepSeekTranslator
+from file_processor import FileProcessor
+from jobs import FAILED, SUCCEEDED, JobManager, SQLiteJobStore
+from pipeline import TranslationPipeline
+from rate_limiter import RateLimiter
+
+
+@pytest.fixture
+def manager(tmp_path):
+    translator = DeepSeekTranslator(api_key="test", rate_limiter=RateLimiter())
+
+    async def atranslate_text(text, target_lang, source_lang="auto", **kwargs):
+        return text.upper()
+
+    translator.atranslate_text = atranslate_text
+    pipeline = TranslationPipeline(translator, FileProcessor(), workers=2)
+    return JobManager(
+        SQLiteJobStore(str(tmp_path / "jobs.db")),
+        pipeline,
+        jobs_dir=str(tmp_path / "jobs"),
+        workers=0,
+        retention=60
+    )
+
+
+def submit(manager, text="Hello there. General Kenobi."):
+    upload = FileStorage(io.BytesIO(text.encode()), filename="doc.txt")
+    job = manager.submit(1, upload, "doc.txt", "fr")
+    manager.process(manager.store.claim_next(manager.stale_after))
+    return manager.get(job['id'])
+
+
+def test_result_is_kept_in_the_job_directory(manager):
+    job = submit(manager)
+    assert job['status'] == SUCCEEDED
+    assert job['result_path'].startswith(os.path.join(manager.jobs_dir, job['id']))
+    with open(job['result_path']) as f:
+        assert "GENERAL KENOBI" in f.read()
+
+
+def test_expired_jobs_are_deleted_with_their_files(manager, monkeypatch):
+    job = submit(manager)
+    assert manager.delete_expired() == 0
+
+    later = jobs._now() + jobs.timedelta(seconds=120)
+    monkeypatch.setattr(jobs, "_now", lambda: later)
+    assert manager.delete_expired() == 1
+    assert manager.get(job['id']) is None
+    assert not os.path.exists(os.path.join(manager.jobs_dir, job['id']))
+
+
+def test_unfinished_jobs_do_not_expire(manager, monkeypatch):
+    upload = FileStorage(io.BytesIO(b"Queued text."), filename="doc.txt")
+    job = manager.submit(1, upload, "doc.txt", "fr")
+    later = jobs._now() + jobs.timedelta(days=30)
+    monkeypatch.setattr(jobs, "_now", lambda: later)
+    assert manager.delete_expired() == 0
+    assert manager.get(job['id'])['status'] not in (SUCCEEDED, FAILED)
+
+
+def test_spreadsheet_without_text_comes_back_unchanged(manager):
+    workbook = Workbook()
+    workbook.active["A1"] = 42
+    workbook.active["A2"] = "=A1*2"
+    data = io.BytesIO()
+    workbook.save(data)
+    upload = FileStorage(io.BytesIO(data.getvalue()), filename="numbers.xlsx")
+    job = manager.submit(1, upload, "numbers.xlsx", "fr")
+    manager.process(manager.store.claim_next(manager.stale_after))
+
+    job = manager.get(job['id'])
+    assert job['status'] == SUCCEEDED
+    assert job['character_count'] == 0
+    sheet = load_workbook(job['result_path']).active
+    assert sheet["A1"].value == 42
+    assert sheet["A2"].value == "=A1*2"
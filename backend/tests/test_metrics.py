@@ -0,0 +1,71 @@
+import pytest
+
+from metrics import Registry, timed_iter
+
+
+def test_counter_and_gauge_text_format():
+    registry = Registry()
+    requests = registry.counter("http_requests_total", "Requests served", ["method", "path"])
+    requests.inc(method="GET", path="/a")
+    requests.inc(2, method="GET", path='/say "hi"\n')
+    registry.gauge("queue_depth", "Jobs waiting").set(2.5)
+    registry.gauge("workers", "Workers by state", ["state"], function=lambda: {("busy",): 3, ("idle",): 1})
+
+    assert registry.render() == (
+        '# HELP http_requests_total Requests served\n'
+        '# TYPE http_requests_total counter\n'
+        'http_requests_total{method="GET",path="/a"} 1\n'
+        'http_requests_total{method="GET",path="/say \\"hi\\"\\n"} 2\n'
+        '# HELP queue_depth Jobs waiting\n'
+        '# TYPE queue_depth gauge\n'
+        'queue_depth 2.5\n'
+        '# HELP workers Workers by state\n'
+        '# TYPE workers gauge\n'
+        'workers{state="busy"} 3\n'
+        'workers{state="idle"} 1\n'
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency", ["route"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, route="x")
+
+    assert latency.samples() == [
+        'latency_seconds_bucket{route="x",le="0.1"} 2',
+        'latency_seconds_bucket{route="x",le="1"} 3',
+        'latency_seconds_bucket{route="x",le="+Inf"} 4',
+        'latency_seconds_sum{route="x"} 3.65',
+        'latency_seconds_count{route="x"} 4',
+    ]
+    assert latency.count(route="x") == 4
+
+
+def test_labels_must_match_and_names_are_registered_once():
+    registry = Registry()
+    counter = registry.counter("events_total", "Events", ["kind"])
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+    assert registry.counter("events_total", "Events", ["kind"]) is counter
+    with pytest.raises(ValueError):
+        registry.gauge("events_total", "Events", ["kind"])
+
+
+def test_failing_gauge_function_reports_nothing():
+    registry = Registry()
+
+    def broken():
+        raise RuntimeError("no database")
+
+    registry.gauge("rows", "Rows", function=broken)
+    assert registry.render() == "# HELP rows Rows\n# TYPE rows gauge\n"
+
+
+def test_timed_iter_observes_once_when_closed_early():
+    registry = Registry()
+    histogram = registry.histogram("produce_seconds", "Producing")
+    items = timed_iter(iter(range(10)), histogram)
+    assert next(items) == 0
+    items.close()
+    assert histogram.count() == 1
@@ -0,0 +1,70 @@
+import pytest
+
+import pdf_pages
+from benchmarks.fixtures import write_pdf
+
+
+@pytest.fixture(scope="module")
+def pdf(tmp_path_factory):
+    path = tmp_path_factory.mktemp("pdf") / "doc.pdf"
+    write_pdf(str(path), 40_000)
+    return str(path)
+
+
+def serial(path):
+    return list(pdf_pages.iter_page_texts(path, workers=0))
+
+
+def test_parallel_extraction_matches_serial(pdf, monkeypatch):
+    monkeypatch.setenv("PDF_POOL_IDLE_SECONDS", "0.1")
+    expected = serial(pdf)
+    assert len(expected) > 8
+    parallel = list(pdf_pages.iter_page_texts(pdf, workers=2, min_pages=4, pages_per_task=3))
+    assert parallel == expected
+    assert not pdf_pages._pool_users
+
+
+def test_concurrent_extractions_survive_a_broken_pool(pdf, monkeypatch):
+    monkeypatch.setenv("PDF_POOL_IDLE_SECONDS", "0.1")
+    expected = serial(pdf)
+    first, second = (
+        pdf_pages.iter_page_texts(pdf, workers=2, min_pages=4, pages_per_task=1) for _ in range(2)
+    )
+    assert next(first) == expected[0] and next(second) == expected[0]
+    pool = pdf_pages._pool
+    for process in list(pool._processes.values()):
+        process.kill()
+
+    assert [expected[0]] + list(first) == expected
+    assert [expected[0]] + list(second) == expected
+    assert not pdf_pages._pool_users
+    assert pdf_pages._pool is not pool
+
+
+def test_retiring_a_pool_does_not_cancel_its_other_users(pdf, monkeypatch):
+    monkeypatch.setenv("PDF_POOL_IDLE_SECONDS", "0.1")
+    expected = serial(pdf)
+    pages = pdf_pages.iter_page_texts(pdf, workers=2, min_pages=4, pages_per_task=1)
+    assert next(pages) == expected[0]
+    pool = pdf_pages._pool
+    # What another extraction does when the pool breaks for it
+    pdf_pages._discard_pool(pool)
+    assert pdf_pages._pool_users[pool] == 1
+    assert [expected[0]] + list(pages) == expected
+    assert pool._shutdown_thread
+    assert not pdf_pages._pool_users
+
+
+def test_defaults_to_forkserver(monkeypatch):
+    monkeypatch.delenv("PDF_EXTRACT_START_METHOD", raising=False)
+    assert pdf_pages._start_method() == "forkserver"
+    monkeypatch.setenv("PDF_EXTRACT_START_METHOD", "fork")
+    assert pdf_pages._start_method() == "fork"
+
+
+def test_worker_forgets_the_file_after_its_last_range(pdf):
+    page_count = len(serial(pdf))
+    pdf_pages.extract_page_range(pdf, 0, 2)
+    assert pdf_pages._worker_reader is not None
+    pdf_pages.extract_page_range(pdf, page_count - 2, page_count)
+    assert pdf_pages._worker_reader is None
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from deepseek_api import DeepSeekTranslator
+from file_processor import FileProcessor
+from pipeline import TranslationPipeline
+from quota import QuotaExceeded, QuotaHold
+from rate_limiter import RateLimiter
+
+
+class MemoryQuota:
+    """QuotaService stand-in with a fixed allowance"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.reserved = {}
+        self.committed = 0
+        self.next_id = 0
+
+    def reserve(self, user_id, characters, owner=None):
+        used = self.committed + sum(self.reserved.values())
+        if used + characters > self.limit:
+            raise QuotaExceeded(self.limit - used, characters)
+        self.next_id += 1
+        self.reserved[str(self.next_id)] = characters
+        return str(self.next_id)
+
+    def commit(self, reservation_id):
+        self.committed += self.reserved.pop(reservation_id)
+
+    def release(self, reservation_id):
+        self.reserved.pop(reservation_id, None)
+
+
+@pytest.fixture
+def translator():
+    translator = DeepSeekTranslator(api_key="test", rate_limiter=RateLimiter())
+    translator.sent = []
+
+    async def atranslate_text(text, target_lang, source_lang="auto", **kwargs):
+        translator.sent.append(text)
+        await asyncio.sleep(0.01)
+        return text.upper()
+
+    translator.atranslate_text = atranslate_text
+    return translator
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "doc.txt"
+    paragraph = "This sentence is here to fill the paragraph with words. " * 40
+    path.write_text("\n\n".join(f"Paragraph {n}. {paragraph}" for n in range(60)))
+    return str(path)
+
+
+def test_translates_in_order(translator, document):
+    result = TranslationPipeline(translator, FileProcessor(), workers=4).run(document, "fr")
+    assert result.complete
+    assert result.stats.extraction.items > 5
+    assert result.text.startswith("PARAGRAPH 0.")
+    assert result.text.index("PARAGRAPH 10.") < result.text.index("PARAGRAPH 20.")
+
+
+def test_quota_exhaustion_stops_the_document(translator, document):
+    pipeline = TranslationPipeline(translator, FileProcessor(), workers=4)
+    service = MemoryQuota(limit=20_000)
+    hold = QuotaHold(service, user_id=1)
+
+    with pytest.raises(QuotaExceeded):
+        pipeline.run(document, "fr", quota=hold)
+    # Nothing beyond the allowance was sent, and the rest was never tried
+    assert sum(len(chunk.encode()) for chunk in translator.sent) <= service.limit
+    assert len(translator.sent) < pipeline.run(document, "fr").stats.extraction.items / 2
+    # Translated chunks keep their reservations for the caller to settle
+    assert 0 < hold.reserved <= service.limit
+    hold.release_all()
+    assert service.reserved == {}
@@ -0,0 +1,108 @@
+from contextlib import contextmanager
+
+import pytest
+
+import usage_rollups
+from quota import QuotaExceeded, QuotaService
+
+
+class ScriptedCursor:
+    """Answers fetchone() from a script, recording every statement"""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append((" ".join(query.split()), params))
+
+    def fetchone(self):
+        return self.rows.pop(0)
+
+
+@pytest.fixture
+def scripted(monkeypatch):
+    def use(service, *rows, fail=False):
+        cursor = ScriptedCursor(rows)
+
+        @contextmanager
+        def get_cursor():
+            if fail:
+                raise RuntimeError("database down")
+            yield cursor
+
+        monkeypatch.setattr(service.db, "get_cursor", get_cursor)
+        return cursor
+    return use
+
+
+def test_reserve_records_a_hold_when_the_update_matches(scripted):
+    service = QuotaService(ttl=60, pending_usage=lambda user_id: 25)
+    cursor = scripted(service, {'month': '2026-10-01'})
+    reservation = service.reserve(7, 100, owner="job-1")
+
+    update = next(params for query, params in cursor.executed if query.startswith("UPDATE usage_rollups r"))
+    # The limit check counts write-behind usage not yet in the rollup
+    assert update == (100, 7, 25, 100)
+    insert = cursor.executed[-1]
+    assert insert[0].startswith("INSERT INTO quota_reservations")
+    assert insert[1] == (reservation, 7, '2026-10-01', 100, "job-1", 60)
+    assert service.stats()['reservations'] == 1
+
+
+def test_reserve_refused_reports_what_is_left(scripted):
+    service = QuotaService(pending_usage=lambda user_id: 25)
+    cursor = scripted(service, None, {'remaining': 100})
+    with pytest.raises(QuotaExceeded) as refused:
+        service.reserve(7, 500)
+    assert (refused.value.remaining, refused.value.requested) == (75, 500)
+    assert not any(query.startswith("INSERT INTO quota_reservations") for query, _ in cursor.executed)
+    assert service.stats()['rejections'] == 1
+
+
+def test_commit_and_release_settle_the_hold(scripted):
+    service = QuotaService()
+    cursor = scripted(service)
+    service.commit("r1")
+    service.release("r2")
+    service.release(None)
+    assert [params for _, params in cursor.executed] == [("r1",), ("r2",)]
+    assert (service.stats()['commits'], service.stats()['releases']) == (1, 1)
+
+
+def test_settle_failure_leaves_the_hold_to_expire(scripted):
+    service = QuotaService()
+    scripted(service, fail=True)
+    service.release("r1")
+    assert service.stats()['releases'] == 0
+
+
+def test_disabled_service_reserves_nothing(scripted):
+    service = QuotaService(enabled=False)
+    cursor = scripted(service)
+    assert service.reserve(7, 10**9) is None
+    assert cursor.executed == []
+
+
+def test_reserve_commit_release_against_postgres(postgres, pg_user):
+    service = QuotaService()
+    first = service.reserve(pg_user, 600)
+    with pytest.raises(QuotaExceeded) as refused:
+        service.reserve(pg_user, 600)
+    assert refused.value.remaining == 400
+
+    service.release(first)
+    second = service.reserve(pg_user, 600)
+    service.commit(second)
+    with postgres.get_cursor() as cursor:
+        cursor.execute("SELECT reserved FROM usage_rollups WHERE user_id = %s AND source_language = '*'", (pg_user,))
+        assert cursor.fetchone()['reserved'] == 0
+        cursor.execute("SELECT COUNT(*) AS holds FROM quota_reservations WHERE user_id = %s", (pg_user,))
+        assert cursor.fetchone()['holds'] == 0
+
+
+def test_reservation_only_rollup_is_not_drift(postgres, pg_user):
+    service = QuotaService()
+    service.reserve(pg_user, 100)
+    # The reservation made an empty '*' rollup row for a month without history
+    assert usage_rollups.reconcile(user_id=pg_user, dry_run=True)['drifted'] == 0
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+
+import pytest
+
+import rate_limiter
+from rate_limiter import LocalBackend, RateLimiter, SQLiteBackend
+
+
+@pytest.fixture(params=["local", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "rate.db"))
+    return LocalBackend()
+
+
+def test_take_grants_until_empty_then_reports_wait(backend):
+    bucket = [("requests", 1, 2.0, 2.0)]
+    assert backend.take(bucket, 100.0) == 0
+    assert backend.take(bucket, 100.0) == 0
+    assert backend.take(bucket, 100.0) == pytest.approx(0.5)
+    # Refilled at 2 per second
+    assert backend.take(bucket, 100.5) == 0
+
+
+def test_take_is_all_or_nothing(backend):
+    assert backend.take([("a", 1, 1.0, 1.0)], 0.0) == 0
+    # "b" has room but "a" does not, so "b" must be left untouched
+    assert backend.take([("a", 1, 1.0, 1.0), ("b", 1, 1.0, 1.0)], 0.0) > 0
+    assert backend.take([("b", 1, 1.0, 1.0)], 0.0) == 0
+
+
+def test_update_value_applies_or_keeps(backend):
+    assert backend.update_value("x", 1.0, lambda value, updated: (value / 2, 5.0)) == 0.5
+    assert backend.update_value("x", 1.0, lambda value, updated: None) == 0.5
+    assert backend.get_value("x", 1.0) == (0.5, 5.0)
+
+
+def test_constructor_rejects_non_positive_rates():
+    with pytest.raises(ValueError):
+        RateLimiter(requests_per_second=0)
+    with pytest.raises(ValueError):
+        RateLimiter(requests_per_second=-1)
+    with pytest.raises(ValueError):
+        RateLimiter(tokens_per_minute=0)
+
+
+def test_oversized_request_drains_a_full_bucket():
+    limiter = RateLimiter(requests_per_second=100, tokens_per_minute=600)
+    assert limiter.try_acquire(tokens=10_000) == 0
+    assert limiter.try_acquire(tokens=1) > 0
+
+
+def test_aimd_halves_once_per_cooldown_and_recovers(monkeypatch, backend):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter.time, "time", lambda: now[0])
+    limiter = RateLimiter(backend=backend, increase_step=0.25, decrease_cooldown=1.0)
+
+    limiter.on_rate_limited()
+    limiter.on_rate_limited()
+    assert limiter.factor == 0.5
+
+    limiter.on_success()
+    assert limiter.factor == 0.75
+    # Still inside the cooldown of the first decrease
+    limiter.on_rate_limited()
+    assert limiter.factor == 0.75
+
+    now[0] += 1.0
+    limiter.on_rate_limited()
+    assert limiter.factor == 0.375
+
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.factor == 1.0
+
+
+def test_factor_never_drops_below_minimum(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(rate_limiter.time, "time", lambda: now[0])
+    limiter = RateLimiter(min_factor=0.1, decrease_cooldown=0.0)
+    for _ in range(20):
+        now[0] += 1
+        limiter.on_rate_limited()
+    assert limiter.factor == 0.1
+
+
+def test_concurrent_successes_are_not_lost():
+    limiter = RateLimiter(increase_step=0.001, min_factor=0.0, decrease_factor=0.0)
+    limiter.on_rate_limited()
+    assert limiter.factor == 0.0
+
+    def succeed():
+        for _ in range(100):
+            limiter.on_success()
+
+    threads = [threading.Thread(target=succeed) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert limiter.factor == pytest.approx(0.8)
+
+
+def test_blocking_backend_runs_off_the_event_loop(tmp_path):
+    limiter = RateLimiter(backend=SQLiteBackend(str(tmp_path / "rate.db")))
+    loop_thread = threading.get_ident()
+    seen = []
+    original = limiter.try_acquire
+
+    def try_acquire(tokens=0):
+        seen.append(threading.get_ident())
+        return original(tokens)
+
+    limiter.try_acquire = try_acquire
+
+    async def run():
+        await limiter.acquire_async(10)
+        await limiter.on_success_async()
+        await limiter.on_rate_limited_async()
+
+    asyncio.run(run())
+    assert seen and loop_thread not in seen
+    assert limiter.factor == 0.5
@@ -0,0 +1,44 @@
+from segmenter import CHAR, END, LINE, PARAGRAPH, SENTENCE, WORD, Segmenter
+
+
+def cut(text, budget, lang="en"):
+    return [(text[span.start:span.end], span.kind) for span in Segmenter(lang).segment(text, budget)]
+
+
+def test_spans_cover_the_text_exactly():
+    text = "First paragraph here.\n\nSecond one, a bit longer. It has two sentences.\nAnd a line."
+    spans = list(Segmenter("en").segment(text, 30))
+    assert spans[0].start == 0 and spans[-1].end == len(text)
+    assert all(a.end == b.start for a, b in zip(spans, spans[1:]))
+    assert all(span.end - span.start <= 30 for span in spans)
+    assert spans[-1].kind == END
+
+
+def test_prefers_the_strongest_boundary_that_fits():
+    assert cut("Alpha beta.\n\nGamma delta. Epsilon", 22)[0] == ("Alpha beta.\n\n", PARAGRAPH)
+    assert cut("Alpha beta.\nGamma delta. Epsilon zeta", 22)[0] == ("Alpha beta.\n", LINE)
+    assert cut("Alpha beta. Gamma delta epsilon zeta", 22)[0] == ("Alpha beta. ", SENTENCE)
+    assert cut("Alpha beta gamma delta epsilon zeta", 22)[0] == ("Alpha beta gamma ", WORD)
+    assert cut("Alphabetagammadeltaepsilonzeta", 22)[0] == ("Alphabetagammadeltaeps", CHAR)
+
+
+def test_abbreviations_do_not_end_sentences():
+    chunks = cut("We met Dr. Smith yesterday. Then we left for home", 34)
+    assert chunks[0] == ("We met Dr. Smith yesterday. ", SENTENCE)
+
+
+def test_cjk_terminators_need_no_space():
+    text = "今天天气很好。我们去公园吧。好的"
+    assert cut(text, 10, "zh")[0] == (text[:7], SENTENCE)
+
+
+def test_measure_sizes_the_window():
+    # Two characters per unit: twice as much text fits the same budget
+    segmenter = Segmenter("en", measure=lambda text: (len(text) + 1) // 2)
+    spans = list(segmenter.segment("word " * 40, 20))
+    assert all(36 <= span.end - span.start <= 40 for span in spans[:-1])
+
+
+def test_chunks_are_trimmed_and_skip_blank_spans():
+    chunks = list(Segmenter("en").chunks("One.\n\n   \n\nTwo.  ", 6))
+    assert chunks == ["One.", "Two."]
@@ -0,0 +1,28 @@
+from chunking import estimate_tokens
+from segments import Segment, batch_text_bytes, collect_translations, decode_batch, encode_batch, pack_segments
+
+
+def test_batches_round_trip_any_text():
+    batch = [Segment("0:1:1", 'Quote " and [[1]]'), Segment("word/document.xml:3", "Ligne\tun\nDeux é")]
+    assert decode_batch(encode_batch(batch)) == batch
+    assert batch_text_bytes(encode_batch(batch)) == sum(len(s.text.encode("utf-8")) for s in batch)
+
+
+def test_pack_keeps_order_within_budgets():
+    segments = [Segment(str(n), "word " * (n % 7 + 1)) for n in range(100)]
+    batches = list(pack_segments(segments, max_tokens=20, max_segments=5))
+    assert [s for batch in batches for s in batch] == segments
+    assert all(len(batch) <= 5 for batch in batches)
+    assert all(sum(estimate_tokens(s.text) for s in batch) <= 20 for batch in batches)
+
+
+def test_oversized_segment_gets_a_batch_of_its_own():
+    segments = [Segment("a", "short"), Segment("b", "long " * 100), Segment("c", "short")]
+    assert [[s.id for s in batch] for batch in pack_segments(segments, max_tokens=10)] == [["a"], ["b"], ["c"]]
+
+
+def test_collect_translations_merges_batches_in_any_order():
+    first = encode_batch([Segment("a", "A"), Segment("b", "B")])
+    second = encode_batch([Segment("c", "C")])
+    assert collect_translations([second, first]) == {"c": "C", "a": "A", "b": "B"}
+    assert collect_translations([]) == {}
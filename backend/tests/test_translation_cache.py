@@ -0,0 +1,70 @@
+from translation_cache import LRUTier, SQLiteCacheBackend, TranslationCache, make_cache_key, normalize_segment
+
+
+def key(text, source="en", target="fr", **kwargs):
+    return make_cache_key(text, source, target, "deepseek-chat", "v1", **kwargs)
+
+
+def test_keys_ignore_spacing_and_unicode_form():
+    assert normalize_segment("  Café  au\t\tlait ") == "Café au lait"
+    assert key("Café  au lait") == key(" Café au lait\t")
+    # Line structure is content
+    assert key("one\ntwo") != key("one two")
+
+
+def test_keys_separate_everything_that_changes_the_output():
+    base = key("Hello")
+    assert key("Hello", target="de") != base
+    assert key("Hello", source="auto") != base
+    assert make_cache_key("Hello", "en", "fr", "other-model", "v1") != base
+    assert make_cache_key("Hello", "en", "fr", "deepseek-chat", "v2") != base
+    assert key("Hello", options={"glossary": "a"}) != base
+    assert key("Hello", options={"a": 1, "b": 2}) == key("Hello", options={"b": 2, "a": 1})
+
+
+def test_lru_is_bounded_by_bytes():
+    tier = LRUTier(max_bytes=10)
+    tier.set("a", "12345")
+    tier.set("b", "12345")
+    tier.get("a")
+    tier.set("c", "123")
+    assert tier.get("b") is None and tier.get("a") == "12345"
+    assert tier.size <= 10 and tier.evictions == 1
+    tier.set("huge", "x" * 11)
+    assert tier.get("huge") is None
+
+
+def test_persistent_hits_fill_memory(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+    TranslationCache(backend=backend).set(key("Hello"), "Bonjour", "en", "fr", "deepseek-chat", "v1")
+
+    cache = TranslationCache(backend=backend)
+    assert cache.get(key("Hello")) == "Bonjour"
+    assert cache.get(key("Hello")) == "Bonjour"
+    assert cache.get(key("Bye")) is None
+    stats = cache.stats()
+    assert (stats['persistent_hits'], stats['memory_hits'], stats['misses']) == (1, 1, 1)
+
+
+def test_invalidate_by_language_pair(tmp_path):
+    cache = TranslationCache(backend=SQLiteCacheBackend(str(tmp_path / "cache.db")))
+    cache.set(key("Hello"), "Bonjour", "en", "fr", "deepseek-chat", "v1")
+    cache.set(key("Hello", target="de"), "Hallo", "en", "de", "deepseek-chat", "v1")
+    assert cache.invalidate(target_lang="fr") == 1
+    assert cache.get(key("Hello")) is None
+    assert cache.get(key("Hello", target="de")) == "Hallo"
+
+
+def test_backend_errors_are_misses():
+    class Broken:
+        def get(self, key):
+            raise OSError("down")
+
+        def set(self, *args):
+            raise OSError("down")
+
+    cache = TranslationCache(backend=Broken())
+    cache.set(key("Hello"), "Bonjour", "en", "fr", "deepseek-chat", "v1")
+    assert cache.get(key("Hello")) == "Bonjour"
+    assert cache.get(key("Bye")) is None
+    assert cache.stats()['errors'] == 2
@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+
+import usage_rollups
+
+
+class RecordingCursor:
+    def __init__(self, drifted):
+        self.drifted = drifted
+        self.executed = []
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        self.executed.append((" ".join(query.split()), params))
+
+    def fetchone(self):
+        return {'drifted': self.drifted}
+
+
+@pytest.fixture
+def cursor(monkeypatch):
+    cursor = RecordingCursor(drifted=3)
+
+    @contextmanager
+    def get_cursor():
+        yield cursor
+
+    monkeypatch.setattr(usage_rollups.db, "get_cursor", get_cursor)
+    return cursor
+
+
+@pytest.fixture
+def partitions(monkeypatch):
+    def use(*months):
+        listed = [{'month': month, 'attached': attached} for month, attached in months]
+        monkeypatch.setattr(usage_rollups, "list_partitions", lambda: listed)
+    return use
+
+
+def deletes(cursor):
+    return [params for query, params in cursor.executed if query.startswith("DELETE FROM usage_rollups")]
+
+
+def test_default_reconcile_skips_detached_months(cursor, partitions):
+    partitions((date(2025, 1, 1), False), (date(2025, 2, 1), True), (date(2025, 3, 1), True))
+    assert usage_rollups.reconcile() == {'drifted': 3, 'fixed': 3}
+    # Every statement is bounded to the retained months, the DELETE included
+    for _, params in cursor.executed[1:]:
+        assert params[-2:] == (date(2025, 2, 1), date(2025, 2, 1))
+    assert len(deletes(cursor)) == 1
+
+
+def test_archived_month_is_refused(cursor, partitions):
+    partitions((date(2025, 3, 1), True))
+    with pytest.raises(ValueError):
+        usage_rollups.reconcile(month=date(2025, 1, 1))
+    assert cursor.executed == []
+
+
+def test_include_archived_rebuilds_everything(cursor, partitions):
+    partitions((date(2025, 3, 1), True))
+    usage_rollups.reconcile(month=date(2025, 1, 1), include_archived=True)
+    assert deletes(cursor) == [(None, None, date(2025, 1, 1), date(2025, 1, 1), None, None)]
+
+
+def test_dry_run_changes_nothing(cursor, partitions):
+    partitions()
+    assert usage_rollups.reconcile(dry_run=True) == {'drifted': 3, 'fixed': 0}
+    assert deletes(cursor) == []
+
+
+def test_missing_rows_count_as_no_usage(cursor, partitions):
+    partitions()
+    usage_rollups.reconcile(dry_run=True)
+    drift = next(query for query, _ in cursor.executed if "FULL OUTER JOIN" in query)
+    # Empty '*' rows left by quota reservations have no history to match
+    assert "COALESCE(e.characters, 0) <> COALESCE(a.characters, 0)" in drift
+    assert "COALESCE(e.requests, 0) <> COALESCE(a.requests, 0)" in drift
@@ -0,0 +1,55 @@
+import user_cache as user_cache_module
+from user_cache import UserCache
+
+ALICE = {'id': 1, 'username': 'alice', 'password_hash': 'x'}
+
+
+def test_lookup_racing_an_invalidation_is_not_cached():
+    cache = UserCache()
+    generation = cache.generation()
+    # A write lands between the database read and the cache fill
+    cache.invalidate_id(1)
+    cache.set('alice', ALICE, generation)
+    assert cache.get('alice') is None
+
+    cache.set('alice', ALICE, cache.generation())
+    assert cache.get('alice') == ALICE
+
+
+def test_invalidate_by_id_and_by_name():
+    cache = UserCache()
+    cache.set('alice', ALICE)
+    cache.invalidate_id(1)
+    assert cache.get('alice') is None
+    cache.set('alice', ALICE)
+    cache.invalidate('alice')
+    assert cache.get('alice') is None
+    assert cache.stats()['invalidations'] == 2
+
+
+def test_callers_get_a_copy():
+    cache = UserCache()
+    cache.set('alice', ALICE)
+    cache.get('alice').pop('password_hash')
+    assert 'password_hash' in cache.get('alice')
+
+
+def test_entries_expire_and_are_evicted(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(user_cache_module.time, "monotonic", lambda: now[0])
+    cache = UserCache(ttl=30, max_entries=2)
+    cache.set('alice', ALICE)
+    now[0] += 31
+    assert cache.get('alice') is None
+
+    for user_id, name in enumerate(['a', 'b', 'c']):
+        cache.set(name, {'id': user_id, 'username': name})
+    assert cache.get('a') is None and cache.get('c') is not None
+    stats = cache.stats()
+    assert (stats['expirations'], stats['evictions'], stats['entries']) == (1, 1, 2)
+
+
+def test_disabled_cache_stores_nothing():
+    cache = UserCache(enabled=False)
+    cache.set('alice', ALICE)
+    assert cache.get('alice') is None
@@ -0,0 +1,99 @@
+import json
+import time
+
+import pytest
+import stripe
+
+from webhook_events import FAILED, PENDING, PROCESSED, PROCESSING, SQLiteWebhookStore, WebhookProcessor, sign_payload
+
+SECRET = "whsec_test"
+
+
+def event_payload(event_id="evt_1", event_type="customer.subscription.updated"):
+    return json.dumps({
+        "id": event_id,
+        "object": "event",
+        "type": event_type,
+        "data": {"object": {"id": "sub_1", "customer": "cus_1"}}
+    })
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteWebhookStore(str(tmp_path / "webhooks.db"))
+
+
+def processor(store, handler, **kwargs):
+    return WebhookProcessor(
+        store, {"customer.subscription.updated": handler}, workers=0, retry_delay=0, **kwargs
+    )
+
+
+def test_signed_payload_verifies_and_tampering_is_rejected():
+    payload = event_payload()
+    header = sign_payload(payload, SECRET)
+    event = stripe.Webhook.construct_event(payload, header, SECRET)
+    assert event["id"] == "evt_1"
+
+    with pytest.raises(stripe.SignatureVerificationError):
+        stripe.Webhook.construct_event(payload.replace("cus_1", "cus_2"), header, SECRET)
+    with pytest.raises(stripe.SignatureVerificationError):
+        stripe.Webhook.construct_event(payload, sign_payload(payload, "whsec_other"), SECRET)
+    # Outside Stripe's default five minute tolerance
+    stale = sign_payload(payload, SECRET, timestamp=int(time.time()) - 3600)
+    with pytest.raises(stripe.SignatureVerificationError):
+        stripe.Webhook.construct_event(payload, stale, SECRET)
+
+
+def test_duplicate_event_is_stored_once(store):
+    events = processor(store, lambda obj: None)
+    assert events.receive("evt_1", "customer.subscription.updated", event_payload())
+    assert not events.receive("evt_1", "customer.subscription.updated", event_payload())
+    assert [event['id'] for event in store.list()] == ["evt_1"]
+
+
+def test_failing_handler_is_retried_until_it_succeeds(store):
+    calls = []
+
+    def handler(obj):
+        calls.append(obj['id'])
+        if len(calls) < 2:
+            raise RuntimeError("database down")
+
+    events = processor(store, handler)
+    events.receive("evt_1", "customer.subscription.updated", event_payload())
+    assert events.process_next()
+    event = store.get("evt_1")
+    assert (event['status'], event['attempts'], event['last_error']) == (PENDING, 1, "database down")
+
+    assert events.process_next()
+    event = store.get("evt_1")
+    assert (event['status'], event['attempts'], event['last_error']) == (PROCESSED, 2, None)
+    assert calls == ["sub_1", "sub_1"]
+
+
+def test_retries_stop_at_max_attempts(store):
+    def handler(obj):
+        raise RuntimeError("bad event")
+
+    events = processor(store, handler, max_attempts=3)
+    events.receive("evt_1", "customer.subscription.updated", event_payload())
+    while events.process_next():
+        pass
+    event = store.get("evt_1")
+    assert (event['status'], event['attempts']) == (FAILED, 3)
+
+
+def test_replay_requeues_a_stuck_event(store):
+    handled = []
+    events = processor(store, lambda obj: handled.append(obj['id']))
+    events.receive("evt_1", "customer.subscription.updated", event_payload())
+    # A consumer claimed it and died before finishing
+    assert store.claim_next(stale_after=300)['status'] == PROCESSING
+    assert not events.process_next()
+
+    assert store.replay(status=PROCESSING) == ["evt_1"]
+    assert store.get("evt_1")['attempts'] == 0
+    assert events.process_next()
+    assert store.get("evt_1")['status'] == PROCESSED
+    assert handled == ["sub_1"]
@@ -0,0 +1,526 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import argparse
+import threading
+import contextvars
+import functools
+import inspect
+import logging
+import urllib.request
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Awaitable, Dict, Iterator, List, Optional, TypeVar
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+SERVICE_NAME = "translator-backend"
+
+
+class Span:
+    """One timed operation. Only sampled traces record anything."""
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        sampled: bool,
+        attributes: Optional[Dict[str, Any]] = None
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.thread = threading.current_thread().name
+
+    def set_attribute(self, key: str, value: Any):
+        if self.sampled:
+            self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.sampled:
+            self.tracer.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'status': self.status,
+            'error': self.error,
+            'thread': self.thread,
+            'attributes': self.attributes
+        }
+
+
+class _NonRecordingSpan(Span):
+    """Stands in for every span of an unsampled trace"""
+
+    def __init__(self, tracer: "Tracer"):
+        super().__init__(tracer, "", "0" * 32, None, False)
+        self.span_id = "0" * 16
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_error(self, error: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def attach(span: Span) -> contextvars.Token:
+    """Make ``span`` current until :func:`detach`"""
+    return _current.set(span)
+
+
+def detach(token: contextvars.Token):
+    try:
+        _current.reset(token)
+    except ValueError:
+        # Closed from another context, e.g. a generator finalized late
+        pass
+
+
+class JsonlExporter:
+    """Appends one JSON object per span to ``path``"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class OtlpExporter:
+    """Posts spans to an OTLP/HTTP collector as JSON (``/v1/traces``)"""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.endpoint = endpoint if endpoint.endswith("/v1/traces") else endpoint.rstrip("/") + "/v1/traces"
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]):
+        body = {
+            'resourceSpans': [{
+                'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+                'scopeSpans': [{
+                    'scope': {'name': __name__},
+                    'spans': [self._span(span) for span in spans]
+                }]
+            }]
+        }
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(body, default=str).encode("utf-8"),
+            headers={'Content-Type': 'application/json'},
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    @staticmethod
+    def _span(span: Span) -> Dict[str, Any]:
+        attributes = {**span.attributes, 'thread.name': span.thread}
+        if span.error:
+            attributes['error.message'] = span.error
+        return {
+            'traceId': span.trace_id,
+            'spanId': span.span_id,
+            'parentSpanId': span.parent_id or "",
+            'name': span.name,
+            'kind': 1,
+            'startTimeUnixNano': str(span.start_ns),
+            'endTimeUnixNano': str(span.end_ns),
+            'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items()],
+            'status': {'code': 2 if span.status == "error" else 1}
+        }
+
+
+class Tracer:
+    """
+    Minimal tracer. A trace starts at a span opened with ``root=True``
+    (a request or a job), which decides with probability ``sample_rate``
+    whether the whole trace is recorded (head-based sampling). Spans
+    opened outside any trace, e.g. by background pollers, record nothing. The current span is
+    kept in a context variable, so it follows asyncio tasks and
+    ``asyncio.to_thread``; use :func:`bind` to carry it onto the
+    translator's event loop thread. Finished spans are exported in
+    batches from a background thread, so exporting never blocks a
+    request; when the queue is full spans are dropped.
+    """
+
+    def __init__(
+        self,
+        exporter=None,
+        sample_rate: float = 1.0,
+        max_queue: int = 10000,
+        batch_size: int = 512,
+        flush_interval: float = 2.0
+    ):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._unsampled = _NonRecordingSpan(self)
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None and self.sample_rate > 0
+
+    def start_span(self, name: str, parent: Optional[Span] = None, root: bool = False, **attributes) -> Span:
+        """A span that is not made current; call :meth:`Span.end` yourself"""
+        parent = parent or (None if root else _current.get())
+        if parent is not None:
+            if not parent.sampled:
+                return self._unsampled
+            return Span(self, name, parent.trace_id, parent.span_id, True, attributes)
+        if root and self.enabled and random.random() < self.sample_rate:
+            return Span(self, name, os.urandom(16).hex(), None, True, attributes)
+        return self._unsampled
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, root: bool = False, **attributes) -> Iterator[Span]:
+        span = self.start_span(name, parent, root, **attributes)
+        token = attach(span)
+        try:
+            yield span
+        except Exception as e:
+            span.record_error(e)
+            raise
+        finally:
+            detach(token)
+            span.end()
+
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            self._drain(batch)
+
+    def _drain(self, batch: List[Span]):
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not batch:
+            return
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            logger.warning(f"Exporting {len(batch)} spans failed: {e}")
+
+    def flush(self):
+        """Export everything queued, from the calling thread"""
+        while not self._queue.empty():
+            self._drain([])
+
+    def traced_iter(self, iterable, name: str, **attributes):
+        """
+        Pass ``iterable`` through under one span, with a child span per
+        item produced. Each item's span opens and closes within a single
+        ``next()``, so this works when the consumer advances it from
+        different threads.
+        """
+        outer = self.start_span(name, **attributes)
+        iterator = iter(iterable)
+        index = 0
+        try:
+            while True:
+                with self.span(f"{name}.next", parent=outer, index=index):
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                yield item
+                index += 1
+        except Exception as e:
+            outer.record_error(e)
+            raise
+        finally:
+            outer.end()
+
+    def traced(self, name: Optional[str] = None):
+        """Decorator opening a span around each call"""
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+def bind(coro: Awaitable[T]) -> Awaitable[T]:
+    """
+    Make the caller's current span current inside ``coro`` too, for
+    coroutines handed to another thread's event loop
+    """
+    span = _current.get()
+    if span is None:
+        return coro
+
+    async def run():
+        token = attach(span)
+        try:
+            return await coro
+        finally:
+            detach(token)
+    return run()
+
+
+def create_tracer() -> Tracer:
+    """
+    TRACE_EXPORTER is ``jsonl:<path>`` or ``otlp:<collector url>``;
+    tracing is off without it. TRACE_SAMPLE_RATE is the fraction of
+    requests and jobs traced (default all).
+    """
+    spec = os.getenv("TRACE_EXPORTER", "")
+    exporter = None
+    if spec.startswith("jsonl:"):
+        exporter = JsonlExporter(spec[len("jsonl:"):])
+    elif spec.startswith("otlp:"):
+        exporter = OtlpExporter(spec[len("otlp:"):])
+    elif spec:
+        logger.warning(f"Unknown TRACE_EXPORTER {spec!r}, tracing disabled")
+    return Tracer(exporter=exporter, sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "1.0")))
+
+
+tracer = create_tracer()
+atexit.register(tracer.flush)
+
+
+def load_spans(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Spans from a JSONL file, grouped by trace in start order"""
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                span = json.loads(line)
+                traces.setdefault(span['trace_id'], []).append(span)
+    for spans in traces.values():
+        spans.sort(key=lambda s: s['start_ns'])
+    return traces
+
+
+def render_timeline(spans: List[Dict[str, Any]], width: int = 60) -> str:
+    """
+    One line per span, nested under its parent, with a bar placed on a
+    shared time axis so gaps and overlaps are visible
+    """
+    start = min(s['start_ns'] for s in spans)
+    end = max(s['end_ns'] for s in spans)
+    total = max(end - start, 1)
+    ids = {s['span_id'] for s in spans}
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for span in spans:
+        parent = span['parent_id'] if span['parent_id'] in ids else None
+        children.setdefault(parent, []).append(span)
+
+    rows = []
+
+    def walk(parent: Optional[str], depth: int):
+        for span in children.get(parent, []):
+            rows.append((depth, span))
+            walk(span['span_id'], depth + 1)
+
+    walk(None, 0)
+    label_width = min(48, max(len("  " * depth + span['name']) for depth, span in rows))
+    lines = [f"trace {spans[0]['trace_id']}  {total / 1e6:.1f} ms  {len(spans)} spans"]
+    for depth, span in rows:
+        left = int((span['start_ns'] - start) / total * width)
+        length = max(1, round((span['end_ns'] - span['start_ns']) / total * width))
+        bar = " " * left + ("!" if span['status'] == "error" else "█") * min(length, width - left)
+        label = ("  " * depth + span['name'])[:label_width]
+        lines.append(f"{label:<{label_width}} |{bar:<{width}}| {span['duration_ms']:>10.1f} ms")
+    return "\n".join(lines)
+
+
+def _otlp_to_spans(body: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Convert an OTLP/JSON export request into JSONL span records"""
+    spans = []
+    for resource in body.get('resourceSpans', []):
+        for scope in resource.get('scopeSpans', []):
+            for span in scope.get('spans', []):
+                attributes = {
+                    a['key']: next(iter(a['value'].values()), None) for a in span.get('attributes', [])
+                }
+                start_ns, end_ns = int(span['startTimeUnixNano']), int(span['endTimeUnixNano'])
+                spans.append({
+                    'trace_id': span['traceId'],
+                    'span_id': span['spanId'],
+                    'parent_id': span.get('parentSpanId') or None,
+                    'name': span['name'],
+                    'start_ns': start_ns,
+                    'end_ns': end_ns,
+                    'duration_ms': round((end_ns - start_ns) / 1e6, 3),
+                    'status': "error" if span.get('status', {}).get('code') == 2 else "ok",
+                    'error': attributes.pop('error.message', None),
+                    'thread': attributes.pop('thread.name', None),
+                    'attributes': attributes
+                })
+    return spans
+
+
+def serve_collector(port: int, output: str):
+    """Local stand-in for an OTLP/HTTP collector, writing spans as JSONL"""
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/v1/traces":
+                self.send_error(404)
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                spans = _otlp_to_spans(body)
+            except (ValueError, KeyError) as e:
+                self.send_error(400, str(e))
+                return
+            with lock, open(output, "a", encoding="utf-8") as f:
+                for span in spans:
+                    f.write(json.dumps(span, ensure_ascii=False) + "\n")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    print(f"Collecting spans on http://127.0.0.1:{port}/v1/traces into {output}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect exported traces")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    listing = subparsers.add_parser("list", help="One line per trace, slowest first")
+    listing.add_argument("file", help="JSONL span file")
+    listing.add_argument("--limit", type=int, default=20)
+
+    timeline = subparsers.add_parser("timeline", help="Render traces as nested timelines")
+    timeline.add_argument("file", help="JSONL span file")
+    timeline.add_argument("--trace-id", help="Only this trace (default: the slowest)")
+    timeline.add_argument("--all", action="store_true", help="Every trace in the file")
+    timeline.add_argument("--width", type=int, default=60)
+
+    collect = subparsers.add_parser("collect", help="Run a local OTLP/HTTP collector writing JSONL")
+    collect.add_argument("--port", type=int, default=4318)
+    collect.add_argument("--output", default="traces.jsonl")
+    args = parser.parse_args()
+
+    if args.command == "collect":
+        serve_collector(args.port, args.output)
+        return
+
+    traces = load_spans(args.file)
+    by_duration = sorted(
+        traces.values(),
+        key=lambda spans: max(s['end_ns'] for s in spans) - min(s['start_ns'] for s in spans),
+        reverse=True
+    )
+    if args.command == "list":
+        for spans in by_duration[:args.limit]:
+            duration = (max(s['end_ns'] for s in spans) - min(s['start_ns'] for s in spans)) / 1e6
+            errors = sum(1 for s in spans if s['status'] == "error")
+            print(f"{spans[0]['trace_id']}\t{duration:.1f} ms\t{len(spans)} spans\t{errors} errors\t{spans[0]['name']}")
+    elif args.command == "timeline":
+        if args.trace_id:
+            if args.trace_id not in traces:
+                sys.exit(f"Trace {args.trace_id} not found")
+            selected = [traces[args.trace_id]]
+        else:
+            selected = by_duration if args.all else by_duration[:1]
+        print("\n\n".join(render_timeline(spans, args.width) for spans in selected))
+
+
+if __name__ == '__main__':
+    main()
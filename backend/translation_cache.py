@@ -0,0 +1,294 @@
+import os
+import re
+import json
+import sqlite3
+import hashlib
+import argparse
+import threading
+import unicodedata
+import logging
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RUN = re.compile(r"[ \t]+")
+
+
+def normalize_segment(text: str) -> str:
+    """Canonical form used for cache keys: NFC, trimmed, collapsed spaces"""
+    text = unicodedata.normalize("NFC", text).strip()
+    return _WHITESPACE_RUN.sub(" ", text)
+
+
+def make_cache_key(
+    text: str,
+    source_lang: str,
+    target_lang: str,
+    model: str,
+    prompt_version: str,
+    options: Optional[Dict[str, Any]] = None
+) -> str:
+    material = json.dumps(
+        [normalize_segment(text), source_lang, target_lang, model, prompt_version, options or {}],
+        ensure_ascii=False,
+        sort_keys=True
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LRUTier:
+    """In-process LRU bounded by the total size of stored translations."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous.encode("utf-8"))
+            self._entries[key] = value
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted.encode("utf-8"))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class PostgresCacheBackend:
+    """Persistent tier in the ``translation_cache`` table"""
+
+    def __init__(self):
+        from database import db
+        self.db = db
+
+    def get(self, key: str) -> Optional[str]:
+        with self.db.get_cursor() as cursor:
+            cursor.execute("""
+                SELECT translated_text FROM translation_cache
+                WHERE cache_key = %s
+                """, (key,))
+            row = cursor.fetchone()
+            return row['translated_text'] if row else None
+
+    def set(self, key: str, value: str, source_lang: str, target_lang: str, model: str, prompt_version: str):
+        with self.db.get_cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO translation_cache (
+                    cache_key, source_language, target_language,
+                    model, prompt_version, translated_text
+                )
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (cache_key) DO NOTHING
+                """, (key, source_lang, target_lang, model, prompt_version, value))
+
+    def invalidate(self, source_lang: Optional[str] = None, target_lang: Optional[str] = None) -> int:
+        with self.db.get_cursor() as cursor:
+            cursor.execute("""
+                DELETE FROM translation_cache
+                WHERE (%s IS NULL OR source_language = %s)
+                AND (%s IS NULL OR target_language = %s)
+                """, (source_lang, source_lang, target_lang, target_lang))
+            return cursor.rowcount
+
+
+class SQLiteCacheBackend:
+    """Persistent tier in a local SQLite file, for runs without Postgres"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS translation_cache (
+                cache_key TEXT PRIMARY KEY,
+                source_language TEXT,
+                target_language TEXT,
+                model TEXT,
+                prompt_version TEXT,
+                translated_text TEXT NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_translation_cache_language_pair
+            ON translation_cache (source_language, target_language)
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._connect().execute(
+            "SELECT translated_text FROM translation_cache WHERE cache_key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, source_lang: str, target_lang: str, model: str, prompt_version: str):
+        self._connect().execute("""
+            INSERT OR IGNORE INTO translation_cache (
+                cache_key, source_language, target_language,
+                model, prompt_version, translated_text
+            )
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, (key, source_lang, target_lang, model, prompt_version, value))
+
+    def invalidate(self, source_lang: Optional[str] = None, target_lang: Optional[str] = None) -> int:
+        cursor = self._connect().execute("""
+            DELETE FROM translation_cache
+            WHERE (? IS NULL OR source_language = ?)
+            AND (? IS NULL OR target_language = ?)
+            """, (source_lang, source_lang, target_lang, target_lang))
+        return cursor.rowcount
+
+
+class TranslationCache:
+    """
+    Two-tier translation memory: an in-process LRU in front of a
+    persistent backend. Backend errors are logged and treated as misses
+    so the cache can never fail a translation.
+    """
+
+    def __init__(self, memory_bytes: int = 64 * 1024 * 1024, backend=None):
+        self.memory = LRUTier(memory_bytes)
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            with self._lock:
+                self.memory_hits += 1
+            return value
+        if self.backend is not None:
+            try:
+                value = self.backend.get(key)
+            except Exception as e:
+                logger.error(f"Translation cache read failed: {e}")
+                with self._lock:
+                    self.errors += 1
+                value = None
+            if value is not None:
+                self.memory.set(key, value)
+                with self._lock:
+                    self.persistent_hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: str, source_lang: str, target_lang: str, model: str, prompt_version: str):
+        self.memory.set(key, value)
+        with self._lock:
+            self.writes += 1
+        if self.backend is not None:
+            try:
+                self.backend.set(key, value, source_lang, target_lang, model, prompt_version)
+            except Exception as e:
+                logger.error(f"Translation cache write failed: {e}")
+                with self._lock:
+                    self.errors += 1
+
+    def invalidate(self, source_lang: Optional[str] = None, target_lang: Optional[str] = None) -> int:
+        """Drop entries for a language pair; ``None`` matches any language"""
+        # The LRU is keyed by hash only, so it is cleared whole
+        self.memory.clear()
+        removed = 0
+        if self.backend is not None:
+            removed = self.backend.invalidate(source_lang, target_lang)
+        logger.info(f"Invalidated {removed} cached translations for {source_lang or '*'} -> {target_lang or '*'}")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.persistent_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'persistent_hits': self.persistent_hits,
+                'misses': self.misses,
+                'writes': self.writes,
+                'errors': self.errors,
+                'hit_rate': (self.memory_hits + self.persistent_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self.memory),
+                'memory_bytes': self.memory.size,
+                'evictions': self.memory.evictions
+            }
+
+
+def create_backend(spec: Optional[str] = None):
+    """
+    TRANSLATION_CACHE_BACKEND is ``postgres``, ``sqlite:<path>`` or ``memory``.
+    Defaults to Postgres when a database is configured, SQLite otherwise.
+    """
+    spec = spec or os.getenv("TRANSLATION_CACHE_BACKEND")
+    if not spec:
+        spec = "postgres" if os.getenv("DB_NAME") else "sqlite:translation_cache.db"
+    if spec == "memory":
+        return None
+    if spec.startswith("sqlite:"):
+        return SQLiteCacheBackend(spec[len("sqlite:"):])
+    return PostgresCacheBackend()
+
+
+def create_translation_cache() -> TranslationCache:
+    return TranslationCache(
+        memory_bytes=int(os.getenv("TRANSLATION_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024))),
+        backend=create_backend()
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the translation memory cache")
+    parser.add_argument("--backend", help="postgres, sqlite:<path> (default from environment)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    invalidate = subparsers.add_parser("invalidate", help="Delete cached translations")
+    invalidate.add_argument("--source", help="Source language (default: any)")
+    invalidate.add_argument("--target", help="Target language (default: any)")
+    args = parser.parse_args()
+
+    backend = create_backend(args.backend)
+    if backend is None:
+        parser.error("Nothing to invalidate in a memory-only cache")
+    if args.command == "invalidate":
+        removed = backend.invalidate(args.source, args.target)
+        print(f"Removed {removed} cached translations")
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
+    main()
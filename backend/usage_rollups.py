@@ -0,0 +1,150 @@
+import argparse
+import logging
+from datetime import date, datetime
+from typing import Optional, Dict, Any
+
+from database import db
+from history_partitions import list_partitions
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rollups recomputed from translation_history. Takes seven parameters:
+# user_id twice, month three times, then the first retained month twice
+# (any may be NULL for all)
+_EXPECTED_ROLLUPS = """
+    WITH history AS (
+        SELECT user_id, date_trunc('month', created_at)::date AS month,
+               COALESCE(source_language, 'auto') AS source_language,
+               COALESCE(target_language, 'auto') AS target_language,
+               character_count
+        FROM translation_history
+        WHERE (%s::integer IS NULL OR user_id = %s)
+        AND (%s::date IS NULL OR created_at >= %s::date
+             AND created_at < %s::date + INTERVAL '1 month')
+        AND (%s::date IS NULL OR created_at >= %s::date)
+    )
+    SELECT user_id, month, source_language, target_language,
+           SUM(character_count) AS characters, COUNT(*) AS requests
+    FROM history
+    GROUP BY 1, 2, 3, 4
+    UNION ALL
+    SELECT user_id, month, '*', '*', SUM(character_count), COUNT(*)
+    FROM history
+    GROUP BY 1, 2
+"""
+
+
+def retained_since() -> Optional[date]:
+    """
+    Month of the oldest attached history partition, or None without
+    partitions. Retention (history_partitions) detaches the oldest
+    months first, so for any month before this one the rollups are the
+    only usage left.
+    """
+    attached = [partition['month'] for partition in list_partitions() if partition['attached']]
+    return min(attached) if attached else None
+
+
+def reconcile(
+    user_id: Optional[int] = None,
+    month: Optional[date] = None,
+    dry_run: bool = False,
+    include_archived: bool = False
+) -> Dict[str, Any]:
+    """
+    Rebuild ``usage_rollups`` from ``translation_history`` for one user
+    and/or month (default: every month still in the history). Returns how
+    many rollup rows disagreed with the history; ``dry_run`` only reports
+    them.
+
+    Months already detached or archived are left alone, since rebuilding
+    them from the history that remains would erase their usage.
+    ``include_archived`` rebuilds them anyway.
+    """
+    since = None if include_archived else retained_since()
+    if month is not None and since is not None and month < since:
+        raise ValueError(f"{month:%Y-%m} is no longer in translation_history; its rollups are kept as they are")
+    history_filter = (user_id, user_id, month, month, month, since, since)
+    rollup_filter = (user_id, user_id, month, month, since, since)
+    with db.get_cursor() as cursor:
+        # Hold off concurrent record_translation calls until the rebuild commits
+        cursor.execute("LOCK TABLE usage_rollups IN SHARE ROW EXCLUSIVE MODE")
+        cursor.execute(f"""
+            WITH expected AS ({_EXPECTED_ROLLUPS}),
+            actual AS (
+                SELECT user_id, month, source_language, target_language, characters, requests
+                FROM usage_rollups
+                WHERE (%s::integer IS NULL OR user_id = %s)
+                AND (%s::date IS NULL OR month = %s::date)
+                AND (%s::date IS NULL OR month >= %s::date)
+            )
+            SELECT COUNT(*) AS drifted
+            FROM expected e
+            FULL OUTER JOIN actual a USING (user_id, month, source_language, target_language)
+            -- A missing row is no usage: quota reservations create empty
+            -- '*' rows for months without history, and those agree
+            WHERE COALESCE(e.characters, 0) <> COALESCE(a.characters, 0)
+            OR COALESCE(e.requests, 0) <> COALESCE(a.requests, 0)
+            """, history_filter + rollup_filter)
+        drifted = cursor.fetchone()['drifted']
+
+        if not dry_run and drifted:
+            cursor.execute("""
+                DELETE FROM usage_rollups
+                WHERE (%s::integer IS NULL OR user_id = %s)
+                AND (%s::date IS NULL OR month = %s::date)
+                AND (%s::date IS NULL OR month >= %s::date)
+                """, rollup_filter)
+            cursor.execute(f"""
+                INSERT INTO usage_rollups (
+                    user_id, month, source_language, target_language, characters, requests
+                )
+                {_EXPECTED_ROLLUPS}
+                """, history_filter)
+            logger.info(f"Rebuilt usage rollups, {cursor.rowcount} rows written")
+            # Holds of in-flight translations are not in the history
+            cursor.execute("""
+                INSERT INTO usage_rollups (user_id, month, source_language, target_language, reserved)
+                SELECT user_id, month, '*', '*', SUM(characters)
+                FROM quota_reservations
+                WHERE (%s::integer IS NULL OR user_id = %s)
+                AND (%s::date IS NULL OR month = %s::date)
+                AND (%s::date IS NULL OR month >= %s::date)
+                GROUP BY user_id, month
+                ON CONFLICT (user_id, month, source_language, target_language)
+                DO UPDATE SET reserved = EXCLUDED.reserved
+                """, rollup_filter)
+
+    return {'drifted': drifted, 'fixed': 0 if dry_run else drifted}
+
+
+def _month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill and reconcile monthly usage rollups")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    command = subparsers.add_parser("reconcile", help="Rebuild rollups from translation history")
+    command.add_argument("--user-id", type=int, help="Only this user (default: all)")
+    command.add_argument("--month", type=_month, help="Only this month, YYYY-MM (default: all retained months)")
+    command.add_argument("--dry-run", action="store_true", help="Report drift without fixing it")
+    command.add_argument(
+        "--all", action="store_true",
+        help="Also rebuild months detached or archived from translation_history. Their rows are gone, "
+             "so this rewrites their rollups from whatever history is left, usually to nothing"
+    )
+    args = parser.parse_args()
+
+    if args.command == "reconcile":
+        try:
+            result = reconcile(args.user_id, args.month, args.dry_run, include_archived=args.all)
+        except ValueError as e:
+            parser.error(f"{e}; pass --all to rebuild it anyway")
+        print(f"{result['drifted']} rollup rows out of date, {result['fixed']} fixed")
+
+
+if __name__ == '__main__':
+    main()
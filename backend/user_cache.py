@@ -0,0 +1,127 @@
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class UserCache:
+    """
+    TTL- and size-bounded cache of user rows by username, for the lookup
+    ``token_required`` makes on every request. Writes that change a user
+    invalidate the entry in this process; other processes see the change
+    once their entry expires, so ``ttl`` bounds how stale a user can be.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 10000, enabled: bool = True):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # username -> (expires at, user row)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._usernames: Dict[int, str] = {}
+        # Bumped by every invalidation so a lookup that raced one is not cached
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, username: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user = entry
+            if expires_at <= time.monotonic():
+                self._remove(username)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(username)
+            self.hits += 1
+            # Callers modify the row they get (e.g. drop the password hash)
+            return dict(user)
+
+    def generation(self) -> int:
+        """Take before reading a user from the database, pass to :meth:`set`"""
+        with self._lock:
+            return self._generation
+
+    def set(self, username: str, user: Dict[str, Any], generation: Optional[int] = None):
+        if not self.enabled or user is None:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[username] = (time.monotonic() + self.ttl, dict(user))
+            self._entries.move_to_end(username)
+            self._usernames[user['id']] = username
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, username: str):
+        with self._lock:
+            self._generation += 1
+            if username in self._entries:
+                self._remove(username)
+                self.invalidations += 1
+
+    def invalidate_id(self, user_id: int):
+        with self._lock:
+            self._generation += 1
+            username = self._usernames.get(user_id)
+            if username is not None and username in self._entries:
+                self._remove(username)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._usernames.clear()
+
+    def _remove(self, username: str):
+        _, user = self._entries.pop(username)
+        if self._usernames.get(user['id']) == username:
+            del self._usernames[user['id']]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl
+            }
+
+
+def create_user_cache() -> UserCache:
+    """USER_CACHE_ENABLED=0 turns the cache off"""
+    return UserCache(
+        ttl=float(os.getenv("USER_CACHE_TTL_SECONDS", "30")),
+        max_entries=int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000")),
+        enabled=os.getenv("USER_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+    )
+
+
+# Shared by token_required and the database write helpers
+user_cache = create_user_cache()
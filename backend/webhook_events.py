@@ -0,0 +1,398 @@
+import os
+import hmac
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+import threading
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Any, List, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+PROCESSING = "processing"
+PROCESSED = "processed"
+FAILED = "failed"
+
+Handler = Callable[[Dict[str, Any]], Any]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class PostgresWebhookStore:
+    """Stripe events in the ``webhook_events`` table, keyed by event id"""
+
+    def __init__(self):
+        from database import db
+        self.db = db
+
+    def record(self, event_id: str, event_type: str, payload: str) -> bool:
+        """Store a verified event; False if it was already received"""
+        with self.db.get_cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO webhook_events (id, type, payload)
+                VALUES (%s, %s, %s::jsonb)
+                ON CONFLICT (id) DO NOTHING
+                RETURNING id
+                """, (event_id, event_type, payload))
+            return cursor.fetchone() is not None
+
+    def get(self, event_id: str) -> Optional[Dict[str, Any]]:
+        with self.db.get_cursor() as cursor:
+            cursor.execute("SELECT * FROM webhook_events WHERE id = %s", (event_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def claim_next(self, stale_after: float) -> Optional[Dict[str, Any]]:
+        """
+        Move the oldest due event to processing. Events left processing
+        for ``stale_after`` seconds lost their consumer and are claimed
+        again.
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute("""
+                UPDATE webhook_events
+                SET status = %s, attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE id = (
+                    SELECT id FROM webhook_events
+                    WHERE (status = %s AND next_attempt_at <= CURRENT_TIMESTAMP)
+                    OR (status = %s AND updated_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 second')
+                    ORDER BY received_at
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING *
+                """, (PROCESSING, PENDING, PROCESSING, stale_after))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def mark_processed(self, event_id: str):
+        with self.db.get_cursor() as cursor:
+            cursor.execute("""
+                UPDATE webhook_events
+                SET status = %s, last_error = NULL, processed_at = CURRENT_TIMESTAMP,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+                """, (PROCESSED, event_id))
+
+    def mark_failed(self, event_id: str, error: str, retry_at: Optional[datetime]):
+        """Back to pending until ``retry_at``, or failed for good without one"""
+        with self.db.get_cursor() as cursor:
+            cursor.execute("""
+                UPDATE webhook_events
+                SET status = %s, last_error = %s, next_attempt_at = COALESCE(%s, next_attempt_at),
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+                """, (PENDING if retry_at else FAILED, error, retry_at, event_id))
+
+    def replay(self, event_ids: Optional[List[str]] = None, status: Optional[str] = None) -> List[str]:
+        """Queue events again with a fresh set of attempts"""
+        with self.db.get_cursor() as cursor:
+            cursor.execute("""
+                UPDATE webhook_events
+                SET status = %s, attempts = 0, next_attempt_at = CURRENT_TIMESTAMP,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE (%s::text[] IS NULL OR id = ANY(%s::text[]))
+                AND (%s::text IS NULL OR status = %s)
+                RETURNING id
+                """, (PENDING, event_ids, event_ids, status, status))
+            return [row['id'] for row in cursor.fetchall()]
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        with self.db.get_cursor() as cursor:
+            cursor.execute("""
+                SELECT id, type, status, attempts, last_error, received_at, processed_at
+                FROM webhook_events
+                WHERE (%s::text IS NULL OR status = %s)
+                ORDER BY received_at DESC
+                LIMIT %s
+                """, (status, status, limit))
+            return [dict(row) for row in cursor.fetchall()]
+
+
+class SQLiteWebhookStore:
+    """Stripe events in a local SQLite file, for development and tests"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS webhook_events (
+                id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                received_at TEXT,
+                next_attempt_at TEXT,
+                processed_at TEXT,
+                updated_at TEXT
+            )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def record(self, event_id: str, event_type: str, payload: str) -> bool:
+        now = _now().isoformat()
+        cursor = self._connect().execute("""
+            INSERT OR IGNORE INTO webhook_events (id, type, payload, received_at, next_attempt_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, (event_id, event_type, payload, now, now, now))
+        return cursor.rowcount == 1
+
+    def get(self, event_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM webhook_events WHERE id = ?", (event_id,)).fetchone()
+        return _decode(row) if row else None
+
+    def claim_next(self, stale_after: float) -> Optional[Dict[str, Any]]:
+        # Timestamps are all UTC ISO strings, so they compare as text
+        now = _now().isoformat()
+        cutoff = (_now() - timedelta(seconds=stale_after)).isoformat()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("""
+                SELECT id FROM webhook_events
+                WHERE (status = ? AND next_attempt_at <= ?) OR (status = ? AND updated_at < ?)
+                ORDER BY received_at LIMIT 1
+                """, (PENDING, now, PROCESSING, cutoff)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE webhook_events SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (PROCESSING, now, row['id'])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row['id']) if row else None
+
+    def mark_processed(self, event_id: str):
+        now = _now().isoformat()
+        self._connect().execute("""
+            UPDATE webhook_events SET status = ?, last_error = NULL, processed_at = ?, updated_at = ?
+            WHERE id = ?
+            """, (PROCESSED, now, now, event_id))
+
+    def mark_failed(self, event_id: str, error: str, retry_at: Optional[datetime]):
+        self._connect().execute("""
+            UPDATE webhook_events
+            SET status = ?, last_error = ?, next_attempt_at = COALESCE(?, next_attempt_at), updated_at = ?
+            WHERE id = ?
+            """, (
+                PENDING if retry_at else FAILED, error,
+                retry_at.isoformat() if retry_at else None, _now().isoformat(), event_id
+            ))
+
+    def replay(self, event_ids: Optional[List[str]] = None, status: Optional[str] = None) -> List[str]:
+        conditions, params = [], []
+        if event_ids is not None:
+            conditions.append(f"id IN ({', '.join('?' for _ in event_ids)})")
+            params.extend(event_ids)
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        where = " AND ".join(conditions) or "1 = 1"
+        conn = self._connect()
+        ids = [row['id'] for row in conn.execute(f"SELECT id FROM webhook_events WHERE {where}", params)]
+        now = _now().isoformat()
+        conn.executemany(
+            "UPDATE webhook_events SET status = ?, attempts = 0, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+            [(PENDING, now, now, event_id) for event_id in ids]
+        )
+        return ids
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        rows = self._connect().execute("""
+            SELECT id, type, status, attempts, last_error, received_at, processed_at
+            FROM webhook_events
+            WHERE (? IS NULL OR status = ?)
+            ORDER BY received_at DESC
+            LIMIT ?
+            """, (status, status, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+
+def _decode(row: sqlite3.Row) -> Dict[str, Any]:
+    event = dict(row)
+    event['payload'] = json.loads(event['payload'])
+    return event
+
+
+def create_webhook_store(spec: Optional[str] = None):
+    """
+    WEBHOOK_STORE is ``postgres`` or ``sqlite:<path>``. Defaults to
+    Postgres when a database is configured, SQLite otherwise.
+    """
+    spec = spec or os.getenv("WEBHOOK_STORE")
+    if not spec:
+        spec = "postgres" if os.getenv("DB_NAME") else "sqlite:webhook_events.db"
+    if spec.startswith("sqlite:"):
+        return SQLiteWebhookStore(spec[len("sqlite:"):])
+    return PostgresWebhookStore()
+
+
+def sign_payload(payload: str, secret: str, timestamp: Optional[int] = None) -> str:
+    """
+    ``Stripe-Signature`` header for ``payload``, as Stripe computes it.
+    Lets webhooks be exercised locally without the Stripe CLI.
+    """
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    signature = hmac.new(
+        secret.encode("utf-8"), f"{timestamp}.{payload}".encode("utf-8"), hashlib.sha256
+    ).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+class WebhookProcessor:
+    """
+    Applies stored Stripe events off the request path. The webhook
+    endpoint only verifies and records an event, so Stripe gets its 200
+    straight away and a redelivery of the same event id is a no-op.
+    Worker threads then claim events from the store and run the handler
+    for their type. A failing event is retried with exponential backoff
+    and marked failed after ``max_attempts``; failed or stuck events can
+    be queued again with ``python webhook_events.py replay``.
+    """
+
+    def __init__(
+        self,
+        store,
+        handlers: Dict[str, Handler],
+        workers: Optional[int] = None,
+        poll_interval: float = 5.0,
+        max_attempts: Optional[int] = None,
+        retry_delay: Optional[float] = None,
+        stale_after: float = 300.0
+    ):
+        self.store = store
+        self.handlers = handlers
+        self.workers = workers if workers is not None else int(os.getenv("WEBHOOK_WORKERS", "1"))
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts or int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+        self.retry_delay = retry_delay if retry_delay is not None else float(os.getenv("WEBHOOK_RETRY_SECONDS", "30"))
+        self.stale_after = stale_after
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def receive(self, event_id: str, event_type: str, payload: str) -> bool:
+        """Record a verified event for processing; False for a duplicate"""
+        created = self.store.record(event_id, event_type, payload)
+        if created:
+            self._wakeup.set()
+        else:
+            logger.info(f"Ignoring duplicate Stripe event {event_id}")
+        return created
+
+    def start(self):
+        if self._threads or self.workers <= 0:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"webhook-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.workers} webhook workers")
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _worker(self):
+        while not self._stopping.is_set():
+            try:
+                processed = self.process_next()
+            except Exception as e:
+                logger.error(f"Claiming webhook event failed: {str(e)}")
+                processed = False
+            if not processed:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def process_next(self) -> bool:
+        """Apply one due event; False when there was none"""
+        event = self.store.claim_next(self.stale_after)
+        if event is None:
+            return False
+        self.process(event)
+        return True
+
+    def process(self, event: Dict[str, Any]):
+        event_id, event_type = event['id'], event['type']
+        handler = self.handlers.get(event_type)
+        if handler is None:
+            logger.info(f"Unhandled event type: {event_type}")
+            self.store.mark_processed(event_id)
+            return
+        try:
+            handler(event['payload']['data']['object'])
+        except Exception as e:
+            attempts = event['attempts']
+            if attempts >= self.max_attempts:
+                logger.error(f"Stripe event {event_id} ({event_type}) failed {attempts} times, giving up: {str(e)}")
+                self.store.mark_failed(event_id, str(e), None)
+            else:
+                delay = self.retry_delay * 2 ** (attempts - 1)
+                logger.error(f"Stripe event {event_id} ({event_type}) failed, retrying in {delay:.0f}s: {str(e)}")
+                self.store.mark_failed(event_id, str(e), _now() + timedelta(seconds=delay))
+            return
+        self.store.mark_processed(event_id)
+        logger.info(f"Processed Stripe event {event_id} ({event_type})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and replay stored Stripe webhook events")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    listing = subparsers.add_parser("list", help="Show recent events")
+    listing.add_argument("--status", choices=[PENDING, PROCESSING, PROCESSED, FAILED])
+    listing.add_argument("--limit", type=int, default=50)
+
+    replay = subparsers.add_parser("replay", help="Queue events again for the running consumers")
+    replay.add_argument("event_ids", nargs="*", help="Event ids (default: every event with --status)")
+    replay.add_argument("--status", choices=[PROCESSING, PROCESSED, FAILED], help="Only events in this state")
+
+    sign = subparsers.add_parser("sign", help="Print a Stripe-Signature header for a local payload")
+    sign.add_argument("payload_file")
+    sign.add_argument("--secret", default=os.getenv("STRIPE_WEBHOOK_SECRET"))
+    args = parser.parse_args()
+
+    if args.command == "sign":
+        if not args.secret:
+            parser.error("--secret or STRIPE_WEBHOOK_SECRET is required")
+        with open(args.payload_file, encoding="utf-8") as f:
+            print(sign_payload(f.read(), args.secret))
+        return
+
+    store = create_webhook_store()
+    if args.command == "list":
+        for event in store.list(args.status, args.limit):
+            error = f"\t{event['last_error']}" if event['last_error'] else ""
+            print(f"{event['id']}\t{event['type']}\t{event['status']}\t{event['attempts']} attempts{error}")
+    elif args.command == "replay":
+        if not args.event_ids and not args.status:
+            parser.error("give event ids or --status")
+        replayed = store.replay(args.event_ids or None, args.status)
+        print(f"Queued {len(replayed)} events" + (f": {', '.join(replayed)}" if replayed else ""))
+
+
+if __name__ == '__main__':
+    main()
@@ -119,9 +119,7 @@ export const getTranslationHistory = async (limit = 10, offset = 0) => {
 
 export const translateText = async (text, sourceLang, targetLang, onProgress) => {
   try {
-    // Check character limit first
-    await checkCharacterLimit(text.length);
-    
+    // The server reserves quota and answers 402 when the limit is reached
     // For small texts (<1000 chars), use direct translation
     if (text.length <= 1000) {
       const response = await api.post('/api/translate-text', {
@@ -207,17 +205,7 @@ export const translateText = async (text, sourceLang, targetLang, onProgress) =>
 
 export const translateFile = async (file, sourceLang, targetLang, onProgress) => {
   try {
-    // First estimate the file size (1 char ≈ 1 byte for plain text)
-    let charCount = file.size;
-    
-    // For document files, we'll need to extract text to get accurate count
-    if (file.type !== 'text/plain') {
-      // This is a rough estimate - actual count will be determined during processing
-      charCount = file.size * 0.5; // Adjust factor based on your typical documents
-    }
-    
-    await checkCharacterLimit(charCount);
-    
+    // The server reserves quota per chunk and answers 402 when the limit is reached
     const formData = new FormData();
     formData.append('file', file);
     formData.append('source_lang', sourceLang);